@@ -0,0 +1,231 @@
+# analytics.py
+# Indicateurs transverses sur les audits enregistrés (table des réponses détaillées, answer_store) :
+# écarts de photos par section, complétude des questions obligatoires, ventilation par fournisseur.
+# Calculs vectorisés (pandas / NumPy) : aucune boucle Python par soumission ni par réponse.
+# Exemples :
+#   python analytics.py
+#   python analytics.py --since 2026-09-01 --output analyses/ --format csv
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from answer_store import DEFAULT_ANSWERS_PATH, AnswerStore
+from core import COMMENT_ID, SECTION_PHOTO_RULES, build_form_structure
+from regenerate_reports import load_tables
+from sites import parse_counts
+from snapshot import DEFAULT_SNAPSHOT_DIR
+
+# Fournisseur des bornes concernées par chaque section soumise à la règle photo
+SECTION_SUPPLIER_COLUMNS = {
+    "Bornes DC": 'Fournisseur Bornes DC [Bornes]',
+    "Bornes AC": 'Fournisseur Bornes AC [Bornes]',
+}
+UNKNOWN_SUPPLIER = "Non renseigné"
+REPORT_TABLES = ('resume', 'ecarts_section', 'ecarts_fournisseur', 'obligatoires_section', 'obligatoires_question')
+_LOAD_COLUMNS = ["submission_id", "date", "projet", "phase_index", "phase_name", "question_id", "value", "value_num", "file_refs"]
+
+
+# --- CHARGEMENT ---
+def relevant_question_ids(structure):
+    """Questions utiles aux indicateurs : photos, obligatoires et commentaire d'écart."""
+    return sorted({q.id for q in structure.questions.values() if q.is_photo or q.mandatory} | {COMMENT_ID})
+
+
+def load_answers(store, structure, date_from=None, date_to=None):
+    """Réponses détaillées restreintes aux questions utiles (filtre indexé côté SQLite)."""
+    df = store.query(columns=_LOAD_COLUMNS, question_ids=relevant_question_ids(structure), date_from=date_from, date_to=date_to)
+    for col in ('submission_id', 'projet', 'phase_name'):
+        df[col] = df[col].astype('category')
+    return df
+
+
+# --- PHOTOS ATTENDUES ---
+def _count_column(sites, col):
+    # Même lecture des valeurs que get_expected_photo_count (voir sites.parse_counts)
+    if col not in sites.columns: return pd.Series(0, index=sites.index)
+    return pd.Series(parse_counts(sites[col]).to_numpy(), index=sites.index)
+
+
+def expected_photo_table(sites):
+    """
+    Une ligne par (projet, section) : base de photos attendues par question photo visible
+    (mêmes colonnes et même lecture des valeurs que get_expected_photo_count) et fournisseur.
+    """
+    columns = ['projet', 'section', 'expected_base', 'fournisseur']
+    if sites is None or 'Intitulé' not in sites.columns: return pd.DataFrame(columns=columns)
+    sites = sites.rename(columns=lambda c: str(c).strip()).drop_duplicates('Intitulé')
+    frames = []
+    for section, rule_columns in SECTION_PHOTO_RULES.items():
+        base = sum((_count_column(sites, col) for col in rule_columns), pd.Series(0, index=sites.index))
+        supplier_col = SECTION_SUPPLIER_COLUMNS.get(section)
+        supplier = sites[supplier_col] if supplier_col in sites.columns else pd.Series(None, index=sites.index, dtype=object)
+        supplier = supplier.astype(object).where(supplier.notna() & (supplier.astype(str).str.strip() != ""), UNKNOWN_SUPPLIER)
+        frames.append(pd.DataFrame({
+            'projet': sites['Intitulé'].values, 'section': section,
+            'expected_base': base.values, 'fournisseur': supplier.astype(str).str.strip().values,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+# --- INDICATEURS ---
+def _stripped_labels(series):
+    # Libellés nettoyés d'une colonne catégorielle, calculés sur les catégories (pas sur chaque ligne)
+    series = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    labels, inverse = np.unique(series.cat.categories.astype(str).str.strip(), return_inverse=True)
+    codes = series.cat.codes.to_numpy()
+    return pd.Categorical.from_codes(np.where(codes >= 0, inverse[codes], -1), labels)
+
+
+def _file_counts(file_refs):
+    # file_refs : liste JSON '["a.jpg", "b.jpg"]' (noms sans virgule, issus de "Fichiers: a, b")
+    refs = file_refs.fillna("[]")
+    counts = refs.str.count('", "') + 1
+    return counts.where(refs != "[]", 0).astype('int64')
+
+
+def _is_answered(df, n_files):
+    # Mêmes règles que validate_section : vide, 0 numérique et liste vide comptent comme non répondu
+    value = df['value']
+    empty = value.isna() | (value.str.strip() == "") | (value == "[]") | (df['value_num'] == 0)
+    return (~empty & df['file_refs'].isna()) | (n_files > 0)
+
+
+def phase_photo_gaps(answers, structure, sites):
+    """Une ligne par phase soumise à la règle photo : photos attendues, reçues, écart et justification."""
+    photo_ids = [q.id for q in structure.questions.values() if q.is_photo]
+    sections = _stripped_labels(answers['phase_name'])
+    in_rule = np.asarray(sections.isin(list(SECTION_PHOTO_RULES)))
+    df = answers.loc[in_rule, ['submission_id', 'projet', 'phase_index', 'question_id', 'value', 'file_refs']]
+    is_photo = df['question_id'].isin(photo_ids)
+    comment = df['value'].where(df['question_id'] == COMMENT_ID)
+    frame = pd.DataFrame({
+        'submission_id': df['submission_id'].values,
+        'phase_index': df['phase_index'].values,
+        'projet': df['projet'].values,
+        'section': sections[in_rule],
+        'photo_questions': is_photo.values,
+        'photos': (_file_counts(df['file_refs']) * is_photo).values,
+        'justified': (comment.notna() & (comment.str.strip() != "")).values,
+    })
+    phases = frame.groupby(['submission_id', 'phase_index'], sort=False, observed=True).agg(
+        projet=('projet', 'first'), section=('section', 'first'),
+        photo_questions=('photo_questions', 'sum'), photos=('photos', 'sum'), justified=('justified', 'any'),
+    ).reset_index()
+    # Jointure sur des chaînes : une ligne par phase, beaucoup moins que de réponses
+    phases['projet'] = phases['projet'].astype(str)
+    phases['section'] = phases['section'].astype(str)
+    phases = phases.merge(expected_photo_table(sites), on=['projet', 'section'], how='left')
+    phases['expected_base'] = phases['expected_base'].fillna(0).astype('int64')
+    phases['fournisseur'] = phases['fournisseur'].fillna(UNKNOWN_SUPPLIER)
+    phases['expected'] = phases['expected_base'] * phases['photo_questions']
+    phases['checked'] = (phases['expected'] > 0) & (phases['photo_questions'] > 0)
+    phases['gap'] = phases['checked'] & (phases['photos'] != phases['expected'])
+    phases['missing_photos'] = (phases['expected'] - phases['photos']).clip(lower=0).where(phases['checked'], 0)
+    return phases
+
+
+def _gap_summary(phases, keys):
+    # Justifications comptées sur les seules phases en écart
+    checked = phases[phases['checked']].assign(justified_gap=lambda d: d['gap'] & d['justified'])
+    summary = checked.groupby(keys, sort=True).agg(
+        phases=('gap', 'size'), ecarts=('gap', 'sum'), justifies=('justified_gap', 'sum'),
+        photos_attendues=('expected', 'sum'), photos_recues=('photos', 'sum'), photos_manquantes=('missing_photos', 'sum'),
+    )
+    summary['taux_ecart'] = (summary['ecarts'] / summary['phases']).round(4)
+    summary['taux_photos'] = (summary['photos_recues'] / summary['photos_attendues']).round(4)
+    return summary.reset_index()
+
+
+def mandatory_completion(answers, structure):
+    """(par section, par question) : questions obligatoires affichées, répondues et taux de complétude."""
+    mandatory = [q.id for q in structure.questions.values() if q.mandatory and q.id != COMMENT_ID]
+    df = answers[answers['question_id'].isin(mandatory)]
+    frame = pd.DataFrame({
+        'section': _stripped_labels(df['phase_name']),
+        'question_id': df['question_id'].values,
+        'answered': _is_answered(df, _file_counts(df['file_refs'])).values,
+    })
+    by_section = frame.groupby('section', observed=True).agg(reponses=('answered', 'size'), completees=('answered', 'sum'))
+    by_section['taux_completude'] = (by_section['completees'] / by_section['reponses']).round(4)
+    by_question = frame.groupby(['section', 'question_id'], observed=True).agg(reponses=('answered', 'size'), completees=('answered', 'sum'))
+    by_question['taux_completude'] = (by_question['completees'] / by_question['reponses']).round(4)
+    texts = pd.Series({q.id: q.text for q in structure.questions.values()}, name='question')
+    by_question = by_question.reset_index().merge(texts, left_on='question_id', right_index=True, how='left')
+    by_question = by_question.sort_values(['taux_completude', 'reponses'], ascending=[True, False], kind='stable')
+    return by_section.reset_index(), by_question.reset_index(drop=True)
+
+
+def compute(answers, structure, sites):
+    """Tous les indicateurs, sous forme de DataFrames indexés par REPORT_TABLES."""
+    phases = phase_photo_gaps(answers, structure, sites)
+    by_section, by_question = mandatory_completion(answers, structure)
+    dates = answers['date'].dropna().astype(str)
+    summary = pd.DataFrame([{
+        'soumissions': answers['submission_id'].nunique(),
+        'projets': answers['projet'].nunique(),
+        'phases_controlees': int(phases['checked'].sum()),
+        'taux_ecart': round(float(phases.loc[phases['checked'], 'gap'].mean()), 4) if phases['checked'].any() else None,
+        'taux_completude': round(float(by_section['completees'].sum() / by_section['reponses'].sum()), 4) if len(by_section) else None,
+        'premiere_date': dates.min() if len(dates) else None,
+        'derniere_date': dates.max() if len(dates) else None,
+    }])
+    return {
+        'resume': summary,
+        'ecarts_section': _gap_summary(phases, ['section']),
+        'ecarts_fournisseur': _gap_summary(phases, ['section', 'fournisseur']),
+        'obligatoires_section': by_section,
+        'obligatoires_question': by_question,
+    }
+
+
+def build_report(store, questions, sites, date_from=None, date_to=None):
+    structure = build_form_structure(questions)
+    return compute(load_answers(store, structure, date_from, date_to), structure, sites)
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indicateurs transverses sur les audits enregistrés.")
+    parser.add_argument("--since", help="Date minimale AAAA-MM-JJ (incluse)")
+    parser.add_argument("--until", help="Date maximale AAAA-MM-JJ (incluse)")
+    parser.add_argument("--answers-db", default=os.environ.get('VISITE_ANSWERS_DB', DEFAULT_ANSWERS_PATH), help="Base des réponses détaillées")
+    parser.add_argument("--questions", help="Fichier .parquet/.csv de l'onglet 'Questions' (défaut : copie locale)")
+    parser.add_argument("--sites", help="Fichier .parquet/.csv de l'onglet 'Sites' (défaut : copie locale)")
+    parser.add_argument("--snapshots", default=os.environ.get('VISITE_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR))
+    parser.add_argument("--output", help="Dossier où écrire chaque tableau")
+    parser.add_argument("--format", choices=('csv', 'json'), default='csv', help="Format des fichiers écrits avec --output")
+    args = parser.parse_args(argv)
+
+    questions, sites = load_tables(args.questions, args.sites, args.snapshots)
+    if questions is None:
+        print("Onglet 'Questions' introuvable : lancez l'application une fois ou utilisez --questions.", file=sys.stderr)
+        return 2
+    if not os.path.exists(args.answers_db):
+        print(f"Base des réponses introuvable : {args.answers_db} (voir migrate_answers.py).", file=sys.stderr)
+        return 2
+
+    start = datetime.now()
+    report = build_report(AnswerStore(args.answers_db), questions, sites, args.since, args.until)
+    elapsed = (datetime.now() - start).total_seconds()
+    with pd.option_context('display.width', 160, 'display.max_columns', 20, 'display.max_rows', 40):
+        for name in REPORT_TABLES:
+            table = report[name].head(20) if name == 'obligatoires_question' else report[name]
+            print(f"\n== {name} ==")
+            print(table.to_string(index=False) if len(table) else "(aucune donnée)")
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        for name in REPORT_TABLES:
+            path = os.path.join(args.output, f"{name}.{args.format}")
+            if args.format == 'csv': report[name].to_csv(path, index=False, sep=';', encoding='utf-8-sig')
+            else: report[name].to_json(path, orient='records', force_ascii=False, indent=2)
+        print(f"\nTableaux écrits dans '{args.output}'.")
+    print(f"\nCalculé en {elapsed:.1f} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
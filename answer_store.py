@@ -0,0 +1,156 @@
+# answer_store.py
+# Stockage "long" des réponses : une ligne par (soumission, phase, question), indexée par projet et par question.
+# Alimenté à chaque sauvegarde (miroir de la file de sauvegarde) et par migrate_answers.py pour l'historique.
+import json
+import os
+import sqlite3
+import threading
+
+DEFAULT_ANSWERS_PATH = os.path.join("data", "answers.db")
+ANSWER_COLUMNS = [
+    "submission_id", "date", "projet", "phase_index", "phase_name",
+    "question_id", "value", "value_num", "file_refs",
+]
+_FILE_PREFIXES = ("Fichiers: ", "Fichier: ")
+
+
+def _file_refs(value):
+    # save_form_data remplace les photos par "Fichiers: a.jpg, b.jpg" dans Donnees_JSON
+    if not isinstance(value, str): return None
+    for prefix in _FILE_PREFIXES:
+        if value.startswith(prefix):
+            return [name.strip() for name in value[len(prefix):].split(",") if name.strip()]
+    return None
+
+
+def explode_record(record):
+    """Lignes (ANSWER_COLUMNS) d'une soumission ; lève ValueError si Donnees_JSON est illisible."""
+    try:
+        phases = json.loads(record.get("Donnees_JSON") or "[]")
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Donnees_JSON illisible : {e}")
+    rows = []
+    for phase_index, phase in enumerate(phases):
+        for key, value in (phase.get("answers") or {}).items():
+            try: question_id = int(key)
+            except (TypeError, ValueError): continue
+            files = _file_refs(value)
+            value_num = None
+            if files is not None:
+                text = None
+            elif value is None or isinstance(value, str):
+                text = value
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                text, value_num = str(value), float(value)
+            else:
+                text = json.dumps(value, ensure_ascii=False)
+            rows.append((
+                str(record.get("ID")), record.get("Date"), record.get("Projet"), phase_index, phase.get("phase_name"),
+                question_id, text, value_num, json.dumps(files, ensure_ascii=False) if files is not None else None,
+            ))
+    return rows
+
+
+class AnswerStore:
+    """
+    Table 'reponses_long' (SQLite). append() a la même signature que les stores de soumissions :
+    il est idempotent (les lignes d'une soumission sont remplacées, jamais dupliquées).
+    """
+    name = "answers"
+
+    def __init__(self, path=DEFAULT_ANSWERS_PATH):
+        self.path = path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _ensure_schema(self):
+        if self._initialized: return
+        with self._init_lock:
+            if self._initialized: return
+            folder = os.path.dirname(self.path)
+            if folder: os.makedirs(folder, exist_ok=True)
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS reponses_long ("
+                        " submission_id TEXT NOT NULL, date TEXT, projet TEXT, phase_index INTEGER NOT NULL,"
+                        " phase_name TEXT, question_id INTEGER NOT NULL, value TEXT, value_num REAL, file_refs TEXT,"
+                        " PRIMARY KEY (submission_id, phase_index, question_id))"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_long_question ON reponses_long (question_id, projet)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_long_projet ON reponses_long (projet, question_id)")
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def append(self, record, check_existing=False):
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Écrit plusieurs soumissions en une transaction ; retourne le nombre de lignes écrites."""
+        return self.append_rows([(str(r.get("ID")), explode_record(r)) for r in records])
+
+    def append_rows(self, exploded):
+        """Comme append_many, pour des soumissions déjà éclatées : [(submission_id, lignes explode_record)]."""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("DELETE FROM reponses_long WHERE submission_id = ?", [(sid,) for sid, _ in exploded])
+                rows = [row for _, rs in exploded for row in rs]
+                conn.executemany(
+                    f"INSERT INTO reponses_long ({', '.join(ANSWER_COLUMNS)}) VALUES ({', '.join('?' * len(ANSWER_COLUMNS))})",
+                    rows,
+                )
+        finally:
+            conn.close()
+        return len(rows)
+
+    def existing_ids(self):
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            return {row[0] for row in conn.execute("SELECT DISTINCT submission_id FROM reponses_long")}
+        finally:
+            conn.close()
+
+    def query(self, question_id=None, project=None, columns=ANSWER_COLUMNS, question_ids=None, date_from=None, date_to=None):
+        """
+        DataFrame des réponses filtrées par question(s), projet et/ou dates 'AAAA-MM-JJ'
+        (bornes incluses) ; les filtres par question et par projet utilisent les index.
+        """
+        import pandas as pd
+        self._ensure_schema()
+        clauses, params = [], []
+        if question_id is not None:
+            clauses.append("question_id = ?")
+            params.append(int(question_id))
+        if question_ids is not None:
+            question_ids = sorted({int(q) for q in question_ids})
+            clauses.append(f"question_id IN ({','.join('?' * len(question_ids))})" if question_ids else "0")
+            params.extend(question_ids)
+        if project is not None:
+            clauses.append("projet = ?")
+            params.append(project)
+        if date_from:
+            clauses.append("substr(date, 1, 10) >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("substr(date, 1, 10) <= ?")
+            params.append(date_to)
+        sql = f"SELECT {', '.join(columns)} FROM reponses_long"
+        if clauses: sql += " WHERE " + " AND ".join(clauses)
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(sql + " ORDER BY date, submission_id, phase_index", conn, params=params)
+        finally:
+            conn.close()
+
+    def describe(self):
+        return f"Réponses détaillées SQLite ({self.path})"
@@ -0,0 +1,92 @@
+# answers.py
+# Index des réponses de l'audit en cours, maintenu incrémentalement.
+
+
+class AnswerView:
+    """
+    Vue fusionnée (réponses de la phase en cours par-dessus les phases validées),
+    sans copie : équivalent de {**past, **current} en lecture.
+    """
+    __slots__ = ('current', 'past')
+
+    def __init__(self, current, past):
+        self.current = current
+        self.past = past
+
+    def get(self, key, default=None):
+        current = self.current
+        if key in current: return current[key]
+        return self.past.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.current or key in self.past
+
+    def __getitem__(self, key):
+        current = self.current
+        if key in current: return current[key]
+        return self.past[key]
+
+
+class AnswerIndex:
+    """
+    Réponses de toutes les phases validées, fusionnées dans un seul dict
+    (la phase la plus récente l'emporte). Mis à jour à chaque phase ajoutée
+    plutôt que reconstruit à chaque vérification de condition.
+    """
+
+    def __init__(self, collected_data=()):
+        self.answers = {}
+        self.phase_count = 0
+        for phase in collected_data:
+            self.add_phase(phase)
+
+    def add_phase(self, phase):
+        self.answers.update(phase['answers'])
+        self.phase_count += 1
+
+    def is_in_sync(self, collected_data):
+        return self.phase_count == len(collected_data)
+
+    def view(self, current_answers):
+        return AnswerView(current_answers, self.answers)
+
+
+_UNSEEN = object()
+
+
+class VisibilityCache:
+    """
+    Visibilité des questions d'une section, conservée entre reruns : seules les questions
+    dépendant (transitivement, voir FormStructure.transitive_dependents) d'une réponse
+    modifiée depuis le passage précédent voient leur condition réévaluée.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.visible = {}
+        self.seen = {}
+        self.dirty = set()
+
+    def refresh(self, structure, section_name, answer_view):
+        """Début d'un passage : invalide les dépendants des réponses lues par la section et modifiées."""
+        changed = []
+        for ref in structure.section_refs(section_name):
+            value = answer_view.get(ref, _UNSEEN)
+            if value != self.seen.get(ref, _UNSEEN):
+                self.seen[ref] = value
+                changed.append(ref)
+        if changed: self.dirty |= structure.transitive_dependents(changed)
+
+    def note_answer(self, structure, q_id, answer_view):
+        """Après le rendu d'une question conditionnante : ses dépendants suivants sont réévalués si elle a changé."""
+        value = answer_view.get(q_id, _UNSEEN)
+        if value != self.seen.get(q_id, _UNSEEN):
+            self.seen[q_id] = value
+            self.dirty |= structure.transitive_dependents((q_id,))
+
+    def is_visible(self, question, answer_view):
+        q_id = question.id
+        if q_id in self.dirty or q_id not in self.visible:
+            self.visible[q_id] = question.condition.evaluate(answer_view)
+            self.dirty.discard(q_id)
+        return self.visible[q_id]
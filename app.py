@@ -1,10 +1,13 @@
 # app.py
 import streamlit as st
-import pandas as pd
+import logging
 import uuid
 import urllib.parse
 from datetime import datetime
 import tools as utils
+from answers import AnswerIndex, VisibilityCache
+
+logger = logging.getLogger(__name__)
 
 # --- CONFIGURATION ET STYLE (Inchangé) ---
 st.set_page_config(page_title="Formulaire Dynamique - Sheets", layout="centered")
@@ -37,13 +40,20 @@ def init_session_state():
         'iteration_id': str(uuid.uuid4()), 
         'identification_completed': False,
         'data_saved': False,
+        'journal_finished': False,
         'id_rendering_ident': None,
         'form_start_time': None,
         'submission_id': None,
         'show_comment_on_error': False,
-        'df_struct': None,
-        'df_site': None,
-        'last_validation_errors': None 
+        'form_version': None,
+        'site_version': None,
+        'last_validation_errors': None,
+        'answer_index': None,
+        'journal_seq': 0,
+        'journal_draft': None,
+        'resume_notice': None,
+        'visibility_cache': None,
+        'rendering_question_area': False
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -51,38 +61,272 @@ def init_session_state():
 
 init_session_state()
 
+# Durée de chaque exécution du script, par étape (mesures actives si VISITE_METRICS=1)
+utils.start_metrics_dump()
+rerun_timer = utils.metrics.timer('rerun', step=st.session_state['step'])
+
+def rerun():
+    # st.rerun() interrompt le script : l'exécution en cours est mesurée avant
+    rerun_timer.stop()
+    st.rerun()
+
+def get_answer_index():
+    # Index des réponses des phases validées, reconstruit seulement s'il est désynchronisé
+    index = st.session_state.get('answer_index')
+    if index is None or not index.is_in_sync(st.session_state['collected_data']):
+        index = AnswerIndex(st.session_state['collected_data'])
+        st.session_state['answer_index'] = index
+    return index
+
+def get_visibility_cache(phase_name, key_suffix):
+    # Une visibilité mémorisée par phase en cours (et par version de la structure)
+    key = (st.session_state['form_version'], phase_name, key_suffix)
+    cache = st.session_state.get('visibility_cache')
+    if cache is None or cache.key != key:
+        cache = VisibilityCache(key)
+        st.session_state['visibility_cache'] = cache
+    return cache
+
+# La session ne conserve que les identifiants de version ; les objets sont partagés par le registre.
+# Une version libérée (session inactive au-delà de la rétention) est remplacée par la version courante.
+def current_form_structure():
+    structure = utils.get_form_structure(st.session_state['form_version'])
+    if structure is None and st.session_state['form_version'] is not None:
+        version = utils.pin_form_structure()
+        if version is None: return None
+        st.session_state['form_version'] = version
+        st.warning("Session inactive trop longtemps : le formulaire a été rechargé dans sa version actuelle.")
+        structure = utils.get_form_structure(version)
+    return structure
+
+def current_site_catalog():
+    catalog = utils.get_site_catalog(st.session_state['site_version'])
+    if catalog is None and st.session_state['site_version'] is not None:
+        version = utils.pin_site_catalog()
+        if version is None: return None
+        st.session_state['site_version'] = version
+        catalog = utils.get_site_catalog(version)
+    return catalog
+
+def append_phase(entry, journal=True):
+    index = get_answer_index()
+    st.session_state['collected_data'].append(entry)
+    index.add_phase(entry)
+    if journal:
+        try:
+            st.session_state['journal_seq'] = utils.get_audit_journal().append_phase(st.session_state['submission_id'], entry)
+            st.session_state['journal_draft'] = None
+        except Exception as e:
+            journal_unavailable(e)
+
+# --- JOURNAL / REPRISE D'AUDIT ---
+def journal_unavailable(error):
+    logger.warning("Journal local indisponible (audit %s) : %s", st.session_state['submission_id'], error)
+    st.warning(f"Journal local indisponible (reprise impossible en cas de coupure) : {error}")
+
+def save_journal_draft(phase_name):
+    # Brouillon de la phase en cours, réécrit seulement s'il a changé depuis le dernier rerun
+    try:
+        st.session_state['journal_draft'] = utils.get_audit_journal().save_draft(
+            st.session_state['submission_id'], phase_name, st.session_state['current_phase_temp'],
+            previous=st.session_state['journal_draft']
+        )
+    except Exception as e:
+        journal_unavailable(e)
+
+def resume_audit(audit_id):
+    """Recharge un audit depuis le journal (?audit=<submission_id>) ; retourne False s'il est inconnu."""
+    state = utils.get_audit_journal().load(audit_id)
+    if state is None: return False
+    st.session_state['project_data'] = utils.make_site_record(state['project_data'])
+    st.session_state['form_start_time'] = state['form_start']
+    st.session_state['submission_id'] = audit_id
+    st.session_state['collected_data'] = []
+    st.session_state['answer_index'] = None
+    for entry in state['phases']: append_phase(entry, journal=False)
+    st.session_state['journal_seq'] = state['last_seq']
+    st.session_state['journal_draft'] = None
+    # Version de la structure utilisée au début de l'audit, si elle est encore disponible
+    if state['form_version'] and utils.get_form_structure(state['form_version']) is not None:
+        st.session_state['form_version'] = state['form_version']
+    st.session_state['iteration_id'] = str(uuid.uuid4())
+    st.session_state['current_phase_temp'] = {}
+    st.session_state['current_phase_name'] = None
+    st.session_state['show_comment_on_error'] = False
+    st.session_state['last_validation_errors'] = None
+    st.session_state['identification_completed'] = bool(state['phases'])
+    draft = state['draft']
+    if state['finished']:
+        # Audit déjà sauvegardé : la page de fin ne le remet pas en file
+        st.session_state['step'] = 'FINISHED'
+        st.session_state['data_saved'] = True
+        st.session_state['submission_id_final'] = audit_id
+        st.session_state['journal_finished'] = True
+    elif not state['phases']:
+        st.session_state['step'] = 'IDENTIFICATION'
+        if draft: st.session_state['current_phase_temp'] = draft['answers']
+    else:
+        st.session_state['step'] = 'LOOP_DECISION'
+        if draft and draft['phase_name'] != current_form_structure().id_section:
+            st.session_state['step'] = 'FILL_PHASE'
+            st.session_state['current_phase_name'] = draft['phase_name']
+            st.session_state['current_phase_temp'] = draft['answers']
+    notice = f"Audit repris : {len(state['phases'])} phase(s) restaurée(s)."
+    if draft: notice += " Les réponses en cours ont été restaurées ; les photos de la phase en cours sont à rajouter."
+    st.session_state['resume_notice'] = notice
+    return True
+
+def sync_journal():
+    # Même audit ouvert ailleurs (autre onglet / appareil) : seules les phases postérieures sont relues
+    state = utils.get_audit_journal().load(st.session_state['submission_id'], after_seq=st.session_state['journal_seq'])
+    if state is None or not state['phases']: return
+    for entry in state['phases']: append_phase(entry, journal=False)
+    st.session_state['journal_seq'] = state['last_seq']
+
+# --- FRAGMENTS ---
+# Un widget modifié dans un fragment ne relance que ce fragment, pas tout le script
+@st.fragment
+def render_project_summary(project_data, collected_data):
+    project_intitule = project_data.get('Intitulé', 'Projet Inconnu')
+    with st.expander(f"📍 Projet : {project_intitule}", expanded=False):
+        st.markdown(":orange-badge[**Détails du Projet sélectionné :**]")
+        titles = ["Informations générales", "Points de charge Standard", "Points de charge Pré-équipés"]
+        for title, fields in zip(titles, utils.DISPLAY_GROUPS):
+            with st.container(border=True):
+                st.markdown(f"**{title}**")
+                cols = st.columns([1, 1, 1])
+                for i, field_key in enumerate(fields):
+                    renamed_key = utils.PROJECT_RENAME_MAP.get(field_key, field_key)
+                    value = project_data.get(field_key, 'N/A')
+                    with cols[i]: st.markdown(f"**{renamed_key}** : {value}")
+        
+        st.write(":orange-badge[**Phases et Identification déjà complétées :**]")
+        for item in collected_data:
+            st.write(f"• **{item['phase_name']}** : {len(item['answers'])} réponses")
+
+_UNANSWERED = object()
+
+@st.fragment
+def render_leaf_question(question, phase_name, key_suffix, loop_index):
+    # Aucune condition ne dépend de cette question : sa modification ne relance qu'elle-même
+    with utils.metrics.timer('fragment', fragment='question'):
+        answers = st.session_state['current_phase_temp']
+        previous = answers.get(question.id, _UNANSWERED)
+        utils.render_question(question, answers, phase_name, key_suffix, loop_index, st.session_state['project_data'])
+        # Relance de la seule question : brouillon réécrit si sa réponse a changé
+        # (rendu de toute la zone : un seul enregistrement, à la fin de render_question_area)
+        if not st.session_state.get('rendering_question_area') and answers.get(question.id, _UNANSWERED) != previous:
+            save_journal_draft(phase_name)
+
+@st.fragment
+def render_question_area(phase_name, key_suffix, fill_phase=False):
+    # Les questions référencées par une condition sont rendues ici : leur modification
+    # relance la zone entière et donc le calcul de visibilité des autres questions
+    st.session_state['rendering_question_area'] = True
+    try:
+        _render_question_area(phase_name, key_suffix, fill_phase)
+    finally:
+        st.session_state['rendering_question_area'] = False
+    save_journal_draft(phase_name)
+
+def _render_question_area(phase_name, key_suffix, fill_phase):
+    with utils.metrics.timer('fragment', fragment='questions'):
+        form_structure = current_form_structure()
+        answers = st.session_state['current_phase_temp']
+        answer_view = get_answer_index().view(answers)
+        # Conditions réévaluées seulement pour les dépendants des réponses modifiées depuis le dernier passage
+        visibility = get_visibility_cache(phase_name, key_suffix)
+        visibility.refresh(form_structure, phase_name, answer_view)
+        visible_count = 0
+        for idx, question in enumerate(form_structure.section_questions(phase_name)):
+            if fill_phase and question.id == utils.COMMENT_ID: continue
+            if not visibility.is_visible(question, answer_view): continue
+            if question.id in form_structure.condition_refs:
+                utils.render_question(question, answers, phase_name, key_suffix, idx, st.session_state['project_data'])
+                visibility.note_answer(form_structure, question.id, answer_view)
+            else:
+                render_leaf_question(question, phase_name, key_suffix, idx)
+            visible_count += 1
+        
+        if fill_phase:
+            if visible_count == 0 and not st.session_state.get('show_comment_on_error', False):
+                st.warning("Aucune question visible dans cette phase.")
+            if st.session_state.get('show_comment_on_error', False):
+                st.markdown("---")
+                st.markdown("### ✍️ Justification de l'Écart")
+                render_leaf_question(utils.COMMENT_ENTRY, phase_name, key_suffix, 999)
+
 # --- FLUX PRINCIPAL ---
+# Chaque exécution marque les versions de la session comme utilisées (le registre ne les libère pas) ;
+# si elles ne peuvent plus être chargées, retour au chargement des données
+if st.session_state['step'] != 'PROJECT_LOAD' and (current_form_structure() is None or current_site_catalog() is None):
+    st.session_state['resume_notice'] = "Données du formulaire indisponibles : rechargement depuis Google Sheets."
+    st.session_state['step'] = 'PROJECT_LOAD'
+    rerun()
+
+if (st.session_state['step'] in ('LOOP_DECISION', 'FILL_PHASE', 'IDENTIFICATION')
+        and st.query_params.get('audit') == st.session_state['submission_id']):
+    try: sync_journal()
+    except Exception as e: journal_unavailable(e)
 
 st.markdown('<div class="main-header"><h1>📝Formulaire Chantier </h1></div>', unsafe_allow_html=True)
+if st.session_state['resume_notice'] and st.session_state['step'] != 'PROJECT_LOAD':
+    st.info(st.session_state['resume_notice'], icon="♻️")
+    st.session_state['resume_notice'] = None
 
 # 1. CHARGEMENT
 if st.session_state['step'] == 'PROJECT_LOAD':
     st.info("Chargement des données depuis Google Sheets...")
     with st.spinner("Connexion en cours..."):
-        # Nettoyage cache pour être sûr d'avoir les dernières questions
-        utils.load_form_structure_from_sheets.clear()
-        utils.load_site_data_from_sheets.clear()
-        
-        df_struct = utils.load_form_structure_from_sheets()
-        df_site = utils.load_site_data_from_sheets()
+        # Version courante partagée (copie locale) : aucun rechargement forcé pour les autres sessions
+        form_version = utils.pin_form_structure()
+        site_version = utils.pin_site_catalog()
         
-        if df_struct is not None and df_site is not None:
-            st.session_state['df_struct'] = df_struct
-            st.session_state['df_site'] = df_site
+        if form_version is not None and site_version is not None:
+            st.session_state['form_version'] = form_version
+            st.session_state['site_version'] = site_version
             st.session_state['step'] = 'PROJECT'
-            st.rerun()
+            # Reprise d'un audit en cours après rafraîchissement / coupure / redémarrage
+            audit_id = st.query_params.get('audit')
+            if audit_id:
+                try:
+                    if not resume_audit(audit_id): del st.query_params['audit']
+                except Exception as e:
+                    st.session_state['resume_notice'] = f"Reprise de l'audit impossible : {e}"
+            rerun()
         else:
             st.error("Impossible de charger les données. Vérifiez l'URL du Sheet et les noms des onglets ('Questions', 'Sites').")
             if st.button("Réessayer le chargement"):
                 st.session_state['step'] = 'PROJECT_LOAD'
-                st.rerun()
+                rerun()
 
 # 2. SELECTION PROJET (Inchangé)
 elif st.session_state['step'] == 'PROJECT':
-    df_site = st.session_state['df_site']
+    site_catalog = current_site_catalog()
     st.markdown("### 🏗️ Sélection du Chantier")
     
-    if 'Intitulé' not in df_site.columns:
+    if st.button("🔄 Actualiser questions et sites"):
+        ok, message = utils.refresh_structures()
+        if ok:
+            st.session_state['form_version'] = utils.pin_form_structure() or st.session_state['form_version']
+            st.session_state['site_version'] = utils.pin_site_catalog() or st.session_state['site_version']
+            site_catalog = current_site_catalog()
+            st.success(message)
+        else:
+            st.info(message)
+    
+    if st.button("📊 Tableau de bord des audits"):
+        st.session_state['step'] = 'DASHBOARD'
+        rerun()
+    
+    if utils.metrics.ENABLED and st.button("⏱️ Mesures de performance"):
+        st.session_state['step'] = 'METRICS'
+        rerun()
+    
+    if site_catalog is None:
+        st.session_state['step'] = 'PROJECT_LOAD'
+        rerun()
+    if not site_catalog.has_titles:
         st.error("Colonne 'Intitulé' manquante dans les données 'Sites'.")
     else:
         search_term = st.text_input("Rechercher un projet (Veuillez renseigner au minimum 3 caractères pour le nom de la ville)", key="project_search_input").strip()
@@ -90,21 +334,20 @@ elif st.session_state['step'] == 'PROJECT':
         selected_proj = None
         
         if len(search_term) >= 3:
-            mask = df_site['Intitulé'].str.contains(search_term, case=False, na=False)
-            filtered_projects_df = df_site[mask]
-            filtered_projects = [""] + filtered_projects_df['Intitulé'].dropna().unique().tolist()
+            filtered_projects = site_catalog.search(search_term, limit=utils.SEARCH_RESULT_LIMIT)
             if filtered_projects:
-                selected_proj = st.selectbox("Résultats de la recherche", filtered_projects)
+                selected_proj = st.selectbox("Résultats de la recherche", [""] + filtered_projects)
             else:
                 st.warning(f"Aucun projet trouvé pour **'{search_term}'**.")
         elif len(search_term) > 0 and len(search_term) < 3:
             st.info("Veuillez entrer au moins **3 caractères** pour lancer la recherche.")
         
         if selected_proj:
-            row = df_site[df_site['Intitulé'] == selected_proj].iloc[0]
+            # Ligne typée (photos attendues précalculées), trouvée par l'index intitulé -> ligne
+            project_record = site_catalog.record(selected_proj)
             st.info(f"Projet sélectionné : **{selected_proj}**")
             if st.button("✅ Démarrer l'identification"):
-                st.session_state['project_data'] = row.to_dict()
+                st.session_state['project_data'] = project_record
                 st.session_state['form_start_time'] = datetime.now() 
                 st.session_state['submission_id'] = str(uuid.uuid4())
                 st.session_state['step'] = 'IDENTIFICATION'
@@ -112,24 +355,106 @@ elif st.session_state['step'] == 'PROJECT':
                 st.session_state['iteration_id'] = str(uuid.uuid4())
                 st.session_state['show_comment_on_error'] = False
                 st.session_state['last_validation_errors'] = None
-                st.rerun()
+                st.session_state['journal_seq'] = 0
+                st.session_state['journal_draft'] = None
+                try:
+                    utils.get_audit_journal().start(st.session_state['submission_id'], st.session_state['project_data'], st.session_state['form_start_time'], st.session_state['form_version'])
+                    # L'URL identifie l'audit : un rafraîchissement le reprend là où il en était
+                    st.query_params['audit'] = st.session_state['submission_id']
+                except Exception as e:
+                    st.warning(f"Journal local indisponible (reprise impossible en cas de coupure) : {e}")
+                rerun()
+
+# 2 bis. TABLEAU DE BORD (indicateurs sur l'ensemble des audits enregistrés)
+elif st.session_state['step'] == 'DASHBOARD':
+    st.markdown("### 📊 Tableau de bord des audits")
+    if st.button("⬅️ Retour à la sélection du chantier"):
+        st.session_state['step'] = 'PROJECT'
+        rerun()
+    
+    col_from, col_to = st.columns(2)
+    date_from = col_from.date_input("Du", value=None, key="dashboard_from")
+    date_to = col_to.date_input("Au", value=None, key="dashboard_to")
+    
+    try:
+        with st.spinner("Calcul des indicateurs..."):
+            report = utils.load_analytics(
+                st.session_state['form_version'], st.session_state['site_version'],
+                date_from.isoformat() if date_from else None, date_to.isoformat() if date_to else None,
+            )
+    except Exception as e:
+        st.error(f"Indicateurs indisponibles : {e}")
+        report = None
+    
+    if report is not None and report['resume']['soumissions'].iloc[0] == 0:
+        st.info("Aucun audit enregistré sur la période (voir migrate_answers.py pour l'historique).")
+    elif report is not None:
+        summary = report['resume'].iloc[0]
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Audits", int(summary['soumissions']))
+        c2.metric("Projets", int(summary['projets']))
+        c3.metric("Phases en écart photo", "-" if summary['taux_ecart'] is None else f"{summary['taux_ecart']:.1%}")
+        c4.metric("Obligatoires complétées", "-" if summary['taux_completude'] is None else f"{summary['taux_completude']:.1%}")
+        
+        st.markdown("#### 📸 Écarts de photos par section")
+        st.dataframe(report['ecarts_section'], hide_index=True, use_container_width=True)
+        
+        st.markdown("#### 🏭 Écarts de photos par fournisseur")
+        by_supplier = report['ecarts_fournisseur']
+        if len(by_supplier):
+            st.bar_chart(by_supplier.pivot(index='fournisseur', columns='section', values='taux_ecart'))
+        st.dataframe(by_supplier, hide_index=True, use_container_width=True)
+        
+        st.markdown("#### ✅ Complétude des questions obligatoires")
+        st.dataframe(report['obligatoires_section'], hide_index=True, use_container_width=True)
+        with st.expander("Questions obligatoires les moins renseignées"):
+            st.dataframe(report['obligatoires_question'].head(50), hide_index=True, use_container_width=True)
+
+# 2 ter. MESURES DE PERFORMANCE (administration)
+elif st.session_state['step'] == 'METRICS':
+    st.markdown("### ⏱️ Mesures de performance")
+    if st.button("⬅️ Retour à la sélection du chantier"):
+        st.session_state['step'] = 'PROJECT'
+        rerun()
+    
+    snapshot = utils.metrics.REGISTRY.snapshot()
+    st.caption(f"Depuis le {datetime.fromtimestamp(snapshot['started']).strftime('%d/%m/%Y %H:%M:%S')} (processus courant, toutes sessions).")
+    ms = lambda v: None if v is None else round(v * 1000, 1)
+    durations = [
+        {"Opération": h['operation'], "Détail": ", ".join(f"{k}={v}" for k, v in h['labels'].items()), "Appels": h['count'],
+         "Moyenne (ms)": ms(h['mean_s']), "p50 (ms)": ms(h['p50_s']), "p95 (ms)": ms(h['p95_s']), "Max (ms)": ms(h['max_s'])}
+        for h in snapshot['histograms']
+    ]
+    volumes = [
+        {"Compteur": c['name'], "Détail": ", ".join(f"{k}={v}" for k, v in c['labels'].items()), "Valeur": c['value']}
+        for c in snapshot['counters']
+    ]
+    st.markdown("#### Durées")
+    if durations: st.dataframe(durations, hide_index=True, use_container_width=True)
+    else: st.info("Aucune mesure pour l'instant.")
+    st.markdown("#### Volumes")
+    if volumes: st.dataframe(volumes, hide_index=True, use_container_width=True)
+    
+    col_json, col_prom, col_reset = st.columns(3)
+    with col_json:
+        st.download_button("JSON", utils.metrics.REGISTRY.to_json(), "mesures.json", 'application/json', use_container_width=True)
+    with col_prom:
+        st.download_button("Prometheus", utils.metrics.REGISTRY.to_prometheus(), "mesures.prom", 'text/plain', use_container_width=True)
+    with col_reset:
+        if st.button("Remettre à zéro", use_container_width=True):
+            utils.metrics.REGISTRY.reset()
+            rerun()
 
 # 3. IDENTIFICATION (Inchangé)
 elif st.session_state['step'] == 'IDENTIFICATION':
-    df = st.session_state['df_struct']
-    ID_SECTION_NAME = df['section'].iloc[0]
+    form_structure = current_form_structure()
+    ID_SECTION_NAME = form_structure.id_section
     st.markdown(f"### 👤 Étape unique : {ID_SECTION_NAME}")
     
-    identification_questions = df[df['section'] == ID_SECTION_NAME].copy()
-    identification_questions['id_temp'] = pd.to_numeric(identification_questions['id'], errors='coerce').fillna(0)
-    identification_questions = identification_questions.sort_values(by='id_temp')
-
     if st.session_state['id_rendering_ident'] is None: st.session_state['id_rendering_ident'] = str(uuid.uuid4())
     rendering_id = st.session_state['id_rendering_ident']
     
-    for idx, (index, row) in enumerate(identification_questions.iterrows()):
-        if utils.check_condition(row, st.session_state['current_phase_temp'], st.session_state['collected_data']):
-            utils.render_question(row, st.session_state['current_phase_temp'], ID_SECTION_NAME, rendering_id, idx, st.session_state['project_data'])
+    render_question_area(ID_SECTION_NAME, rendering_id)
             
     if st.session_state['last_validation_errors']:
         st.markdown(
@@ -140,66 +465,32 @@ elif st.session_state['step'] == 'IDENTIFICATION':
     st.markdown("---")
     if st.button("✅ Valider l'identification"):
         st.session_state['last_validation_errors'] = None
-        df_struct = st.session_state.get('df_struct')
-        if df_struct is None:
+        form_structure = current_form_structure()
+        if form_structure is None:
             st.error("Structure du formulaire manquante. Veuillez recharger le projet.")
-            st.rerun()
+            rerun()
         
-        is_valid, errors = utils.validate_section(df_struct, ID_SECTION_NAME, st.session_state['current_phase_temp'], st.session_state['collected_data'], st.session_state['project_data'])
+        is_valid, errors = utils.validate_section(form_structure, ID_SECTION_NAME, st.session_state['current_phase_temp'], get_answer_index(), st.session_state['project_data'])
         
         if is_valid:
             id_entry = {"phase_name": ID_SECTION_NAME, "answers": st.session_state['current_phase_temp'].copy()}
-            st.session_state['collected_data'].append(id_entry)
+            append_phase(id_entry)
             st.session_state['identification_completed'] = True
             st.session_state['step'] = 'LOOP_DECISION'
             st.session_state['current_phase_temp'] = {}
             st.session_state['show_comment_on_error'] = False
             st.session_state['last_validation_errors'] = None 
             st.success("Identification validée.")
-            st.rerun()
+            rerun()
         else:
             cleaned_errors = [str(e) for e in errors if e is not None]
             html_errors = '<br>'.join([f"- {e}" for e in cleaned_errors])
             st.session_state['last_validation_errors'] = html_errors
-            st.rerun()
+            rerun()
 
 # 4. BOUCLE PHASES (Inchangé)
 elif st.session_state['step'] in ['LOOP_DECISION', 'FILL_PHASE']:
-    project_intitule = st.session_state['project_data'].get('Intitulé', 'Projet Inconnu')
-    with st.expander(f"📍 Projet : {project_intitule}", expanded=False):
-        project_details = st.session_state['project_data']
-        st.markdown(":orange-badge[**Détails du Projet sélectionné :**]")
-        
-        with st.container(border=True):
-            st.markdown("**Informations générales**")
-            cols1 = st.columns([1, 1, 1]) 
-            fields_l1 = utils.DISPLAY_GROUPS[0]
-            for i, field_key in enumerate(fields_l1):
-                renamed_key = utils.PROJECT_RENAME_MAP.get(field_key, field_key)
-                value = project_details.get(field_key, 'N/A')
-                with cols1[i]: st.markdown(f"**{renamed_key}** : {value}")
-                    
-        with st.container(border=True):
-            st.markdown("**Points de charge Standard**")
-            cols2 = st.columns([1, 1, 1])
-            fields_l2 = utils.DISPLAY_GROUPS[1]
-            for i, field_key in enumerate(fields_l2):
-                renamed_key = utils.PROJECT_RENAME_MAP.get(field_key, field_key)
-                value = project_details.get(field_key, 'N/A')
-                with cols2[i]: st.markdown(f"**{renamed_key}** : {value}")
-
-        with st.container(border=True):
-            st.markdown("**Points de charge Pré-équipés**")
-            cols3 = st.columns([1, 1, 1])
-            fields_l3 = utils.DISPLAY_GROUPS[2]
-            for i, field_key in enumerate(fields_l3):
-                renamed_key = utils.PROJECT_RENAME_MAP.get(field_key, field_key)
-                value = project_details.get(field_key, 'N/A')
-                with cols3[i]: st.markdown(f"**{renamed_key}** : {value}")
-        
-        st.write(":orange-badge[**Phases et Identification déjà complétées :**]")
-        for idx, item in enumerate(st.session_state['collected_data']):
-            st.write(f"• **{item['phase_name']}** : {len(item['answers'])} réponses")
+    render_project_summary(st.session_state['project_data'], st.session_state['collected_data'])
 
     if st.session_state['step'] == 'LOOP_DECISION':
         st.markdown("### 🔄 Gestion des Phases")
@@ -212,23 +503,16 @@ elif st.session_state['step'] in ['LOOP_DECISION', 'FILL_PHASE']:
                 st.session_state['iteration_id'] = str(uuid.uuid4())
                 st.session_state['show_comment_on_error'] = False
                 st.session_state['last_validation_errors'] = None
-                st.rerun()
+                rerun()
         with col2:
             if st.button("🏁 Terminer l'audit"):
                 st.session_state['step'] = 'FINISHED'
-                st.rerun()
+                rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
     elif st.session_state['step'] == 'FILL_PHASE':
-        df = st.session_state['df_struct']
-        ID_SECTION_NAME = df['section'].iloc[0]
-        ID_SECTION_CLEAN = str(ID_SECTION_NAME).strip().lower()
-        SECTIONS_TO_EXCLUDE_CLEAN = {ID_SECTION_CLEAN, "phase"} 
-        all_sections_raw = df['section'].unique().tolist()
-        available_phases = []
-        for sec in all_sections_raw:
-            if pd.isna(sec) or not sec or str(sec).strip().lower() in SECTIONS_TO_EXCLUDE_CLEAN: continue
-            available_phases.append(sec)
+        form_structure = current_form_structure()
+        available_phases = list(form_structure.phases)
         
         if not st.session_state['current_phase_name']:
               st.markdown("### 📑 Sélection de la phase")
@@ -237,13 +521,13 @@ elif st.session_state['step'] in ['LOOP_DECISION', 'FILL_PHASE']:
                   st.session_state['current_phase_name'] = phase_choice
                   st.session_state['show_comment_on_error'] = False 
                   st.session_state['last_validation_errors'] = None
-                  st.rerun()
+                  rerun()
               if st.button("⬅️ Retour"):
                   st.session_state['step'] = 'LOOP_DECISION'
                   st.session_state['current_phase_temp'] = {}
                   st.session_state['show_comment_on_error'] = False
                   st.session_state['last_validation_errors'] = None
-                  st.rerun()
+                  rerun()
         else:
             current_phase = st.session_state['current_phase_name']
             st.markdown(f"### 📝 {current_phase}")
@@ -253,28 +537,10 @@ elif st.session_state['step'] in ['LOOP_DECISION', 'FILL_PHASE']:
                 st.session_state['iteration_id'] = str(uuid.uuid4())
                 st.session_state['show_comment_on_error'] = False
                 st.session_state['last_validation_errors'] = None
-                st.rerun()
+                rerun()
             st.divider()
             
-            section_questions = df[df['section'] == current_phase].copy()
-            section_questions['id_temp'] = pd.to_numeric(section_questions['id'], errors='coerce').fillna(0)
-            section_questions = section_questions.sort_values(by='id_temp')
-
-            visible_count = 0
-            for idx, (index, row) in enumerate(section_questions.iterrows()):
-                if int(row.get('id', 0)) == utils.COMMENT_ID: continue
-                if utils.check_condition(row, st.session_state['current_phase_temp'], st.session_state['collected_data']):
-                    utils.render_question(row, st.session_state['current_phase_temp'], current_phase, st.session_state['iteration_id'], idx, st.session_state['project_data'])
-                    visible_count += 1
-            
-            if visible_count == 0 and not st.session_state.get('show_comment_on_error', False):
-                st.warning("Aucune question visible dans cette phase.")
-
-            if st.session_state.get('show_comment_on_error', False):
-                st.markdown("---")
-                st.markdown("### ✍️ Justification de l'Écart")
-                comment_row = pd.Series({'id': utils.COMMENT_ID, 'type': 'text'}) 
-                utils.render_question(comment_row, st.session_state['current_phase_temp'], current_phase, st.session_state['iteration_id'], 999, st.session_state['project_data']) 
+            render_question_area(current_phase, st.session_state['iteration_id'], fill_phase=True)
             
             if st.session_state['last_validation_errors']:
                 st.markdown(
@@ -290,47 +556,47 @@ elif st.session_state['step'] in ['LOOP_DECISION', 'FILL_PHASE']:
                     st.session_state['current_phase_temp'] = {}
                     st.session_state['show_comment_on_error'] = False
                     st.session_state['last_validation_errors'] = None
-                    st.rerun()
+                    rerun()
             with c2:
                 if st.button("💾 Valider la phase"):
                     st.session_state['show_comment_on_error'] = False
                     st.session_state['last_validation_errors'] = None
 
-                    df_struct = st.session_state.get('df_struct')
-                    if df_struct is None:
+                    form_structure = current_form_structure()
+                    if form_structure is None:
                         st.error("Structure du formulaire manquante. Veuillez recharger le projet.")
-                        st.rerun()
+                        rerun()
                         st.stop()
                     
                     try:
                         is_valid, errors = utils.validate_section(
-                            df_struct, 
+                            form_structure, 
                             current_phase, 
                             st.session_state['current_phase_temp'], 
-                            st.session_state['collected_data'], 
+                            get_answer_index(), 
                             st.session_state['project_data']
                         )
                     except AttributeError as e:
                         st.session_state['last_validation_errors'] = f"Erreur critique dans la validation : {e}"
                         st.error(f"Erreur interne : {e}. Veuillez contacter le support.")
                         st.session_state['show_comment_on_error'] = True 
-                        st.rerun()
+                        rerun()
                         st.stop()
 
                     if is_valid:
                         new_entry = {"phase_name": current_phase, "answers": st.session_state['current_phase_temp'].copy()}
-                        st.session_state['collected_data'].append(new_entry)
+                        append_phase(new_entry)
                         st.success("Phase validée et enregistrée !")
                         st.session_state['step'] = 'LOOP_DECISION'
                         st.session_state['last_validation_errors'] = None
-                        st.rerun()
+                        rerun()
                     else:
                         cleaned_errors = [str(e) for e in errors if e is not None]
                         is_photo_error = any(f"Commentaire (ID {utils.COMMENT_ID})" in e for e in cleaned_errors)
                         if is_photo_error: st.session_state['show_comment_on_error'] = True
                         html_errors = '<br>'.join([f"- {e}" for e in cleaned_errors])
                         st.session_state['last_validation_errors'] = html_errors
-                        st.rerun()
+                        rerun()
             st.markdown('</div>', unsafe_allow_html=True)
 
 # 5. FIN / EXPORTS (Inchangé)
@@ -340,60 +606,105 @@ elif st.session_state['step'] == 'FINISHED':
     st.write(f"Projet : **{project_name}**")
     st.warning('Il est attendu que vous téléchargiez le rapport Word ci-dessous pour le transmettre à votre interlocuteur.', icon="⚠️")
     
-    # 1. SAUVEGARDE GOOGLE SHEETS
+    # 1. SAUVEGARDE (file locale durable, écrite en arrière-plan dans le backend configuré)
+    store_label = utils.get_submission_store().describe()
     if not st.session_state['data_saved']:
-        with st.spinner("Sauvegarde des réponses dans Google Sheets..."):
-            success, result_message = utils.save_form_data(
-                st.session_state['collected_data'], 
-                st.session_state['project_data'],
-                st.session_state['submission_id'],
-                st.session_state['form_start_time']
-            )
+        success, result_message = utils.save_form_data(
+            st.session_state['collected_data'], 
+            st.session_state['project_data'],
+            st.session_state['submission_id'],
+            st.session_state['form_start_time']
+        )
 
-            if success:
-                st.session_state['data_saved'] = True
-                st.session_state['submission_id_final'] = result_message
-            else:
-                st.error(f"Erreur lors de la sauvegarde : {result_message}")
-                if st.button("Réessayer la sauvegarde"):
-                    st.rerun()
-    else:
-        st.info(f"Les données sont sauvegardées dans Google Sheets (ID: {st.session_state.get('submission_id_final', 'N/A')})")
+        if success:
+            st.session_state['data_saved'] = True
+            st.session_state['submission_id_final'] = result_message
+        else:
+            st.error(f"Erreur lors de la sauvegarde : {result_message}")
+            if st.button("Réessayer la sauvegarde"):
+                rerun()
+
+    # Audit marqué terminé dans le journal (sinon il resterait repris comme en cours) : réessayé à chaque exécution
+    if st.session_state['data_saved'] and not st.session_state['journal_finished']:
+        try:
+            utils.get_audit_journal().finish(st.session_state['submission_id'])
+            st.session_state['journal_finished'] = True
+        except Exception as e:
+            journal_unavailable(e)
+
+    # Statut rafraîchi seul toutes les 3 s tant que la sauvegarde est en attente, sans relancer les exports
+    @st.fragment(run_every=3)
+    def show_save_status():
+        submission_id = st.session_state.get('submission_id_final')
+        status = utils.get_save_status(submission_id) if submission_id else None
+        if status is None: return
+        # Sauvegarde terminée : relance complète, le message final est affiché hors du fragment (fin du suivi)
+        if status['status'] == utils.DONE: rerun()
+        message = f"⏳ Sauvegarde en cours dans {store_label} (ID: {submission_id})"
+        if status['last_error']:
+            wait = max(0, int(status['next_attempt'] - datetime.now().timestamp()))
+            message += f" — tentative {status['attempts']} en échec ({status['last_error']}), nouvel essai dans {wait} s."
+            st.warning(message)
+            if st.button("Réessayer la sauvegarde maintenant"):
+                utils.retry_save(submission_id)
+        else:
+            st.info(message)
 
     if st.session_state['data_saved']:
-        csv_data = utils.create_csv_export(
+        submission_id = st.session_state.get('submission_id_final')
+        status = utils.get_save_status(submission_id) if submission_id else None
+        if status is not None and status['status'] == utils.DONE:
+            st.info(f"Les données sont sauvegardées dans {store_label} (ID: {submission_id})")
+        elif status is not None:
+            show_save_status()
+
+    # Panneau d'export isolé : changer la qualité des photos ou télécharger ne relance que ce panneau
+    @st.fragment
+    def render_export_panel():
+        # Exports spoolés (mémoire puis disque), mémorisés par soumission et contenu des réponses ;
+        # les octets ne sont lus qu'au clic sur le bouton
+        export_cache = utils.get_export_cache()
+        export_key = (st.session_state['submission_id'], utils.answers_fingerprint(st.session_state['collected_data']))
+        csv_export = export_cache.get_or_build(('csv',) + export_key, lambda: utils.create_csv_export(
             st.session_state['collected_data'], 
-            st.session_state['df_struct'], 
+            current_form_structure(), 
             project_name, 
             st.session_state['submission_id'], 
             st.session_state['form_start_time']
-        )
-        zip_buffer = utils.create_zip_export(st.session_state['collected_data'])
+        ))
+        zip_export = export_cache.get_or_build(('zip',) + export_key, lambda: utils.create_zip_export(st.session_state['collected_data']))
         date_str = datetime.now().strftime('%Y%m%d_%H%M')
         
         st.markdown("### 📥 Télécharger les fichiers")
+        profile_keys = list(utils.IMAGE_PROFILES)
+        image_profile = st.selectbox(
+            "Qualité des photos du rapport Word", profile_keys,
+            index=profile_keys.index(utils.DEFAULT_IMAGE_PROFILE) if utils.DEFAULT_IMAGE_PROFILE in profile_keys else 0,
+            format_func=lambda k: utils.IMAGE_PROFILES[k].label
+        )
         col_csv, col_zip, col_word = st.columns(3)
         
         file_name_csv = f"Export_{project_name}_{date_str}.csv"
         with col_csv:
-            st.download_button("📄 CSV", csv_data, file_name_csv, 'text/csv', use_container_width=True)
+            st.download_button("📄 CSV", csv_export.read, file_name_csv, 'text/csv', use_container_width=True)
 
-        if zip_buffer:
+        if zip_export:
             file_name_zip = f"Photos_{project_name}_{date_str}.zip"
             with col_zip:
-                st.download_button("📸 ZIP Photos", zip_buffer.getvalue(), file_name_zip, 'application/zip', use_container_width=True)
+                st.download_button("📸 ZIP Photos", zip_export.read, file_name_zip, 'application/zip', use_container_width=True)
         
+        file_name_word = f"Rapport_{project_name}_{date_str}.docx"
         with st.spinner("Génération du rapport Word..."):
             try:
-                word_buffer = utils.create_word_report(
+                word_export = export_cache.get_or_build(('word', image_profile) + export_key, lambda: utils.create_word_report(
                     st.session_state['collected_data'],
-                    st.session_state['df_struct'],
+                    current_form_structure(),
                     st.session_state['project_data'],
-                    st.session_state['form_start_time']
-                )
-                file_name_word = f"Rapport_{project_name}_{date_str}.docx"
+                    st.session_state['form_start_time'],
+                    image_profile=image_profile
+                ))
                 with col_word:
-                    st.download_button("📋 Rapport Word", word_buffer.getvalue(), file_name_word, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', use_container_width=True)
+                    st.download_button("📋 Rapport Word", word_export.read, file_name_word, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', use_container_width=True)
             except Exception as e:
                 st.error(f"Erreur rapport Word : {e}")
     
@@ -407,7 +718,13 @@ elif st.session_state['step'] == 'FINISHED':
         
         st.markdown(f'<a href="{mailto_link}" target="_blank" style="text-decoration: none;"><button style="background-color: #E9630C; color: white; border: none; padding: 10px 20px; border-radius: 8px; width: 100%; font-size: 16px; cursor: pointer;">📧 Ouvrir l\'application Email</button></a>', unsafe_allow_html=True)
 
+    if st.session_state['data_saved']:
+        render_export_panel()
+
     st.markdown("---")
     if st.button("🔄 Recommencer l'audit"):
         st.session_state.clear()
-        st.rerun()
+        st.query_params.clear()
+        rerun()
+
+rerun_timer.stop()
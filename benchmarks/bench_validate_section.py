@@ -0,0 +1,34 @@
+# benchmarks/bench_validate_section.py
+# Compare la validation d'origine (legacy_validation.py, copie du commit initial) au plan précompilé.
+# Usage : python benchmarks/bench_validate_section.py [nb_questions ...]
+# (Les générateurs sont partagés avec la suite complète : benchmarks/synthetic.py, benchmarks/suite.py)
+import sys
+import timeit
+
+import legacy_validation
+from synthetic import PROJECT, SECTION, make_answers, make_questions_df
+
+import core
+from answers import AnswerIndex
+
+
+def run(n_questions, repeat=5):
+    raw = make_questions_df(1, n_questions)
+    structure = core.build_form_structure(raw)
+    # Référence sur l'onglet tel que le nettoyait le chargement d'origine
+    df_questions = legacy_validation.clean_questions_df(raw)
+    answers = make_answers(structure)
+    collected_data = [{"phase_name": f"Phase {i}", "answers": make_answers(structure, seed=i)} for i in range(1, 6)]
+    index = AnswerIndex(collected_data)
+    number = 3
+    legacy = min(timeit.repeat(lambda: legacy_validation.validate_section(df_questions, SECTION, dict(answers), collected_data, PROJECT), number=number, repeat=repeat)) / number
+    plan = min(timeit.repeat(lambda: core.validate_section(structure, SECTION, dict(answers), index, PROJECT), number=number, repeat=repeat)) / number
+    return legacy, plan
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 300, 600]
+    print(f"{'questions':>10} {'historique (ms)':>16} {'plan (ms)':>10} {'gain':>7}")
+    for n in sizes:
+        legacy, plan = run(n)
+        print(f"{n:>10} {legacy * 1000:>16.2f} {plan * 1000:>10.3f} {legacy / plan:>6.0f}x")
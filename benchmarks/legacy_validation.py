@@ -0,0 +1,170 @@
+# benchmarks/legacy_validation.py
+# Validation d'origine (commit initial, tools.py), copiée telle quelle pour servir de référence
+# aux benchmarks : get_expected_photo_count, evaluate_single_condition, check_condition,
+# validate_section et le nettoyage de l'onglet 'Questions' de load_form_structure_from_sheets.
+# Ne pas modifier : toute différence fausserait la comparaison.
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import COMMENT_ID, COMMENT_QUESTION, PROJECT_RENAME_MAP, SECTION_PHOTO_RULES
+
+
+def clean_questions_df(df):
+    """Corps de load_form_structure_from_sheets, sans la lecture Google Sheets ni le cache Streamlit."""
+    df = df.copy()
+    # Nettoyage des colonnes
+    df.columns = df.columns.str.strip()
+    
+    rename_map = {'Conditon value': 'Condition value', 'condition value': 'Condition value', 'Condition Value': 'Condition value', 'Condition': 'Condition value', 'Conditon on': 'Condition on', 'condition on': 'Condition on'}
+    actual_rename = {k: v for k, v in rename_map.items() if k in df.columns}
+    df = df.rename(columns=actual_rename)
+    
+    expected_cols = ['options', 'Description', 'Condition value', 'Condition on', 'section', 'id', 'question', 'type', 'obligatoire']
+    for col in expected_cols:
+        if col not in df.columns: df[col] = np.nan 
+    
+    df['options'] = df['options'].fillna('')
+    df['Description'] = df['Description'].fillna('')
+    df['Condition value'] = df['Condition value'].fillna('')
+    df['Condition on'] = pd.to_numeric(df['Condition on'], errors='coerce').fillna(0).astype(int)
+    
+    for col in df.select_dtypes(include=['object']).columns:
+        df[col] = df[col].astype(str).str.strip()
+    return df
+
+
+def get_expected_photo_count(section_name, project_data):
+    if section_name.strip() not in SECTION_PHOTO_RULES:
+        return None, None 
+
+    columns = SECTION_PHOTO_RULES[section_name.strip()]
+    total_expected = 0
+    details = []
+
+    for col in columns:
+        val = project_data.get(col, 0)
+        try:
+            if pd.isna(val) or val == "":
+                num = 0
+            else:
+                num = int(float(str(val).replace(',', '.'))) 
+        except Exception:
+            num = 0
+        total_expected += num
+        short_name = PROJECT_RENAME_MAP.get(col, col) 
+        details.append(f"{num} {short_name}")
+
+    detail_str = " + ".join(details)
+    return total_expected, detail_str
+
+def evaluate_single_condition(condition_str, all_answers):
+    if "=" not in condition_str:
+        return True
+    try:
+        target_id_str, expected_value_raw = condition_str.split('=', 1)
+        target_id = int(target_id_str.strip())
+        expected_value = expected_value_raw.strip().strip('"').strip("'")
+        user_answer = all_answers.get(target_id)
+        if user_answer is not None:
+            return str(user_answer).strip().lower() == str(expected_value).strip().lower()
+        else:
+            return False
+    except Exception:
+        return True
+
+def check_condition(row, current_answers, collected_data):
+    try:
+        if int(row.get('Condition on', 0)) != 1: return True
+    except (ValueError, TypeError): return True
+
+    all_past_answers = {}
+    for phase_data in collected_data: 
+        all_past_answers.update(phase_data['answers'])
+    combined_answers = {**all_past_answers, **current_answers}
+    
+    condition_raw = str(row.get('Condition value', '')).strip().strip('"').strip("'")
+    if not condition_raw: return True
+
+    or_blocks = condition_raw.split(' OU ')
+    for block in or_blocks:
+        and_conditions = block.split(' ET ')
+        block_is_valid = True
+        for atom in and_conditions:
+            if not evaluate_single_condition(atom, combined_answers):
+                block_is_valid = False
+                break
+        if block_is_valid:
+            return True
+    return False
+
+def validate_section(df_questions, section_name, answers, collected_data, project_data):
+    missing = []
+    section_rows = df_questions[df_questions['section'] == section_name]
+    comment_val = answers.get(COMMENT_ID)
+    has_justification = comment_val is not None and str(comment_val).strip() != ""
+    
+    expected_total_base, detail_str = get_expected_photo_count(section_name.strip(), project_data)
+    expected_total = expected_total_base
+    
+    photo_question_count = sum(
+        1 for _, row in section_rows.iterrows()
+        if str(row.get('type', '')).strip().lower() == 'photo' and check_condition(row, answers, collected_data)
+    )
+    
+    if expected_total is not None and expected_total > 0:
+        expected_total = expected_total_base * photo_question_count
+        detail_str = f"{detail_str} | Questions photo visibles: {photo_question_count} -> Total ajusté: {expected_total}"
+
+    current_photo_count = 0
+    photo_questions_found = False
+    
+    for _, row in section_rows.iterrows():
+        q_type = str(row['type']).strip().lower()
+        if q_type == 'photo' and check_condition(row, answers, collected_data):
+            photo_questions_found = True
+            q_id = int(row['id'])
+            val = answers.get(q_id)
+            if isinstance(val, list):
+                current_photo_count += len(val)
+
+    for _, row in section_rows.iterrows():
+        q_id = int(row['id'])
+        if q_id == COMMENT_ID: continue
+        if not check_condition(row, answers, collected_data): continue
+        is_mandatory = str(row['obligatoire']).strip().lower() == 'oui'
+        q_type = str(row['type']).strip().lower()
+        val = answers.get(q_id)
+        if is_mandatory:
+            if q_type == 'photo':
+                if not isinstance(val, list) or len(val) == 0:
+                    missing.append(f"Question {q_id} : {row['question']} (Au moins une photo est requise)")
+            else:
+                if isinstance(val, list):
+                    if not val: missing.append(f"Question {q_id} : {row['question']} (fichier(s) manquant(s))")
+                elif val is None or val == "" or (isinstance(val, (int, float)) and val == 0):
+                    missing.append(f"Question {q_id} : {row['question']}")
+
+    is_photo_count_incorrect = False
+    if expected_total is not None and expected_total > 0:
+        if photo_questions_found and current_photo_count != expected_total:
+            is_photo_count_incorrect = True
+            error_message = (
+                f"⚠️ **Écart de Photos pour '{str(section_name)}'**.\n"
+                f"Attendu : **{str(expected_total)}** (calculé : {str(detail_str)}).\n"
+                f"Reçu : **{str(current_photo_count)}**.\n"
+            )
+            if not has_justification:
+                missing.append(
+                    f"**Commentaire (ID {COMMENT_ID}) :** {COMMENT_QUESTION} "
+                    f"(requis en raison de l'écart de photo). \n\n {error_message}"
+                )
+
+    if not is_photo_count_incorrect and COMMENT_ID in answers:
+        del answers[COMMENT_ID]
+
+    return len(missing) == 0, missing
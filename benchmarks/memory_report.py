@@ -0,0 +1,113 @@
+# benchmarks/memory_report.py
+# Empreinte mémoire des onglets 'Sites' et 'Questions' avant/après projection des colonnes et types compacts.
+# Les tables sont partagées entre sessions (registre) ; chaque session ne garde que la ligne du projet choisi.
+# Usage :
+#   python benchmarks/memory_report.py [--sites 20000] [--questions 100] [--sections 6] [--extra-columns 40] [--output rapport.json]
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import synthetic
+
+import core
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def value_bytes(value):
+    return sys.getsizeof(value) if value is not None else 0
+
+
+def record_bytes(record):
+    """Taille d'une ligne projet en session (dict + clés + valeurs)."""
+    return sys.getsizeof(record) + sum(sys.getsizeof(k) + value_bytes(v) for k, v in record.items())
+
+
+def parquet_bytes(df):
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "onglet.parquet")
+        df.to_parquet(path, index=False)
+        return os.path.getsize(path)
+
+
+def legacy_questions_frame(raw):
+    # Nettoyage d'origine de build_form_structure : toutes les colonnes, texte en 'object'
+    df = raw.rename(columns=lambda c: str(c).strip()).astype(object)
+    df['Condition on'] = df['Condition on'].astype('int64')
+    return df
+
+
+def legacy_sites_frame(raw):
+    # Copie d'origine de build_site_catalog : toutes les colonnes, comptages laissés en texte
+    return raw.rename(columns=lambda c: str(c).strip()).astype(object)
+
+
+def build_report(n_sites, questions_per_section, n_sections, n_extra_columns):
+    raw_sites = synthetic.make_sites_df(n_sites, n_extra_columns=n_extra_columns)
+    raw_questions = synthetic.make_questions_df(n_sections, questions_per_section, n_extra_columns=n_extra_columns)
+
+    before_sites = legacy_sites_frame(raw_sites)
+    before_questions = legacy_questions_frame(raw_questions)
+    after_sites = core.build_site_catalog(raw_sites).df
+    after_questions = core.build_form_structure(raw_questions).df.drop(columns=['condition'])
+
+    title = after_sites['Intitulé'].iloc[0]
+    before_record = before_sites[before_sites['Intitulé'] == title].iloc[0].to_dict()
+    after_record = core.build_site_catalog(raw_sites).record(title)
+
+    rows = [
+        ("Sites : table partagée", frame_bytes(before_sites), frame_bytes(after_sites)),
+        ("Sites : copie locale (parquet)", parquet_bytes(before_sites), parquet_bytes(core.select_site_columns(raw_sites))),
+        ("Questions : table partagée", frame_bytes(before_questions), frame_bytes(after_questions)),
+        ("Questions : copie locale (parquet)", parquet_bytes(before_questions), parquet_bytes(core.select_question_columns(raw_questions))),
+        ("Par session : ligne projet", record_bytes(before_record), record_bytes(after_record)),
+    ]
+    return {
+        "params": {"sites": n_sites, "questions": questions_per_section * n_sections, "extra_columns": n_extra_columns},
+        "columns": {
+            "sites": [before_sites.shape[1], after_sites.shape[1]],
+            "questions": [before_questions.shape[1], after_questions.shape[1]],
+        },
+        "dtypes": {
+            "sites": {col: str(dtype) for col, dtype in after_sites.dtypes.items()},
+            "questions": {col: str(dtype) for col, dtype in after_questions.dtypes.items()},
+        },
+        "rows": [{"label": label, "before_bytes": before, "after_bytes": after} for label, before, after in rows],
+    }
+
+
+def print_report(report):
+    params = report["params"]
+    print(f"{params['sites']} sites, {params['questions']} questions, {params['extra_columns']} colonnes non utilisées par onglet")
+    for sheet, (before, after) in report["columns"].items():
+        print(f"  {sheet} : {before} -> {after} colonnes")
+    print(f"\n{'mesure':<38} {'avant':>12} {'après':>12} {'gain':>7}")
+    for row in report["rows"]:
+        before, after = row["before_bytes"], row["after_bytes"]
+        gain = 1 - after / before if before else 0.0
+        print(f"{row['label']:<38} {_human(before):>12} {_human(after):>12} {gain:>7.0%}")
+
+
+def _human(n):
+    for unit in ("o", "Ko", "Mo"):
+        if n < 1024: return f"{n:.0f} {unit}" if unit == "o" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} Go"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Empreinte mémoire des onglets Sites/Questions (données synthétiques)")
+    parser.add_argument("--sites", type=int, default=20000)
+    parser.add_argument("--questions", type=int, default=100, help="Questions par section")
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--extra-columns", type=int, default=40, help="Colonnes non utilisées ajoutées à chaque onglet")
+    parser.add_argument("--output", help="Écrit aussi le rapport en JSON")
+    args = parser.parse_args()
+    report = build_report(args.sites, args.questions, args.sections, args.extra_columns)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh: json.dump(report, fh, ensure_ascii=False, indent=2)
@@ -0,0 +1,211 @@
+# benchmarks/suite.py
+# Suite de micro-benchmarks (moteur de formulaire, recherche de sites, exports) sur données synthétiques.
+# Usage :
+#   python benchmarks/suite.py run [--full] [--filter validate] [--output resultats.json]
+#   python benchmarks/suite.py compare reference.json nouveau.json [--threshold 0.15]
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+from datetime import datetime
+
+import synthetic
+from synthetic import PROJECT, SECTION
+
+import core
+from answers import AnswerIndex, VisibilityCache
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_THRESHOLD = 0.15
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """Temps par appel (s) : nombre d'appels calibré pour durer ~min_time, puis `repeat` mesures."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 10 ** 6: break
+        number *= 10 if elapsed < min_time / 10 else 2
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"number": number, "repeat": repeat, "min_s": min(runs), "median_s": statistics.median(runs), "mean_s": statistics.fmean(runs)}
+
+
+# --- Cas mesurés ---
+# Chaque cas : (nom, paramètres, préparation) ; la préparation retourne la fonction chronométrée.
+
+def case_check_condition(questions, density):
+    structure = synthetic.make_structure(questions, density)
+    rows = structure.df[structure.df['section'] == SECTION].to_dict('records')
+    view = AnswerIndex(synthetic.make_collected_data(structure)).view(synthetic.make_answers(structure))
+    return lambda: [core.check_condition(row, view) for row in rows]
+
+
+def case_validate_section(questions, density):
+    structure = synthetic.make_structure(questions, density)
+    answers = synthetic.make_answers(structure)
+    index = AnswerIndex(synthetic.make_collected_data(structure))
+    return lambda: core.validate_section(structure, SECTION, dict(answers), index, PROJECT)
+
+
+def case_visibility_incremental(questions, density):
+    # Un rerun après la modification d'une réponse conditionnante : seuls ses dépendants sont réévalués
+    structure = synthetic.make_structure(questions, density)
+    answers = synthetic.make_answers(structure)
+    view = AnswerIndex(synthetic.make_collected_data(structure)).view(answers)
+    questions = structure.section_questions(SECTION)
+    refs = sorted(structure.section_refs(SECTION)) or [questions[0].id]
+    cache = VisibilityCache(None)
+    counter = iter(range(10 ** 9))
+
+    def _rerun():
+        n = next(counter)
+        answers[refs[n % len(refs)]] = 'Oui' if n % 2 else 'Non'
+        cache.refresh(structure, SECTION, view)
+        return [q for q in questions if cache.is_visible(q, view)]
+    return _rerun
+
+
+def case_expected_photo_count(sites):
+    projects = synthetic.make_sites_df(sites).to_dict('records')
+    sections = list(core.SECTION_PHOTO_RULES)
+    return lambda: [core.get_expected_photo_count(section, project) for project in projects for section in sections]
+
+
+def case_site_catalog_build(sites):
+    df = synthetic.make_sites_df(sites)
+    return lambda: core.build_site_catalog(df)
+
+
+def case_site_search(sites, query):
+    catalog = core.build_site_catalog(synthetic.make_sites_df(sites))
+    # Le cache de résultats est vidé : on mesure la recherche, pas le cache
+    return lambda: (catalog.search_index._results.clear(), catalog.search(query, limit=core.SEARCH_RESULT_LIMIT))
+
+
+def case_csv_export(sections, questions):
+    structure = synthetic.make_structure(questions, n_sections=sections)
+    collected = synthetic.make_collected_data(structure, n_phases=sections)
+    return lambda: core.create_csv_export(collected, structure, "Projet test", "id", None).close()
+
+
+def case_zip_export(photos):
+    photo = synthetic.photo_factory()
+    collected = [{"phase_name": SECTION, "answers": {1: [photo() for _ in range(photos)]}}]
+    return lambda: core.create_zip_export(collected).close()
+
+
+def case_word_report(photos, profile):
+    structure = synthetic.make_structure(40)
+    collected = synthetic.make_collected_data(structure, n_phases=2)
+    photo = synthetic.photo_factory()
+    collected.append({"phase_name": SECTION, "answers": {1: [photo() for _ in range(photos)]}})
+    return lambda: core.create_word_report(collected, structure, PROJECT, datetime.now(), image_profile=profile).close()
+
+
+def case_analytics(submissions):
+    import analytics
+    structure = synthetic.make_structure(20, n_sections=3)
+    sites = synthetic.make_sites_df(5_000)
+    answers = synthetic.make_answer_rows(structure, sites, submissions)
+    answers = answers[answers['question_id'].isin(analytics.relevant_question_ids(structure))]
+    return lambda: analytics.compute(answers, structure, sites)
+
+
+def cases(full=False):
+    site_sizes = [1_000, 10_000, 100_000] + ([500_000] if full else [])
+    question_sizes = [50, 200, 600] + ([2000] if full else [])
+    for n in question_sizes:
+        for density in (0.1, 0.5):
+            yield "check_condition", {"questions": n, "density": density}, case_check_condition
+            yield "validate_section", {"questions": n, "density": density}, case_validate_section
+            yield "visibility_incremental", {"questions": n, "density": density}, case_visibility_incremental
+    for n in site_sizes:
+        yield "expected_photo_count", {"sites": n}, case_expected_photo_count
+        yield "site_catalog_build", {"sites": n}, case_site_catalog_build
+        for query in ("orleans", "parking", "site 42"):
+            yield "site_search", {"sites": n, "query": query}, case_site_search
+    for sections, questions in ((5, 50), (20, 100)):
+        yield "csv_export", {"sections": sections, "questions": questions}, case_csv_export
+    for photos in (10, 50):
+        yield "zip_export", {"photos": photos}, case_zip_export
+        for profile in ("email", "archive"):
+            yield "word_report", {"photos": photos, "profile": profile}, case_word_report
+    for submissions in [1_000, 10_000] + ([100_000] if full else []):
+        yield "analytics", {"submissions": submissions}, case_analytics
+
+
+def result_key(result):
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+# --- Commandes ---
+
+def run_suite(full=False, name_filter=None, output=None, repeat=5):
+    results = []
+    for name, params, setup in cases(full):
+        if name_filter and name_filter not in name: continue
+        fn = setup(**params)
+        stats = measure(fn, repeat=repeat)
+        results.append({"name": name, "params": params, **stats})
+        label = ", ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{name:<22} {label:<40} {stats['median_s'] * 1000:>11.3f} ms")
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "full": full,
+        },
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+    print(f"\nRésultats : {output}")
+    return report
+
+
+def compare(reference_path, candidate_path, threshold=DEFAULT_THRESHOLD):
+    """Compare les médianes de deux runs ; retourne le nombre de régressions au-delà du seuil."""
+    with open(reference_path, encoding='utf-8') as fh: reference = {result_key(r): r for r in json.load(fh)["results"]}
+    with open(candidate_path, encoding='utf-8') as fh: candidate = json.load(fh)["results"]
+    regressions = 0
+    print(f"{'cas':<62} {'réf (ms)':>11} {'nouveau (ms)':>13} {'écart':>8}")
+    for result in candidate:
+        ref = reference.get(result_key(result))
+        if ref is None: continue
+        ratio = result["median_s"] / ref["median_s"] - 1 if ref["median_s"] else 0.0
+        flag = ""
+        if ratio > threshold:
+            flag, regressions = "  RÉGRESSION", regressions + 1
+        elif ratio < -threshold:
+            flag = "  gain"
+        label = result["name"] + " " + ", ".join(f"{k}={v}" for k, v in result["params"].items())
+        print(f"{label:<62} {ref['median_s'] * 1000:>11.3f} {result['median_s'] * 1000:>13.3f} {ratio:>+7.0%}{flag}")
+    print(f"\n{regressions} régression(s) au-delà de {threshold:.0%}.")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks VISITE (données synthétiques, sans réseau)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="Exécute la suite et écrit les résultats JSON")
+    p_run.add_argument("--full", action="store_true", help="Ajoute les grandes tailles (500k sites, 2000 questions)")
+    p_run.add_argument("--filter", dest="name_filter", help="Ne lance que les cas dont le nom contient ce texte")
+    p_run.add_argument("--output", help="Fichier de résultats (défaut : benchmarks/results/bench_<date>.json)")
+    p_run.add_argument("--repeat", type=int, default=5)
+    p_cmp = sub.add_parser("compare", help="Compare deux fichiers de résultats")
+    p_cmp.add_argument("reference")
+    p_cmp.add_argument("candidate")
+    p_cmp.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Écart relatif toléré (0.15 = 15 %%)")
+    args = parser.parse_args()
+    if args.command == "run":
+        run_suite(args.full, args.name_filter, args.output, args.repeat)
+    else:
+        sys.exit(1 if compare(args.reference, args.candidate, args.threshold) else 0)
@@ -0,0 +1,154 @@
+# benchmarks/synthetic.py
+# Générateurs de données synthétiques (structure de formulaire, réponses, table Sites, photos), sans réseau.
+import os
+import random
+import sys
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+
+SECTION = "Bornes DC"
+PROJECT = {'Intitulé': "Projet test", 'R [Plan de Déploiement]': '2', 'UR [Plan de Déploiement]': '1'}
+QUESTION_TYPES = ['text', 'select', 'number', 'photo']
+CITIES = ['Orléans', 'Paris', 'Lyon', 'Saint-Étienne', 'Besançon', 'Nîmes', 'Brest', 'Évry', 'Rennes', 'Amiens']
+SUPPLIERS = ['Alpha', 'Bêta Energie', 'Gamma', 'Delta', None]
+
+
+def section_names(n_sections):
+    # La première section est l'identification, comme dans l'onglet 'Questions'
+    return ["Identification", SECTION, "Bornes AC"][:n_sections] + [f"Phase {i}" for i in range(3, n_sections)]
+
+
+def extra_columns(n_rows, n_columns, seed=0):
+    """Colonnes de feuille non utilisées par l'application (notes, dates, adresses...), en texte."""
+    rnd = random.Random(seed)
+    words = ['à vérifier', 'RAS', 'voir plan', 'en attente', '', '2024-03-12', '12 rue de la Gare', 'Oui', 'Non']
+    return {f"Colonne libre {i}": [rnd.choice(words) for _ in range(n_rows)] for i in range(n_columns)}
+
+
+def make_questions_df(n_sections=1, questions_per_section=100, condition_density=0.3, seed=0, sections=None, n_extra_columns=0):
+    """DataFrame au format de l'onglet 'Questions' ; les conditions référencent des questions antérieures."""
+    rnd = random.Random(seed)
+    sections = sections or ([SECTION] if n_sections == 1 else section_names(n_sections))
+    rows = []
+    q_id = 0
+    for section in sections:
+        for _ in range(questions_per_section):
+            q_id += 1
+            if q_id == core.COMMENT_ID: q_id += 1
+            q_type = rnd.choice(QUESTION_TYPES)
+            cond_on, cond_value = 0, ''
+            if q_id > 1 and rnd.random() < condition_density:
+                cond_on = 1
+                refs = rnd.sample(range(1, q_id), min(2, q_id - 1))
+                cond_value = ' OU '.join(f"{r}=Oui" for r in refs)
+            rows.append({
+                'id': q_id, 'section': section, 'question': f"Question {q_id}", 'type': q_type,
+                'obligatoire': rnd.choice(['oui', 'non']), 'options': 'Oui,Non' if q_type == 'select' else '',
+                'Description': '', 'Condition on': cond_on, 'Condition value': cond_value,
+            })
+    df = pd.DataFrame(rows)
+    if n_extra_columns: df = df.assign(**extra_columns(len(df), n_extra_columns, seed))
+    return df
+
+
+def make_structure(n_questions, condition_density=0.3, seed=0, n_sections=1):
+    return core.build_form_structure(make_questions_df(n_sections, n_questions, condition_density, seed))
+
+
+def make_answers(structure, section=SECTION, seed=0, photo=object):
+    rnd = random.Random(seed)
+    answers = {}
+    for q in structure.plan(section).questions:
+        if q.is_photo: answers[q.id] = [photo() for _ in range(rnd.randint(0, 2))]
+        elif q.type == 'number': answers[q.id] = rnd.randint(0, 3)
+        else: answers[q.id] = rnd.choice(['Oui', 'Non', ''])
+    return answers
+
+
+def make_collected_data(structure, n_phases=5, photo=object, seed=0):
+    sections = list(structure.plans) or [SECTION]
+    return [
+        {"phase_name": sections[i % len(sections)], "answers": make_answers(structure, sections[i % len(sections)], seed + i, photo)}
+        for i in range(n_phases)
+    ]
+
+
+def make_sites_df(n_rows, seed=0, n_extra_columns=0):
+    """
+    Table 'Sites' synthétique (colonnes de comptage en texte, comme lues depuis la feuille) ;
+    n_extra_columns ajoute des colonnes jamais lues par l'application, comme la feuille réelle.
+    """
+    rnd = random.Random(seed)
+    cities = CITIES + [f"Ville{i}" for i in range(max(1, n_rows // 30))]
+    counts = lambda: [rnd.choice(['', '0', '1', '2', '3', '4,0']) for _ in range(n_rows)]
+    return pd.DataFrame({
+        'Intitulé': [f"{rnd.choice(cities)} - Site {i} Parking {rnd.choice(['Nord', 'Sud', 'Gare', 'Centre'])}" for i in range(n_rows)],
+        'Fournisseur Bornes AC [Bornes]': [rnd.choice(SUPPLIERS) for _ in range(n_rows)],
+        'Fournisseur Bornes DC [Bornes]': [rnd.choice(SUPPLIERS) for _ in range(n_rows)],
+        'L [Plan de Déploiement]': counts(),
+        'R [Plan de Déploiement]': counts(),
+        'UR [Plan de Déploiement]': counts(),
+        'Pré L [Plan de Déploiement]': counts(),
+        'Pré R [Plan de Déploiement]': counts(),
+        'Pré UR [Plan de Déploiement]': counts(),
+        **extra_columns(n_rows, n_extra_columns, seed),
+    })
+
+
+def make_jpeg(width=1600, height=1200, seed=0):
+    """Photo JPEG en mémoire (bruit léger pour une taille réaliste), avec un attribut name."""
+    from PIL import Image
+    img = Image.effect_noise((width, height), 40 + seed % 20).convert('RGB')
+    out = BytesIO()
+    img.save(out, 'JPEG', quality=85)
+    out.seek(0)
+    out.name = f"photo_{seed}.jpg"
+    return out
+
+
+def photo_factory(width=1600, height=1200):
+    """Retourne une fonction produisant des copies (BytesIO indépendants) d'une même photo."""
+    data = make_jpeg(width, height).getvalue()
+    counter = iter(range(10 ** 9))
+
+    def _photo():
+        f = BytesIO(data)
+        f.name = f"photo_{next(counter)}.jpg"
+        return f
+    return _photo
+
+
+def make_answer_rows(structure, sites_df, n_submissions, seed=0):
+    """Table des réponses détaillées (ANSWER_COLUMNS) : une phase par section et par soumission."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    template = [(i, q) for i, section in enumerate(structure.plans) for q in structure.plans[section].questions]
+    # Commentaire d'écart de photos dans la section soumise à la règle
+    sections = list(structure.plans) or [SECTION]
+    template.append((sections.index(SECTION) if SECTION in sections else 0, core.COMMENT_ENTRY))
+    n_rows = len(template)
+    phase_index = np.tile([i for i, _ in template], n_submissions)
+    question_id = np.tile([q.id for _, q in template], n_submissions)
+    is_photo = np.tile([q.is_photo for _, q in template], n_submissions)
+    sections = np.array(sections, dtype=object)
+    submission = np.repeat(np.arange(n_submissions), n_rows)
+    projects = sites_df['Intitulé'].to_numpy()[rng.integers(0, len(sites_df), n_submissions)]
+    files = rng.integers(0, 4, len(submission))
+    refs = np.array(["[]"] + ['[' + ', '.join(f'"p{i}.jpg"' for i in range(n)) + ']' for n in range(1, 4)], dtype=object)
+    values = np.array(['Oui', 'Non', ''], dtype=object)[rng.integers(0, 3, len(submission))]
+    return pd.DataFrame({
+        'submission_id': pd.Categorical(np.char.add('s', submission.astype(str))),
+        'date': np.repeat(pd.date_range('2026-01-01', periods=n_submissions, freq='5min').strftime('%Y-%m-%d %H:%M:%S'), n_rows),
+        'projet': pd.Categorical(np.repeat(projects, n_rows)),
+        'phase_index': phase_index,
+        'phase_name': pd.Categorical(sections[phase_index]),
+        'question_id': question_id,
+        'value': np.where(is_photo, None, values),
+        'value_num': np.nan,
+        'file_refs': np.where(is_photo, refs[files], None),
+    })
@@ -0,0 +1,147 @@
+# conditions.py
+# Compilation des colonnes 'Condition on' / 'Condition value' en prédicats.
+# Syntaxe : "<id>=<valeur>" combinés par ' ET ' (prioritaire) puis ' OU '.
+from functools import lru_cache
+
+OR_SEPARATOR = ' OU '
+AND_SEPARATOR = ' ET '
+
+
+class ConditionError(ValueError):
+    pass
+
+
+def _normalize(value):
+    return str(value).strip().lower()
+
+
+class Condition:
+    __slots__ = ('refs', 'source')
+
+    def evaluate(self, answers):
+        raise NotImplementedError
+
+
+class Always(Condition):
+    __slots__ = ()
+
+    def __init__(self, source=''):
+        self.refs = frozenset()
+        self.source = source
+
+    def evaluate(self, answers):
+        return True
+
+    def __repr__(self):
+        return "Always()"
+
+
+class Equals(Condition):
+    __slots__ = ('target_id', 'expected')
+
+    def __init__(self, target_id, expected, source=''):
+        self.target_id = target_id
+        self.expected = _normalize(expected)
+        self.refs = frozenset([target_id])
+        self.source = source
+
+    def evaluate(self, answers):
+        user_answer = answers.get(self.target_id)
+        if user_answer is None: return False
+        return _normalize(user_answer) == self.expected
+
+    def __repr__(self):
+        return f"Equals({self.target_id}, {self.expected!r})"
+
+
+class AllOf(Condition):
+    __slots__ = ('parts',)
+
+    def __init__(self, parts, source=''):
+        self.parts = tuple(parts)
+        self.refs = frozenset().union(*(p.refs for p in self.parts))
+        self.source = source
+
+    def evaluate(self, answers):
+        for part in self.parts:
+            if not part.evaluate(answers): return False
+        return True
+
+    def __repr__(self):
+        return f"AllOf{self.parts!r}"
+
+
+class AnyOf(Condition):
+    __slots__ = ('parts',)
+
+    def __init__(self, parts, source=''):
+        self.parts = tuple(parts)
+        self.refs = frozenset().union(*(p.refs for p in self.parts))
+        self.source = source
+
+    def evaluate(self, answers):
+        for part in self.parts:
+            if part.evaluate(answers): return True
+        return False
+
+    def __repr__(self):
+        return f"AnyOf{self.parts!r}"
+
+
+ALWAYS = Always()
+
+
+def _compile_atom(atom):
+    if "=" not in atom:
+        raise ConditionError(f"'{atom.strip()}' : signe '=' manquant")
+    target_id_str, expected_value_raw = atom.split('=', 1)
+    try:
+        target_id = int(target_id_str.strip())
+    except ValueError:
+        raise ConditionError(f"'{atom.strip()}' : identifiant de question invalide '{target_id_str.strip()}'")
+    expected_value = expected_value_raw.strip().strip('"').strip("'")
+    return Equals(target_id, expected_value, source=atom)
+
+
+def _compile(condition_raw):
+    errors = []
+    or_blocks = []
+    always_true = False
+    for block in condition_raw.split(OR_SEPARATOR):
+        and_parts = []
+        for atom in block.split(AND_SEPARATOR):
+            try:
+                and_parts.append(_compile_atom(atom))
+            except ConditionError as e:
+                # Comportement historique : un atome illisible est considéré comme vrai
+                errors.append(str(e))
+        if not and_parts:
+            always_true = True
+            continue
+        or_blocks.append(and_parts[0] if len(and_parts) == 1 else AllOf(and_parts, source=block))
+    if always_true:
+        return ALWAYS, errors
+    if len(or_blocks) == 1:
+        return or_blocks[0], errors
+    return AnyOf(or_blocks, source=condition_raw), errors
+
+
+@lru_cache(maxsize=4096)
+def compile_condition(condition_value):
+    """
+    Compile une chaîne 'Condition value' en prédicat.
+    Retourne (condition, erreurs) ; les atomes malformés sont ignorés (toujours vrais)
+    et décrits dans la liste d'erreurs.
+    """
+    condition_raw = str(condition_value).strip().strip('"').strip("'")
+    if not condition_raw: return ALWAYS, ()
+    condition, errors = _compile(condition_raw)
+    return condition, tuple(errors)
+
+
+def compile_row_condition(condition_on, condition_value):
+    try:
+        if int(condition_on) != 1: return ALWAYS, ()
+    except (ValueError, TypeError):
+        return ALWAYS, ()
+    return compile_condition(condition_value)
@@ -0,0 +1,414 @@
+# core.py
+# Logique métier sans Streamlit : structure, validation, exports.
+# Les dépendances lourdes (pandas, numpy, python-docx, Pillow) sont importées à la première utilisation,
+# pour que le module s'importe en quelques millisecondes (workers, scripts batch, benchmarks).
+import json
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+from io import BytesIO
+
+from conditions import ALWAYS, Condition, compile_row_condition
+from form_structure import FormStructure, Question
+from images import DEFAULT_IMAGE_PROFILE, REPORT_IMAGE_WIDTH_INCHES, prepare_images
+import metrics
+from photo_store import open_answer_file
+
+# --- CONSTANTES ---
+PROJECT_RENAME_MAP = {
+    'Intitulé': 'Intitulé',
+    'Fournisseur Bornes AC [Bornes]': 'Fournisseur Bornes AC',
+    'Fournisseur Bornes DC [Bornes]': 'Fournisseur Bornes DC',
+    'L [Plan de Déploiement]': 'PDC Lent',
+    'R [Plan de Déploiement]': 'PDC Rapide',
+    'UR [Plan de Déploiement]': 'PDC Ultra-rapide',
+    'Pré L [Plan de Déploiement]': 'PDC L pré-équipés',
+    'Pré R [Plan de Déploiement]': 'PDC R pré-équipés',
+    'Pré UR [Plan de Déploiement]': 'PDC UR pré-équipés',
+}
+
+DISPLAY_GROUPS = [
+    ['Intitulé', 'Fournisseur Bornes AC [Bornes]', 'Fournisseur Bornes DC [Bornes]'],
+    ['L [Plan de Déploiement]', 'R [Plan de Déploiement]', 'UR [Plan de Déploiement]'],
+    ['Pré L [Plan de Déploiement]', 'Pré R [Plan de Déploiement]', 'Pré UR [Plan de Déploiement]'],
+]
+
+SECTION_PHOTO_RULES = {
+    "Bornes DC": ['R [Plan de Déploiement]', 'UR [Plan de Déploiement]'],
+    "Bornes AC": ['L [Plan de Déploiement]'],
+}
+
+# Colonnes 'Sites' interrogées par la recherche de chantier (la première est prioritaire)
+SITE_SEARCH_COLUMNS = ['Intitulé']
+
+# Colonnes conservées au chargement (les autres colonnes des feuilles ne sont jamais lues)
+QUESTION_COLUMNS = ['options', 'Description', 'Condition value', 'Condition on', 'section', 'id', 'question', 'type', 'obligatoire']
+QUESTION_COLUMN_FIXES = {
+    'Conditon value': 'Condition value', 'condition value': 'Condition value', 'Condition Value': 'Condition value',
+    'Condition': 'Condition value', 'Conditon on': 'Condition on', 'condition on': 'Condition on',
+}
+QUESTION_CATEGORY_COLUMNS = ['section', 'type', 'obligatoire']
+SITE_COUNT_COLUMNS = list(dict.fromkeys(
+    DISPLAY_GROUPS[1] + DISPLAY_GROUPS[2] + [col for cols in SECTION_PHOTO_RULES.values() for col in cols]
+))
+SITE_CATEGORY_COLUMNS = ['Fournisseur Bornes AC [Bornes]', 'Fournisseur Bornes DC [Bornes]']
+SITE_COLUMNS = list(dict.fromkeys(
+    SITE_SEARCH_COLUMNS + list(PROJECT_RENAME_MAP) + [col for group in DISPLAY_GROUPS for col in group] + SITE_COUNT_COLUMNS
+))
+SEARCH_RESULT_LIMIT = 200
+
+COMMENT_ID = 100
+COMMENT_QUESTION = "Veuillez préciser pourquoi le nombre de photo partagé ne correspond pas au minimum attendu"
+COMMENT_ENTRY = Question(
+    id=COMMENT_ID, section='', text=COMMENT_QUESTION, type='text', mandatory=True,
+    options=(), description="Requis si écart photo.", condition=ALWAYS,
+)
+
+# --- CHARGEMENT DONNÉES ---
+def select_question_columns(df):
+    """Onglet 'Questions' réduit aux colonnes utilisées (noms nettoyés et corrigés)."""
+    df = df.rename(columns=lambda c: str(c).strip())
+    df = df.rename(columns={k: v for k, v in QUESTION_COLUMN_FIXES.items() if k in df.columns})
+    df = df.loc[:, ~df.columns.duplicated()]
+    return df[[col for col in QUESTION_COLUMNS if col in df.columns]]
+
+def select_site_columns(df):
+    """Onglet 'Sites' réduit aux colonnes utilisées (récapitulatif, règles photo, recherche, rapports)."""
+    df = df.rename(columns=lambda c: str(c).strip())
+    df = df.loc[:, ~df.columns.duplicated()]
+    return df[[col for col in SITE_COLUMNS if col in df.columns]]
+
+@metrics.timed('build_form_structure')
+def build_form_structure(df):
+    import numpy as np
+    import pandas as pd
+    # Nettoyage des colonnes (projection sur les colonnes utilisées)
+    df = select_question_columns(df).copy()
+    
+    for col in QUESTION_COLUMNS:
+        if col not in df.columns: df[col] = np.nan 
+    
+    df['options'] = df['options'].fillna('')
+    df['Description'] = df['Description'].fillna('')
+    df['Condition value'] = df['Condition value'].fillna('')
+    df['Condition on'] = pd.to_numeric(pd.to_numeric(df['Condition on'], errors='coerce').fillna(0).astype(int), downcast='integer')
+    
+    # Texte 'object' (pandas 2) ou 'str' (pandas 3)
+    text_columns = [col for col in df.columns if df[col].dtype == object or pd.api.types.is_string_dtype(df[col].dtype)]
+    for col in text_columns:
+        df[col] = df[col].astype(str).str.strip()
+    # Colonnes très répétitives : catégories (une seule copie de chaque libellé)
+    for col in QUESTION_CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+
+    # Compilation unique des conditions et des plans de validation par section
+    return FormStructure(df)
+
+@metrics.timed('build_site_catalog')
+def build_site_catalog(df):
+    import pandas as pd
+    from sites import SiteCatalog, parse_counts
+    df_site = select_site_columns(df).copy()
+    # Comptages en petits entiers (0 si vide ou illisible), fournisseurs en catégories
+    for col in SITE_COUNT_COLUMNS:
+        if col in df_site.columns: df_site[col] = pd.to_numeric(parse_counts(df_site[col]), downcast='integer').to_numpy()
+    for col in SITE_CATEGORY_COLUMNS:
+        if col in df_site.columns: df_site[col] = df_site[col].astype('category')
+    df_site = df_site.reset_index(drop=True)
+    return SiteCatalog(df_site, search_columns=SITE_SEARCH_COLUMNS, photo_rules=SECTION_PHOTO_RULES, rename_map=PROJECT_RENAME_MAP)
+
+def make_site_record(project_data):
+    """Ligne projet hors catalogue (ex. reprise depuis le journal) : photos attendues calculées une fois."""
+    from sites import SiteRecord
+    if isinstance(project_data, SiteRecord): return project_data
+    return SiteRecord(project_data, {section: get_expected_photo_count(section, project_data) for section in SECTION_PHOTO_RULES})
+
+# --- LOGIQUE MÉTIER ---
+def get_expected_photo_count(section_name, project_data):
+    if section_name.strip() not in SECTION_PHOTO_RULES:
+        return None, None 
+    # Ligne issue du catalogue (SiteRecord) : valeurs déjà calculées au chargement de 'Sites'
+    precomputed = getattr(project_data, 'expected_photos', None)
+    if precomputed and section_name.strip() in precomputed:
+        return precomputed[section_name.strip()]
+
+    import pandas as pd
+    columns = SECTION_PHOTO_RULES[section_name.strip()]
+    total_expected = 0
+    details = []
+
+    for col in columns:
+        val = project_data.get(col, 0)
+        try:
+            if pd.isna(val) or val == "":
+                num = 0
+            else:
+                num = int(float(str(val).replace(',', '.'))) 
+        except Exception:
+            num = 0
+        total_expected += num
+        short_name = PROJECT_RENAME_MAP.get(col, col) 
+        details.append(f"{num} {short_name}")
+
+    detail_str = " + ".join(details)
+    return total_expected, detail_str
+
+def get_row_condition(row):
+    condition = row.get('condition')
+    if isinstance(condition, Condition): return condition
+    return compile_row_condition(row.get('Condition on', 0), row.get('Condition value', ''))[0]
+
+def check_condition(row, answer_view):
+    # answer_view : AnswerIndex.view(réponses de la phase en cours)
+    condition = get_row_condition(row)
+    if not condition.refs: return True
+    return condition.evaluate(answer_view)
+
+@metrics.timed('validate_section')
+def validate_section(structure, section_name, answers, answer_index, project_data):
+    missing = []
+    answer_view = answer_index.view(answers)
+    comment_val = answers.get(COMMENT_ID)
+    has_justification = comment_val is not None and str(comment_val).strip() != ""
+    
+    # Passage unique : visibilité, photos et réponses obligatoires manquantes
+    photo_question_count = 0
+    current_photo_count = 0
+    for q in structure.plan(section_name).questions:
+        if not q.condition.evaluate(answer_view): continue
+        val = answers.get(q.id)
+        if q.is_photo:
+            photo_question_count += 1
+            if isinstance(val, list):
+                current_photo_count += len(val)
+        if q.id == COMMENT_ID or not q.mandatory: continue
+        if q.is_photo:
+            if not isinstance(val, list) or len(val) == 0:
+                missing.append(f"Question {q.id} : {q.text} (Au moins une photo est requise)")
+        else:
+            if isinstance(val, list):
+                if not val: missing.append(f"Question {q.id} : {q.text} (fichier(s) manquant(s))")
+            elif val is None or val == "" or (isinstance(val, (int, float)) and val == 0):
+                missing.append(f"Question {q.id} : {q.text}")
+    photo_questions_found = photo_question_count > 0
+
+    expected_total_base, detail_str = get_expected_photo_count(section_name.strip(), project_data)
+    expected_total = expected_total_base
+    if expected_total is not None and expected_total > 0:
+        expected_total = expected_total_base * photo_question_count
+        detail_str = f"{detail_str} | Questions photo visibles: {photo_question_count} -> Total ajusté: {expected_total}"
+
+    is_photo_count_incorrect = False
+    if expected_total is not None and expected_total > 0:
+        if photo_questions_found and current_photo_count != expected_total:
+            is_photo_count_incorrect = True
+            error_message = (
+                f"⚠️ **Écart de Photos pour '{str(section_name)}'**.\n"
+                f"Attendu : **{str(expected_total)}** (calculé : {str(detail_str)}).\n"
+                f"Reçu : **{str(current_photo_count)}**.\n"
+            )
+            if not has_justification:
+                missing.append(
+                    f"**Commentaire (ID {COMMENT_ID}) :** {COMMENT_QUESTION} "
+                    f"(requis en raison de l'écart de photo). \n\n {error_message}"
+                )
+
+    if not is_photo_count_incorrect and COMMENT_ID in answers:
+        del answers[COMMENT_ID]
+
+    return len(missing) == 0, missing
+
+# --- EXPORTS ---
+
+# Les exports sont écrits dans des fichiers temporaires "spoolés" : en mémoire
+# jusqu'à EXPORT_SPOOL_MAX_SIZE octets, sur disque au-delà.
+EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+def new_export_spool():
+    return tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, mode='w+b')
+
+def read_export(spool):
+    # Utilisé au moment du clic (téléchargement différé) : une seule copie en mémoire
+    spool.seek(0)
+    data = spool.read()
+    spool.seek(0)
+    return data
+
+def define_custom_styles(doc):
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt, RGBColor
+    try: title_style = doc.styles.add_style('Report Title', WD_STYLE_TYPE.PARAGRAPH)
+    except: title_style = doc.styles['Report Title']
+    title_font = title_style.font
+    title_font.name, title_font.size, title_font.bold = 'Arial', Pt(20), True
+    title_font.color.rgb = RGBColor(0x01, 0x38, 0x2D)
+    title_style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    title_style.paragraph_format.space_after = Pt(20)
+
+    try: subtitle_style = doc.styles.add_style('Report Subtitle', WD_STYLE_TYPE.PARAGRAPH)
+    except: subtitle_style = doc.styles['Report Subtitle']
+    subtitle_font = subtitle_style.font
+    subtitle_font.name, subtitle_font.size, subtitle_font.bold = 'Arial', Pt(14), True
+    subtitle_font.color.rgb = RGBColor(0x00, 0x56, 0x47)
+    subtitle_style.paragraph_format.space_after = Pt(10)
+
+    try: text_style = doc.styles.add_style('Report Text', WD_STYLE_TYPE.PARAGRAPH)
+    except: text_style = doc.styles['Report Text']
+    text_font = text_style.font
+    text_font.name, text_font.size = 'Calibri', Pt(11)
+    text_style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+
+def is_file_answer(answer):
+    return (isinstance(answer, list) and bool(answer) and hasattr(answer[0], 'read')) or hasattr(answer, 'read')
+
+@metrics.timed('export_word', payload=metrics.spool_size)
+def create_word_report(collected_data, structure, project_data, form_start_time, image_profile=DEFAULT_IMAGE_PROFILE, form_end_time=None):
+    # Photos des réponses, dans l'ordre où elles sont insérées dans le document
+    photo_files = [
+        f for phase in collected_data for answer in phase['answers'].values() if is_file_answer(answer)
+        for f in (answer if isinstance(answer, list) else [answer])
+    ]
+    # Photos préparées au fil de l'insertion (fenêtre bornée), jamais toutes en mémoire à la fois
+    prepared_photos = prepare_images(photo_files, image_profile)
+
+    from docx import Document
+    from docx.enum.table import WD_ALIGN_VERTICAL
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches, Pt
+    doc = Document()
+    define_custom_styles(doc)
+    
+    doc.add_paragraph('Rapport d\'Audit Chantier', style='Report Title')
+
+    doc.add_paragraph('Informations du Projet', style='Report Subtitle')
+    project_table = doc.add_table(rows=3, cols=2)
+    project_table.style = 'Light Grid Accent 1'
+    
+    project_table.rows[0].cells[0].text = 'Intitulé'
+    project_table.rows[0].cells[1].text = str(project_data.get('Intitulé', 'N/A'))
+    
+    start_time_str = form_start_time.strftime('%d/%m/%Y %H:%M') if form_start_time else "N/A"
+    project_table.rows[1].cells[0].text = 'Date de début'
+    project_table.rows[1].cells[1].text = start_time_str
+    project_table.rows[2].cells[0].text = 'Date de fin'
+    project_table.rows[2].cells[1].text = (form_end_time or datetime.now()).strftime('%d/%m/%Y %H:%M')
+
+    for row in project_table.rows:
+        for cell in row.cells:
+            for p in cell.paragraphs: p.style = 'Report Text'
+    
+    doc.add_paragraph()
+    doc.add_paragraph('Détails du Projet', style='Report Subtitle')
+    for group in DISPLAY_GROUPS:
+        for field_key in group:
+            renamed_key = PROJECT_RENAME_MAP.get(field_key, field_key)
+            value = project_data.get(field_key, 'N/A')
+            p = doc.add_paragraph(style='Report Text')
+            p.add_run(f'{renamed_key}: ').bold = True
+            p.add_run(str(value))
+    
+    doc.add_page_break()
+    
+    for phase_idx, phase in enumerate(collected_data):
+        doc.add_paragraph(f'Phase: {phase["phase_name"]}', style='Report Subtitle')
+        
+        for q_id, answer in phase['answers'].items():
+            q_text = COMMENT_QUESTION if int(q_id) == COMMENT_ID else structure.question_text(q_id)
+            
+            is_photo = is_file_answer(answer)
+            
+            if is_photo:
+                doc.add_paragraph(f'Q{q_id}: {q_text}', style='Report Subtitle')
+                photos = answer if isinstance(answer, list) else [answer]
+                for idx, f_obj in enumerate(photos):
+                    image_data = next(prepared_photos)
+                    try:
+                        if isinstance(image_data, Exception): raise image_data
+                        doc.add_picture(BytesIO(image_data), width=Inches(REPORT_IMAGE_WIDTH_INCHES))
+                        cap = doc.add_paragraph(f'Photo {idx+1}: {f_obj.name}', style='Report Text')
+                        cap.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                        if cap.runs: 
+                            cap.runs[0].font.size, cap.runs[0].font.italic = Pt(9), True
+                    except: doc.add_paragraph(f"[Erreur Photo {idx+1}]", style='Report Text')
+                doc.add_paragraph()
+            else:
+                t = doc.add_table(rows=1, cols=2)
+                t.style = 'Light Grid Accent 1'
+                t.cell(0,0).text = f'Q{q_id}: {q_text}'
+                t.cell(0,1).text = str(answer)
+                for cell in t.rows[0].cells:
+                    cell.paragraphs[0].style = 'Report Text'
+                    cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
+                t.cell(0,0).paragraphs[0].runs[0].bold = True
+                doc.add_paragraph()
+        
+        if phase_idx < len(collected_data) - 1: doc.add_page_break()
+    
+    spool = new_export_spool()
+    doc.save(spool)
+    spool.seek(0)
+    return spool
+
+def build_submission_row(collected_data, project_data, submission_id):
+    """
+    Ligne de soumission (clés SUBMISSION_COLUMNS), données complexes sérialisées en JSON.
+    NOTE: Les photos ne sont PAS uploadées. Seuls les noms de fichiers sont conservés.
+    """
+    # 1. Nettoyage et conversion des données pour le JSON
+    cleaned_data = []
+    for phase in collected_data:
+        clean_phase = {"phase_name": phase["phase_name"], "answers": {}}
+        for k, v in phase["answers"].items():
+            # Transformation des objets fichiers en chaînes de caractères (noms)
+            if isinstance(v, list) and v and hasattr(v[0], 'read'): 
+                file_names = ", ".join([f.name for f in v])
+                clean_phase["answers"][str(k)] = f"Fichiers: {file_names}"
+            elif hasattr(v, 'read'): 
+                 clean_phase["answers"][str(k)] = f"Fichier: {v.name}"
+            else:
+                clean_phase["answers"][str(k)] = v
+        cleaned_data.append(clean_phase)
+    
+    json_dump = json.dumps(cleaned_data, ensure_ascii=False)
+    
+    # 2. Création de la ligne à insérer
+    return {
+        "ID": submission_id,
+        "Date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "Projet": project_data.get('Intitulé', 'N/A'),
+        "Donnees_JSON": json_dump
+    }
+
+@metrics.timed('export_csv', payload=metrics.spool_size)
+def create_csv_export(collected_data, structure, project_name, submission_id, start_time):
+    data_for_df = []
+    for phase in collected_data:
+        for q_id, answer in phase['answers'].items():
+            if not is_file_answer(answer):
+                q_text = COMMENT_QUESTION if int(q_id) == COMMENT_ID else structure.question_text(q_id)
+                data_for_df.append({
+                    'Projet': project_name, 'Phase': phase['phase_name'],
+                    'Question_ID': q_id, 'Question': q_text, 'Réponse': answer
+                })
+    import pandas as pd
+    spool = new_export_spool()
+    pd.DataFrame(data_for_df).to_csv(spool, index=False, encoding='utf-8')
+    spool.seek(0)
+    return spool
+
+@metrics.timed('export_zip', payload=metrics.spool_size)
+def create_zip_export(collected_data):
+    spool = new_export_spool()
+    # Photos déjà compressées (JPEG/PNG) : stockées telles quelles, copiées entrée par entrée
+    with zipfile.ZipFile(spool, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+        for phase in collected_data:
+            for q_id, files in phase['answers'].items():
+                photos = files if isinstance(files, list) else [files]
+                for i, f in enumerate(photos):
+                    if hasattr(f, 'read'):
+                        with open_answer_file(f) as src, zip_file.open(f"{phase['phase_name']}_Q{q_id}_{i}.jpg", 'w', force_zip64=True) as entry:
+                            shutil.copyfileobj(src, entry, length=1024 * 1024)
+    spool.seek(0)
+    return spool
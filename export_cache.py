@@ -0,0 +1,125 @@
+# export_cache.py
+# Cache des exports générés (CSV, ZIP, Word), borné en taille et en durée de vie.
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Exports passés sur disque (SpooledTemporaryFile au-delà de EXPORT_SPOOL_MAX_SIZE)
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('VISITE_EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Exports restés en mémoire (petits CSV/ZIP/Word) : budget séparé, bien plus petit, car pris sur la RAM du serveur
+EXPORT_CACHE_MAX_MEMORY_BYTES = int(os.environ.get('VISITE_EXPORT_CACHE_MAX_MEMORY_BYTES', 32 * 1024 * 1024))
+EXPORT_CACHE_TTL = int(os.environ.get('VISITE_EXPORT_CACHE_TTL', 3600))
+
+
+def _file_token(f):
+    # Identifiant stable d'un fichier sans relire son contenu quand c'est possible
+    for attr in ('digest', 'file_id'):
+        value = getattr(f, attr, None)
+        if value: return f"{attr}:{value}"
+    f.seek(0)
+    digest = hashlib.sha256(f.read()).hexdigest()
+    f.seek(0)
+    return f"sha256:{digest}"
+
+
+def answers_fingerprint(collected_data):
+    """Empreinte du contenu des réponses (valeurs + identité des fichiers)."""
+    h = hashlib.blake2b(digest_size=16)
+    for phase in collected_data:
+        h.update(b'\x00phase\x00' + str(phase['phase_name']).encode())
+        for q_id, answer in phase['answers'].items():
+            h.update(b'\x00q\x00' + str(q_id).encode() + b'\x00')
+            values = answer if isinstance(answer, list) else [answer]
+            for value in values:
+                if hasattr(value, 'read'):
+                    h.update(f"file:{getattr(value, 'name', '')}:{_file_token(value)}".encode())
+                else:
+                    h.update(json.dumps(value, ensure_ascii=False, default=str).encode())
+                h.update(b'\x01')
+    return h.hexdigest()
+
+
+class CachedExport:
+    """Export spoolé partagé : lecture protégée par un verrou (plusieurs clics simultanés)."""
+    __slots__ = ('spool', 'size', 'in_memory', 'created', '_lock')
+
+    def __init__(self, spool):
+        self.spool = spool
+        spool.seek(0, os.SEEK_END)
+        self.size = spool.tell()
+        spool.seek(0)
+        # SpooledTemporaryFile pas encore passé sur disque : son contenu est un BytesIO
+        self.in_memory = isinstance(getattr(spool, '_file', spool), io.BytesIO)
+        self.created = time.monotonic()
+        self._lock = threading.Lock()
+
+    def read(self):
+        with self._lock:
+            self.spool.seek(0)
+            return self.spool.read()
+
+
+class ExportCache:
+    """
+    LRU borné par la taille totale des exports et par leur âge (TTL). Les exports
+    restés en mémoire ont leur propre budget (max_memory_bytes), distinct de celui
+    des exports passés sur disque (max_bytes).
+    Une entrée évincée n'est pas fermée : un bouton de téléchargement qui la
+    référence encore reste valide, le fichier est libéré avec la dernière référence.
+    """
+
+    def __init__(self, max_bytes=EXPORT_CACHE_MAX_BYTES, ttl=EXPORT_CACHE_TTL, max_memory_bytes=EXPORT_CACHE_MAX_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Octets cachés par emplacement : {en mémoire ?: total}
+        self._totals = {True: 0, False: 0}
+        self._lock = threading.Lock()
+
+    def _limit(self, entry):
+        return self.max_memory_bytes if entry.in_memory else self.max_bytes
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._totals[entry.in_memory] -= entry.size
+
+    def _evict(self, now):
+        # Du moins récemment utilisé au plus récent : expirées, ou au-delà du budget de leur emplacement
+        for key, entry in list(self._entries.items()):
+            if now - entry.created > self.ttl or self._totals[entry.in_memory] > self._limit(entry):
+                self._remove(key)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            if now - entry.created > self.ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def get_or_build(self, key, build):
+        entry = self.get(key)
+        if entry is not None: return entry
+        entry = CachedExport(build())
+        if entry.size > self._limit(entry): return entry
+        with self._lock:
+            if key in self._entries: self._remove(key)
+            self._entries[key] = entry
+            self._totals[entry.in_memory] += entry.size
+            self._evict(time.monotonic())
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries), "bytes": self._totals[False], "max_bytes": self.max_bytes,
+                "memory_bytes": self._totals[True], "max_memory_bytes": self.max_memory_bytes, "ttl": self.ttl,
+            }
@@ -0,0 +1,147 @@
+# form_structure.py
+# Représentation typée de l'onglet 'Questions', construite une seule fois au chargement.
+from dataclasses import dataclass
+
+from conditions import Condition, compile_row_condition
+
+
+@dataclass(frozen=True)
+class Question:
+    id: int
+    section: str
+    text: str
+    type: str
+    mandatory: bool
+    options: tuple
+    description: str
+    condition: Condition
+
+    @property
+    def is_photo(self):
+        return self.type == 'photo'
+
+
+@dataclass(frozen=True)
+class SectionPlan:
+    """Questions d'une section dans l'ordre de la feuille, prêtes pour validate_section."""
+    section: str
+    questions: tuple
+
+
+def find_cycles(graph):
+    """
+    Cycles du graphe {id: ids dont il dépend} (parcours en profondeur itératif).
+    Chaque cycle est retourné une fois, sous la forme [a, b, ..., a].
+    """
+    IN_PROGRESS, DONE = 1, 2
+    state = {}
+    cycles = []
+    for root in sorted(graph):
+        if state.get(root): continue
+        state[root] = IN_PROGRESS
+        path, stack = [root], [iter(sorted(graph.get(root, ())))]
+        while stack:
+            nxt = next(stack[-1], None)
+            if nxt is None:
+                state[path.pop()] = DONE
+                stack.pop()
+            elif state.get(nxt) == IN_PROGRESS:
+                cycles.append(path[path.index(nxt):] + [nxt])
+            elif not state.get(nxt):
+                state[nxt] = IN_PROGRESS
+                path.append(nxt)
+                stack.append(iter(sorted(graph.get(nxt, ()))))
+    return cycles
+
+
+class FormStructure:
+    """
+    Structure du formulaire : DataFrame nettoyé + enregistrements typés
+    (Question) indexés par ID, questions triées par section, liste des phases
+    et plans de validation. Partagée entre reruns : ne pas la modifier.
+    """
+
+    def __init__(self, df):
+        import pandas as pd
+        self.df = df
+        self.condition_errors = []
+        compiled = []
+        by_section = {}
+        self.questions = {}
+        ids = pd.to_numeric(df['id'], errors='coerce').fillna(0).astype(int)
+        for q_id, (_, row) in zip(ids, df.iterrows()):
+            condition, errors = compile_row_condition(row['Condition on'], row['Condition value'])
+            compiled.append(condition)
+            self.condition_errors.extend(f"Question {q_id} : {err}" for err in errors)
+            options = str(row['options'])
+            question = Question(
+                id=int(q_id),
+                section=row['section'],
+                text=row['question'],
+                type=str(row['type']).strip().lower(),
+                mandatory=str(row['obligatoire']).strip().lower() == 'oui',
+                options=tuple(o.strip() for o in options.split(',')) if options else (),
+                description=row['Description'],
+                condition=condition,
+            )
+            by_section.setdefault(question.section, []).append(question)
+            self.questions.setdefault(question.id, question)
+        df['condition'] = compiled
+        # Graphe des dépendances : question référencée -> questions dont la condition la lit
+        self.dependents = {}
+        for questions in by_section.values():
+            for question in questions:
+                for ref in question.condition.refs:
+                    self.dependents.setdefault(ref, set()).add(question.id)
+        self.dependents = {ref: frozenset(ids) for ref, ids in self.dependents.items()}
+        # Questions dont la réponse conditionne l'affichage d'autres questions (toutes sections / par section)
+        self.condition_refs = frozenset(self.dependents)
+        self._section_refs = {
+            section: frozenset().union(*(q.condition.refs for q in questions)) for section, questions in by_section.items()
+        }
+        self._transitive = {}
+        depends_on = {}
+        for ref, ids in self.dependents.items():
+            for q_id in ids: depends_on.setdefault(q_id, set()).add(ref)
+        self.condition_errors.extend(
+            "Dépendance circulaire : " + " → ".join(str(q_id) for q_id in cycle) for cycle in find_cycles(depends_on)
+        )
+        self.plans = {section: SectionPlan(section, tuple(questions)) for section, questions in by_section.items()}
+        # Questions triées par ID pour l'affichage
+        self._sections = {section: tuple(sorted(questions, key=lambda q: q.id)) for section, questions in by_section.items()}
+
+        self.id_section = df['section'].iloc[0] if len(df) else None
+        excluded = {str(self.id_section).strip().lower(), "phase"}
+        self.phases = tuple(
+            sec for sec in by_section
+            if not (pd.isna(sec) or not sec or str(sec).strip().lower() in excluded)
+        )
+
+    def section_refs(self, section_name):
+        return self._section_refs.get(section_name, frozenset())
+
+    def transitive_dependents(self, ids):
+        """Questions dont la visibilité peut changer si les réponses de `ids` changent (fermeture transitive)."""
+        result = set()
+        for q_id in ids:
+            closure = self._transitive.get(q_id)
+            if closure is None:
+                closure, pending = set(), [q_id]
+                while pending:
+                    for dependent in self.dependents.get(pending.pop(), ()):
+                        if dependent not in closure:
+                            closure.add(dependent)
+                            pending.append(dependent)
+                closure = self._transitive[q_id] = frozenset(closure)
+            result |= closure
+        return result
+
+    def question_text(self, q_id):
+        question = self.questions.get(int(q_id))
+        return question.text if question is not None else f"ID {q_id}"
+
+    def section_questions(self, section_name):
+        return self._sections.get(section_name, ())
+
+    def plan(self, section_name):
+        return self.plans.get(section_name) or SectionPlan(section_name, ())
@@ -0,0 +1,101 @@
+# images.py
+# Redimensionnement / recompression des photos avant insertion dans le rapport Word.
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from itertools import islice
+
+from photo_store import read_answer_file
+
+REPORT_IMAGE_WIDTH_INCHES = 5
+
+
+@dataclass(frozen=True)
+class ImageProfile:
+    name: str
+    label: str
+    dpi: int = None        # None : octets d'origine, sans recompression
+    quality: int = 85
+
+
+IMAGE_PROFILES = {
+    'email': ImageProfile('email', "Email (léger)", dpi=110, quality=70),
+    'print': ImageProfile('print', "Impression", dpi=220, quality=85),
+    'archive': ImageProfile('archive', "Archive (photos d'origine)"),
+}
+DEFAULT_IMAGE_PROFILE = os.environ.get('VISITE_IMAGE_PROFILE', 'email')
+IMAGE_WORKERS = int(os.environ.get('VISITE_IMAGE_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+def get_image_profile(profile):
+    if isinstance(profile, ImageProfile): return profile
+    return IMAGE_PROFILES.get(profile or DEFAULT_IMAGE_PROFILE, IMAGE_PROFILES['email'])
+
+
+def prepare_image(data, profile, width_inches=REPORT_IMAGE_WIDTH_INCHES):
+    """
+    Réduit l'image à la largeur affichée (width_inches x dpi du profil) et la réencode en JPEG.
+    Retourne les octets d'origine si le profil les conserve, si l'image est déjà assez
+    petite, ou si elle n'est pas décodable (python-docx signalera l'erreur à l'insertion).
+    """
+    profile = get_image_profile(profile)
+    if profile.dpi is None: return data
+    from PIL import Image, ImageOps
+    target_px = int(width_inches * profile.dpi)
+    try:
+        with Image.open(BytesIO(data)) as img:
+            if img.format == 'JPEG' and max(img.size) <= target_px: return data
+            # Décodage JPEG directement à une échelle réduite (1/2, 1/4, 1/8) quand c'est possible
+            img.draft('RGB', (target_px, target_px))
+            img = ImageOps.exif_transpose(img)
+            if img.width > target_px:
+                img = img.resize((target_px, max(1, round(img.height * target_px / img.width))), Image.LANCZOS)
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            elif img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            out = BytesIO()
+            img.save(out, 'JPEG', quality=profile.quality, optimize=True)
+            return out.getvalue()
+    except Exception:
+        return data
+
+
+def prepare_images(file_objects, profile, width_inches=REPORT_IMAGE_WIDTH_INCHES, max_workers=IMAGE_WORKERS, window=None):
+    """
+    Lit et prépare les fichiers en parallèle (Pillow libère le GIL pendant le décodage,
+    le redimensionnement et l'encodage). Générateur : produit, dans l'ordre, les octets
+    prêts à insérer ou l'exception rencontrée pour chaque fichier. Au plus `window`
+    images (2 x max_workers par défaut) sont préparées d'avance : chacune peut être
+    insérée puis libérée avant que les suivantes ne soient lues.
+    """
+    profile = get_image_profile(profile)
+
+    def _load(f_obj):
+        try:
+            return prepare_image(read_answer_file(f_obj), profile, width_inches)
+        except Exception as e:
+            return e
+
+    if max_workers <= 1 or len(file_objects) <= 1:
+        for f in file_objects: yield _load(f)
+        return
+    window = window or 2 * max_workers
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = deque()
+        files = iter(file_objects)
+        for f in islice(files, window): pending.append(pool.submit(_load, f))
+        while pending:
+            result = pending.popleft().result()
+            for f in islice(files, 1): pending.append(pool.submit(_load, f))
+            yield result
+            result = None
+    finally:
+        # Générateur abandonné (ex. erreur pendant la génération du document) : tâches restantes annulées
+        pool.shutdown(wait=True, cancel_futures=True)
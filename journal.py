@@ -0,0 +1,185 @@
+# journal.py
+# Journal local (SQLite, WAL) des audits en cours : chaque phase validée est ajoutée en une écriture,
+# le brouillon de la phase en cours est remplacé à chaque modification. Permet la reprise après
+# rafraîchissement du navigateur, perte de connexion ou redémarrage du serveur.
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from photo_store import PhotoHandle
+
+DEFAULT_JOURNAL_PATH = os.path.join("data", "audit_journal.db")
+JOURNAL_RETENTION_DAYS = int(os.environ.get('VISITE_JOURNAL_RETENTION_DAYS', 30))
+_PHOTO_KEY = "__photo__"
+
+
+# --- Sérialisation des réponses ---
+def _encode_value(value):
+    if isinstance(value, PhotoHandle): return {_PHOTO_KEY: value.to_dict()}
+    if isinstance(value, list): return [_encode_value(v) for v in value]
+    return value
+
+
+def encode_answers(answers):
+    return json.dumps({str(k): _encode_value(v) for k, v in answers.items()}, ensure_ascii=False, default=str)
+
+
+def _photo_handles(answers):
+    return [v for value in answers.values() for v in (value if isinstance(value, list) else [value]) if isinstance(v, PhotoHandle)]
+
+
+def _photo_digests(value, digests):
+    if isinstance(value, dict):
+        if _PHOTO_KEY in value: digests.add(value[_PHOTO_KEY]["digest"])
+        else:
+            for v in value.values(): _photo_digests(v, digests)
+    elif isinstance(value, list):
+        for v in value: _photo_digests(v, digests)
+    return digests
+
+
+def decode_answers(payload, photo_store):
+    def _decode(value):
+        if isinstance(value, dict) and _PHOTO_KEY in value:
+            ref = value[_PHOTO_KEY]
+            return photo_store.handle(ref["digest"], ref["name"], ref.get("size"))
+        if isinstance(value, list): return [_decode(v) for v in value]
+        return value
+    # Les identifiants de question sont des entiers dans collected_data
+    return {(int(k) if k.lstrip('-').isdigit() else k): _decode(v) for k, v in json.loads(payload).items()}
+
+
+class AuditJournal:
+    def __init__(self, photo_store, path=DEFAULT_JOURNAL_PATH):
+        self.photo_store = photo_store
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder: os.makedirs(folder, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS audits ("
+                " submission_id TEXT PRIMARY KEY, project_json TEXT, form_start TEXT, form_version TEXT,"
+                " created REAL NOT NULL, updated REAL NOT NULL, finished INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS phases ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, submission_id TEXT NOT NULL,"
+                " phase_name TEXT, answers_json TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_phases_audit ON phases (submission_id, seq)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS brouillons ("
+                " submission_id TEXT PRIMARY KEY, phase_name TEXT, answers_json TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _conn(self):
+        # Une transaction par opération (connexion ouverte puis fermée, comme submission_store)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + synchronous=NORMAL : une phase validée survit à un arrêt du processus
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Écritures ---
+    def start(self, submission_id, project_data, form_start, form_version=None):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO audits (submission_id, project_json, form_start, form_version, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (submission_id, json.dumps(project_data, ensure_ascii=False, default=str),
+                 form_start.isoformat() if form_start else None, form_version, now, now),
+            )
+
+    def append_phase(self, submission_id, entry):
+        """Ajoute une phase validée ; retourne son numéro de séquence. Le brouillon est effacé."""
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO phases (submission_id, phase_name, answers_json, created) VALUES (?, ?, ?, ?)",
+                (submission_id, entry["phase_name"], encode_answers(entry["answers"]), now),
+            )
+            conn.execute("DELETE FROM brouillons WHERE submission_id = ?", (submission_id,))
+            conn.execute("UPDATE audits SET updated = ? WHERE submission_id = ?", (now, submission_id))
+            seq = cur.lastrowid
+        # Photos de la phase : même durée de vie que l'audit qui les référence
+        self.photo_store.touch(_photo_handles(entry["answers"]))
+        return seq
+
+    def save_draft(self, submission_id, phase_name, answers, previous=None):
+        """
+        Remplace le brouillon de la phase en cours (réponses hors fichiers). Retourne la clé
+        du brouillon ; si elle est égale à previous (aucun changement), rien n'est écrit.
+        """
+        payload = encode_answers({k: v for k, v in answers.items() if not _is_file_list(v)})
+        if (phase_name, payload) == previous: return previous
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO brouillons (submission_id, phase_name, answers_json, updated) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(submission_id) DO UPDATE SET phase_name = excluded.phase_name,"
+                " answers_json = excluded.answers_json, updated = excluded.updated",
+                (submission_id, phase_name, payload, time.time()),
+            )
+        return (phase_name, payload)
+
+    def finish(self, submission_id):
+        with self._conn() as conn:
+            conn.execute("UPDATE audits SET finished = 1, updated = ? WHERE submission_id = ?", (time.time(), submission_id))
+            conn.execute("DELETE FROM brouillons WHERE submission_id = ?", (submission_id,))
+
+    # --- Lectures ---
+    def load(self, submission_id, after_seq=0):
+        """
+        Retourne l'audit (projet, début, version, phases après after_seq, brouillon, dernier seq),
+        ou None s'il est inconnu. after_seq > 0 : seul le delta est relu.
+        """
+        with self._conn() as conn:
+            meta = conn.execute(
+                "SELECT project_json, form_start, form_version, finished FROM audits WHERE submission_id = ?", (submission_id,)
+            ).fetchone()
+            if meta is None: return None
+            rows = conn.execute(
+                "SELECT seq, phase_name, answers_json FROM phases WHERE submission_id = ? AND seq > ? ORDER BY seq",
+                (submission_id, after_seq),
+            ).fetchall()
+            draft = conn.execute("SELECT phase_name, answers_json FROM brouillons WHERE submission_id = ?", (submission_id,)).fetchone()
+        phases = [{"phase_name": name, "answers": decode_answers(payload, self.photo_store)} for _, name, payload in rows]
+        for phase in phases: self.photo_store.touch(_photo_handles(phase["answers"]))
+        return {
+            "project_data": json.loads(meta[0]) if meta[0] else {},
+            "form_start": datetime.fromisoformat(meta[1]) if meta[1] else None,
+            "form_version": meta[2],
+            "finished": bool(meta[3]),
+            "phases": phases,
+            "last_seq": rows[-1][0] if rows else after_seq,
+            "draft": {"phase_name": draft[0], "answers": decode_answers(draft[1], self.photo_store)} if draft else None,
+        }
+
+    def prune(self, max_age_days=JOURNAL_RETENTION_DAYS):
+        limit = time.time() - max_age_days * 86400
+        with self._conn() as conn:
+            old = [r[0] for r in conn.execute("SELECT submission_id FROM audits WHERE updated < ?", (limit,))]
+            for submission_id in old:
+                for table in ("phases", "brouillons", "audits"):
+                    conn.execute(f"DELETE FROM {table} WHERE submission_id = ?", (submission_id,))
+        return len(old)
+
+    def photo_digests(self):
+        """Empreintes des photos référencées par les audits du journal (à conserver dans le PhotoStore)."""
+        digests = set()
+        with self._conn() as conn:
+            for (payload,) in conn.execute("SELECT answers_json FROM phases"):
+                _photo_digests(json.loads(payload), digests)
+        return digests
+
+
+def _is_file_list(value):
+    return hasattr(value, 'read') or (isinstance(value, list) and any(hasattr(v, 'read') for v in value))
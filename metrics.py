@@ -0,0 +1,219 @@
+# metrics.py
+# Mesures de performance en mémoire (par processus) : histogrammes de durée par opération
+# et compteurs de volume, exportables en JSON ou au format texte Prometheus.
+# Activées par VISITE_METRICS=1 ; sinon les décorateurs rendent la fonction d'origine
+# et les chronomètres sont un objet vide partagé (coût quasi nul).
+import bisect
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+ENABLED = os.environ.get('VISITE_METRICS', '').strip().lower() in ('1', 'true', 'oui', 'yes')
+# Bornes supérieures des classes de durée (secondes), à la manière des histogrammes Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+PREFIX = "visite"
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max: self.max = value
+
+    def quantile(self, q):
+        # Estimation par interpolation linéaire dans la classe concernée
+        if not self.count: return None
+        rank, seen, lower = q * self.count, 0, 0.0
+        for upper, n in zip(BUCKETS, self.counts):
+            if n and seen + n >= rank:
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * max(0.0, rank - seen) / n
+            seen += n
+            lower = upper
+        return self.max
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+            self.started = time.time()
+
+    def observe(self, operation, seconds, **labels):
+        key = _key(operation, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None: histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            histograms = [(k, h.count, h.sum, h.max, list(h.counts), h.quantile(0.5), h.quantile(0.95)) for k, h in self._histograms.items()]
+            counters = list(self._counters.items())
+        return {
+            "enabled": ENABLED,
+            "started": self.started,
+            "histograms": [
+                {
+                    "operation": name, "labels": dict(labels), "count": count, "sum_s": total, "max_s": maximum,
+                    "mean_s": total / count if count else None, "p50_s": p50, "p95_s": p95,
+                    "buckets": [["+Inf" if b == float('inf') else b, n] for b, n in zip(BUCKETS, counts)],
+                }
+                for (name, labels), count, total, maximum, counts, p50, p95 in sorted(histograms, key=lambda h: h[0])
+            ],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(counters)],
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        lines = [
+            f"# HELP {PREFIX}_operation_seconds Durée des opérations instrumentées.",
+            f"# TYPE {PREFIX}_operation_seconds histogram",
+        ]
+        for h in snap["histograms"]:
+            labels = {"operation": h["operation"], **h["labels"]}
+            cumulative = 0
+            for bound, n in h["buckets"]:
+                cumulative += n
+                lines.append(f"{PREFIX}_operation_seconds_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{PREFIX}_operation_seconds_sum{_format_labels(labels)} {h['sum_s']:.6f}")
+            lines.append(f"{PREFIX}_operation_seconds_count{_format_labels(labels)} {h['count']}")
+        for name in sorted({c["name"] for c in snap["counters"]}):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            for c in snap["counters"]:
+                if c["name"] == name: lines.append(f"{PREFIX}_{name}_total{_format_labels(c['labels'])} {c['value']}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels: return ""
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# --- Points d'instrumentation ---
+class _Stopwatch:
+    __slots__ = ('operation', 'labels', 'start')
+
+    def __init__(self, operation, labels):
+        self.operation, self.labels = operation, labels
+        self.start = time.perf_counter()
+
+    def stop(self):
+        # Idempotent : seul le premier arrêt est enregistré
+        if self.start is None: return
+        REGISTRY.observe(self.operation, time.perf_counter() - self.start, **self.labels)
+        self.start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _NoopStopwatch:
+    __slots__ = ()
+
+    def stop(self): pass
+    def __enter__(self): return self
+    def __exit__(self, *exc): pass
+
+
+_NOOP = _NoopStopwatch()
+
+
+def timer(operation, **labels):
+    """Chronomètre (bloc with ou .stop()) ; objet vide partagé si les mesures sont désactivées."""
+    return _Stopwatch(operation, labels) if ENABLED else _NOOP
+
+
+def inc(name, value=1, **labels):
+    if ENABLED: REGISTRY.inc(name, value, **labels)
+
+
+def timed(operation, payload=None, **labels):
+    """
+    Décorateur : durée de chaque appel ; payload(résultat) -> octets alimente le compteur
+    'payload_bytes'. Sans mesures, la fonction est retournée telle quelle.
+    """
+    def decorator(fn):
+        if not ENABLED: return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                REGISTRY.observe(operation, time.perf_counter() - start, **labels)
+            if payload is not None:
+                REGISTRY.inc('payload_bytes', payload(result), operation=operation, **labels)
+                REGISTRY.inc('payloads', 1, operation=operation, **labels)
+            return result
+        return wrapper
+    return decorator
+
+
+def spool_size(spool):
+    """Taille d'un export (fichier temporaire) sans le lire ; la position est remise au début."""
+    spool.seek(0, os.SEEK_END)
+    size = spool.tell()
+    spool.seek(0)
+    return size
+
+
+# --- Export fichier ---
+def write_file(path):
+    """Écrit l'état courant (JSON si le chemin se termine par .json, texte Prometheus sinon), atomiquement."""
+    folder = os.path.dirname(path)
+    if folder: os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        fh.write(REGISTRY.to_json() if path.endswith('.json') else REGISTRY.to_prometheus())
+    os.replace(tmp, path)
+
+
+def start_file_dump(path, interval=60):
+    """Réécrit le fichier toutes les `interval` secondes (ex. collecteur 'textfile' de node_exporter)."""
+    def _run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_file(path)
+            except OSError:
+                pass
+    thread = threading.Thread(target=_run, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
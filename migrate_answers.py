@@ -0,0 +1,70 @@
+# migrate_answers.py
+# Remplit la table des réponses détaillées (answer_store) à partir des soumissions existantes
+# (onglet 'Reponses' de Google Sheets ou base SQLite des soumissions).
+# Exemples :
+#   python migrate_answers.py --backend sheets
+#   python migrate_answers.py --db data/submissions.db --rebuild
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from answer_store import DEFAULT_ANSWERS_PATH, AnswerStore, explode_record
+from submission_store import build_submission_store
+
+BATCH_SIZE = 500
+
+
+def backfill(source, target, rebuild=False, batch_size=BATCH_SIZE):
+    """Copie les soumissions de source vers target par lots ; retourne (soumissions, lignes, ignorées, erreurs)."""
+    known = set() if rebuild else target.existing_ids()
+    batch, submissions, rows, skipped, errors = [], 0, 0, 0, []
+
+    def _flush():
+        nonlocal rows, submissions
+        if not batch: return
+        rows += target.append_rows(batch)
+        submissions += len(batch)
+        batch.clear()
+
+    for record in source.iter_records():
+        submission_id = str(record.get("ID"))
+        if submission_id in known:
+            skipped += 1
+            continue
+        # Éclatée une seule fois : la validation produit directement les lignes à écrire
+        try:
+            record_rows = explode_record(record)
+        except ValueError as e:
+            errors.append((submission_id, str(e)))
+            continue
+        known.add(submission_id)
+        batch.append((submission_id, record_rows))
+        if len(batch) >= batch_size: _flush()
+    _flush()
+    return submissions, rows, skipped, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migration des soumissions vers la table des réponses détaillées.")
+    parser.add_argument("--backend", help="Source : sqlite (défaut) ou sheets (onglet 'Reponses')")
+    parser.add_argument("--db", help="Base SQLite des soumissions (source sqlite)")
+    parser.add_argument("--answers-db", default=os.environ.get('VISITE_ANSWERS_DB', DEFAULT_ANSWERS_PATH), help="Base cible")
+    parser.add_argument("--rebuild", action="store_true", help="Réécrit aussi les soumissions déjà migrées")
+    args = parser.parse_args(argv)
+
+    source = build_submission_store(args.backend, db_path=args.db)
+    target = AnswerStore(args.answers_db)
+
+    start = datetime.now()
+    submissions, rows, skipped, errors = backfill(source, target, rebuild=args.rebuild)
+    for submission_id, error in errors:
+        print(f"  ✖ {submission_id} : {error}", file=sys.stderr)
+    elapsed = (datetime.now() - start).total_seconds()
+    print(f"{submissions} soumission(s) migrée(s) ({rows} réponses) depuis {source.describe()} vers {target.describe()} "
+          f"en {elapsed:.1f} s ; {skipped} déjà présente(s), {len(errors)} illisible(s).")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# photo_store.py
+# Stockage disque des photos d'audit, adressé par contenu (SHA-256).
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_PHOTO_DIR = os.path.join("data", "photos")
+# Nettoyage de secours : les photos référencées par le journal sont conservées quel que soit leur âge ;
+# ce délai doit rester nettement plus long que celui du journal (VISITE_JOURNAL_RETENTION_DAYS, 30 j)
+PHOTO_RETENTION_DAYS = int(os.environ.get('VISITE_PHOTO_RETENTION_DAYS', 60))
+_CHUNK_SIZE = 1024 * 1024
+
+
+class PhotoHandle:
+    """
+    Référence légère vers une photo stockée : c'est ce qui est conservé dans
+    collected_data à la place de l'UploadedFile. read() relit le fichier à la demande.
+    """
+    __slots__ = ('digest', 'name', 'size', 'root')
+
+    def __init__(self, digest, name, size, root):
+        self.digest = digest
+        self.name = name
+        self.size = size
+        self.root = root
+
+    @property
+    def path(self):
+        return os.path.join(self.root, self.digest[:2], self.digest)
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def read(self):
+        with self.open() as fh:
+            return fh.read()
+
+    def to_dict(self):
+        return {"digest": self.digest, "name": self.name, "size": self.size}
+
+    def __repr__(self):
+        return f"PhotoHandle({self.name!r}, {self.digest[:12]})"
+
+
+class PhotoStore:
+    def __init__(self, root=DEFAULT_PHOTO_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        # file_id d'upload Streamlit -> handle : évite de re-hacher à chaque rerun
+        self._by_upload = OrderedDict()
+        self._lock = threading.Lock()
+
+    def handle(self, digest, name, size=None):
+        if size is None:
+            path = os.path.join(self.root, digest[:2], digest)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+        return PhotoHandle(digest, name, size, self.root)
+
+    def put(self, f):
+        """Copie le fichier dans le store (une seule fois par contenu) et retourne son handle."""
+        upload_id = getattr(f, 'file_id', None)
+        if upload_id:
+            with self._lock:
+                handle = self._by_upload.get(upload_id)
+                if handle is not None:
+                    self._by_upload.move_to_end(upload_id)
+                    return handle
+
+        sha = hashlib.sha256()
+        size = 0
+        f.seek(0)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = f.read(_CHUNK_SIZE)
+                    if not chunk: break
+                    sha.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            digest = sha.hexdigest()
+            target_dir = os.path.join(self.root, digest[:2])
+            os.makedirs(target_dir, exist_ok=True)
+            target = os.path.join(target_dir, digest)
+            if os.path.exists(target):
+                os.utime(target)
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path): os.unlink(tmp_path)
+            raise
+        finally:
+            f.seek(0)
+
+        handle = PhotoHandle(digest, getattr(f, 'name', digest), size, self.root)
+        if upload_id:
+            with self._lock:
+                self._by_upload[upload_id] = handle
+                while len(self._by_upload) > 10000: self._by_upload.popitem(last=False)
+        return handle
+
+    def put_many(self, files):
+        if not files: return []
+        return [f if isinstance(f, PhotoHandle) else self.put(f) for f in files]
+
+    def touch(self, handles):
+        """Marque les photos comme utilisées (date de modification), ex. à chaque écriture du journal."""
+        now = time.time()
+        for handle in handles:
+            try: os.utime(handle.path, (now, now))
+            except OSError: pass
+
+    def prune(self, max_age_days=PHOTO_RETENTION_DAYS, keep=()):
+        """
+        Supprime les photos non utilisées depuis max_age_days (audits abandonnés),
+        sauf celles dont l'empreinte est dans keep (photos encore référencées par le journal).
+        """
+        limit = time.time() - max_age_days * 86400
+        keep = set(keep)
+        removed = 0
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                if name in keep: continue
+                path = os.path.join(folder, name)
+                try:
+                    if os.path.getmtime(path) < limit:
+                        os.unlink(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+@contextmanager
+def open_answer_file(f):
+    """Ouvre en lecture un fichier de réponse, qu'il s'agisse d'un PhotoHandle ou d'un UploadedFile."""
+    if isinstance(f, PhotoHandle):
+        with f.open() as fh:
+            yield fh
+    else:
+        f.seek(0)
+        try:
+            yield f
+        finally:
+            f.seek(0)
+
+
+def read_answer_file(f):
+    with open_answer_file(f) as fh:
+        return fh.read()
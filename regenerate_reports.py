@@ -0,0 +1,133 @@
+# regenerate_reports.py
+# Régénération en lot des rapports (Word / CSV) à partir des soumissions stockées (Donnees_JSON).
+# Exemples :
+#   python regenerate_reports.py --since 2026-09-01 --until 2026-09-30
+#   python regenerate_reports.py --project Orléans --format word --workers 4 --output rapports/
+#   python regenerate_reports.py --id 3f2a... --id 9c1b...
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import core
+from snapshot import DEFAULT_SNAPSHOT_DIR, read_snapshot
+from submission_store import build_submission_store
+
+FORMATS = ('word', 'csv')
+_worker = {}
+
+
+def _safe_name(value):
+    return re.sub(r'[^\w\-]+', '_', str(value)).strip('_') or "projet"
+
+
+def _read_table(path):
+    import pandas as pd
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+
+def load_tables(questions_path=None, sites_path=None, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Onglets 'Questions' et 'Sites' : fichiers fournis, sinon copies locales (aucun accès réseau)."""
+    questions = _read_table(questions_path) if questions_path else read_snapshot('questions', snapshot_dir)[0]
+    sites = _read_table(sites_path) if sites_path else read_snapshot('sites', snapshot_dir)[0]
+    return questions, sites
+
+
+def project_rows(sites, projects):
+    """Lignes 'Sites' (dict) des projets concernés, pour ne transmettre aux workers que le nécessaire."""
+    if sites is None or 'Intitulé' not in sites.columns: return {}
+    sites = sites.rename(columns=lambda c: str(c).strip())
+    subset = sites[sites['Intitulé'].isin(projects)].drop_duplicates('Intitulé')
+    return {row['Intitulé']: row for row in subset.to_dict('records')}
+
+
+def _init_worker(questions, rows, formats, output_dir):
+    _worker.update(structure=core.build_form_structure(questions), rows=rows, formats=formats, output_dir=output_dir)
+
+
+def _write(spool, path):
+    with spool, open(path, 'wb') as fh:
+        shutil.copyfileobj(spool, fh, length=1024 * 1024)
+
+
+def regenerate(record):
+    """Reconstruit les rapports d'une soumission. Retourne (ID, fichiers écrits, erreur ou None)."""
+    submission_id, project = str(record['ID']), record.get('Projet') or 'N/A'
+    try:
+        collected_data = json.loads(record['Donnees_JSON'])
+        saved_at = datetime.strptime(str(record['Date']), '%Y-%m-%d %H:%M:%S') if record.get('Date') else None
+        project_data = _worker['rows'].get(project) or {'Intitulé': project}
+        base = f"{_safe_name(project)}_{saved_at.strftime('%Y%m%d_%H%M') if saved_at else 'sans_date'}_{submission_id[:8]}"
+        written = []
+        if 'word' in _worker['formats']:
+            # L'heure de début n'est pas stockée : seule la date d'enregistrement est connue
+            path = os.path.join(_worker['output_dir'], f"Rapport_{base}.docx")
+            _write(core.create_word_report(collected_data, _worker['structure'], project_data, None, form_end_time=saved_at), path)
+            written.append(path)
+        if 'csv' in _worker['formats']:
+            path = os.path.join(_worker['output_dir'], f"Export_{base}.csv")
+            _write(core.create_csv_export(collected_data, _worker['structure'], project, submission_id, saved_at), path)
+            written.append(path)
+        return submission_id, written, None
+    except Exception as e:
+        return submission_id, [], f"{type(e).__name__}: {e}"
+
+
+def run(records, questions, sites, formats=FORMATS, output_dir="rapports", workers=None):
+    """Répartit les soumissions sur un pool de processus ; retourne la liste des résultats."""
+    os.makedirs(output_dir, exist_ok=True)
+    rows = project_rows(sites, {r.get('Projet') for r in records})
+    initargs = (questions, rows, tuple(formats), output_dir)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(records)))
+    if workers <= 1:
+        _init_worker(*initargs)
+        return [regenerate(r) for r in records]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        return list(pool.map(regenerate, records, chunksize=max(1, len(records) // (workers * 8))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Régénère les rapports des soumissions stockées.")
+    parser.add_argument("--id", dest="ids", action="append", help="ID de soumission (répétable)")
+    parser.add_argument("--project", help="Projet (contient, sans casse)")
+    parser.add_argument("--since", help="Date minimale AAAA-MM-JJ (incluse)")
+    parser.add_argument("--until", help="Date maximale AAAA-MM-JJ (incluse)")
+    parser.add_argument("--format", dest="formats", action="append", choices=FORMATS, help="word et/ou csv (défaut : les deux)")
+    parser.add_argument("--output", default="rapports", help="Dossier de sortie")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--backend", help="Stockage des soumissions : sqlite (défaut) ou sheets")
+    parser.add_argument("--db", help="Base SQLite des soumissions (défaut : VISITE_SUBMISSION_DB ou data/submissions.db)")
+    parser.add_argument("--questions", help="Fichier .parquet/.csv de l'onglet 'Questions' (défaut : copie locale)")
+    parser.add_argument("--sites", help="Fichier .parquet/.csv de l'onglet 'Sites' (défaut : copie locale)")
+    parser.add_argument("--snapshots", default=os.environ.get('VISITE_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR))
+    args = parser.parse_args(argv)
+
+    for value in (args.since, args.until):
+        if value and not re.fullmatch(r"\d{4}-\d{2}-\d{2}", value): parser.error(f"Date invalide : {value} (attendu AAAA-MM-JJ)")
+
+    store = build_submission_store(args.backend, db_path=args.db)
+    questions, sites = load_tables(args.questions, args.sites, args.snapshots)
+    if questions is None:
+        print("Onglet 'Questions' introuvable : lancez l'application une fois ou utilisez --questions.", file=sys.stderr)
+        return 2
+
+    records = list(store.iter_records(args.ids, args.project, args.since, args.until))
+    print(f"{len(records)} soumission(s) à régénérer depuis {store.describe()}.")
+    if not records: return 0
+
+    start = datetime.now()
+    results = run(records, questions, sites, args.formats or FORMATS, args.output, args.workers)
+    failures = [(sid, err) for sid, _, err in results if err]
+    for sid, err in failures:
+        print(f"  ✖ {sid} : {err}", file=sys.stderr)
+    elapsed = (datetime.now() - start).total_seconds()
+    print(f"{len(results) - len(failures)} rapport(s) régénéré(s) dans '{args.output}' en {elapsed:.1f} s, {len(failures)} échec(s).")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# registry.py
+# Registre partagé (tout le processus) des versions de la structure du formulaire et du catalogue des sites.
+# Chaque version est construite une seule fois et partagée en lecture seule ; les sessions n'en gardent que l'identifiant.
+import os
+import threading
+import time
+
+STRUCTURE_RETENTION = int(os.environ.get('VISITE_STRUCTURE_RETENTION', 12 * 3600))
+REFRESH_MIN_INTERVAL = int(os.environ.get('VISITE_REFRESH_MIN_INTERVAL', 60))
+
+
+class _Entry:
+    __slots__ = ('value', 'created', 'last_used')
+
+    def __init__(self, value):
+        self.value = value
+        self.created = self.last_used = time.time()
+
+
+class StructureRegistry:
+    """
+    sources : {nom: (SheetSnapshot, builder)}. builder(df) construit l'objet partagé.
+    pin(nom) retourne l'identifiant de la version courante ; get(nom, version) l'objet.
+    Une version qui n'est plus la courante est libérée après retention secondes sans accès ;
+    chaque get() (appelé à chaque exécution par les sessions qui l'utilisent) repousse ce délai.
+    """
+
+    def __init__(self, sources, retention=STRUCTURE_RETENTION, min_refresh_interval=REFRESH_MIN_INTERVAL):
+        self.sources = sources
+        self.retention = retention
+        self.min_refresh_interval = min_refresh_interval
+        self._entries = {name: {} for name in sources}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.last_refresh = 0.0
+
+    def _ensure(self, name, version, df):
+        with self._lock:
+            if version in self._entries[name]: return
+        # Construction hors du verrou principal : les lectures des autres sessions ne sont pas bloquées
+        with self._build_lock:
+            with self._lock:
+                if version in self._entries[name]: return
+            value = self.sources[name][1](df)
+            with self._lock:
+                self._entries[name][version] = _Entry(value)
+
+    def _evict(self, name, current):
+        limit = time.time() - self.retention
+        with self._lock:
+            entries = self._entries[name]
+            for version in [v for v, e in entries.items() if v != current and e.last_used < limit]:
+                del entries[version]
+
+    def pin(self, name):
+        """Identifiant de la version courante (copie locale), construite si besoin."""
+        df, version = self.sources[name][0].get()
+        self._ensure(name, version, df)
+        self._evict(name, version)
+        return version
+
+    def get(self, name, version):
+        with self._lock:
+            entry = self._entries[name].get(version)
+            if entry is None: return None
+            entry.last_used = time.time()
+            return entry.value
+
+    def refresh(self):
+        """
+        Relit toutes les sources maintenant, au plus une fois par min_refresh_interval
+        (quel que soit l'utilisateur qui le demande). Retourne (succès, message).
+        """
+        with self._refresh_lock:
+            elapsed = time.time() - self.last_refresh
+            if elapsed < self.min_refresh_interval:
+                return False, f"Données actualisées il y a {int(elapsed)} s. Réessayez dans {int(self.min_refresh_interval - elapsed) + 1} s."
+            self.last_refresh = time.time()
+            changed = []
+            for name, (snapshot, _) in self.sources.items():
+                if snapshot.refresh(): changed.append(name)
+        if not changed: return True, "Aucune modification dans les onglets."
+        return True, "Nouvelle version chargée : " + ", ".join(changed) + "."
+
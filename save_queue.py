@@ -0,0 +1,196 @@
+# save_queue.py
+# File d'attente durable (SQLite) des sauvegardes de soumissions, vidée par un thread en arrière-plan.
+# Une soumission n'est mise en file qu'une fois (clé : submission_id) et réessayée avec un délai exponentiel.
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+DEFAULT_QUEUE_PATH = os.path.join("data", "save_queue.db")
+RETRY_BASE_DELAY = float(os.environ.get('VISITE_SAVE_RETRY_BASE', 2))
+RETRY_MAX_DELAY = float(os.environ.get('VISITE_SAVE_RETRY_MAX', 300))
+# Durée de réservation d'une entrée pendant l'écriture : reprise automatique si le processus s'arrête
+CLAIM_LEASE = 120
+# Entrées sauvegardées conservées avant suppression. Doit dépasser la rétention du journal
+# (VISITE_JOURNAL_RETENTION_DAYS) : un audit repris depuis le journal ne doit pas être réécrit
+QUEUE_RETENTION_DAYS = int(os.environ.get('VISITE_SAVE_QUEUE_RETENTION_DAYS', 45))
+
+PENDING, DONE = "pending", "done"
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts, base=RETRY_BASE_DELAY, maximum=RETRY_MAX_DELAY):
+    """Délai avant la tentative suivante : base x 2^(n-1), plafonné, avec +/-20 % d'aléa."""
+    delay = min(maximum, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class SaveQueue:
+    def __init__(self, store, path=DEFAULT_QUEUE_PATH, poll_interval=5, mirrors=()):
+        self.store = store
+        # Stockages secondaires (ex. réponses détaillées) écrits après le store principal, même idempotence
+        self.mirrors = tuple(mirrors)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder: os.makedirs(folder, exist_ok=True)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS file_sauvegarde ("
+                    " submission_id TEXT PRIMARY KEY, record TEXT NOT NULL, status TEXT NOT NULL,"
+                    " attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL,"
+                    " last_error TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_file_due ON file_sauvegarde (status, next_attempt)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # --- Côté interface ---
+    def enqueue(self, record):
+        """Met la soumission en file (écriture locale, immédiate). Retourne False si elle y était déjà."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO file_sauvegarde (submission_id, record, status, next_attempt, created, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (str(record["ID"]), json.dumps(record, ensure_ascii=False), PENDING, now, now, now),
+                )
+        finally:
+            conn.close()
+        self._wake.set()
+        return cur.rowcount == 1
+
+    def status(self, submission_id):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT status, attempts, next_attempt, last_error FROM file_sauvegarde WHERE submission_id = ?",
+                (str(submission_id),),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None: return None
+        return {"status": row[0], "attempts": row[1], "next_attempt": row[2], "last_error": row[3]}
+
+    def retry_now(self, submission_id):
+        """Avance la prochaine tentative (sans doublon : l'entrée reste unique)."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE file_sauvegarde SET next_attempt = ? WHERE submission_id = ? AND status = ?",
+                    (time.time(), str(submission_id), PENDING),
+                )
+        finally:
+            conn.close()
+        self._wake.set()
+
+    def prune(self, max_age_days=QUEUE_RETENTION_DAYS):
+        """Supprime les entrées sauvegardées depuis plus de max_age_days (les entrées en attente sont gardées)."""
+        limit = time.time() - max_age_days * 86400
+        conn = self._connect()
+        try:
+            with conn:
+                cur = conn.execute("DELETE FROM file_sauvegarde WHERE status = ? AND updated < ?", (DONE, limit))
+        finally:
+            conn.close()
+        return cur.rowcount
+
+    # --- Worker ---
+    def _claim_due(self, now):
+        # Réservation atomique : une entrée n'est traitée que par un seul worker à la fois
+        conn = self._connect()
+        try:
+            due = conn.execute(
+                "SELECT submission_id, record, attempts FROM file_sauvegarde"
+                " WHERE status = ? AND next_attempt <= ? ORDER BY next_attempt LIMIT 20",
+                (PENDING, now),
+            ).fetchall()
+            claimed = []
+            for submission_id, record, attempts in due:
+                with conn:
+                    cur = conn.execute(
+                        "UPDATE file_sauvegarde SET next_attempt = ? WHERE submission_id = ? AND status = ? AND next_attempt <= ?",
+                        (now + CLAIM_LEASE, submission_id, PENDING, now),
+                    )
+                if cur.rowcount == 1: claimed.append((submission_id, json.loads(record), attempts))
+            return claimed
+        finally:
+            conn.close()
+
+    def _finish(self, submission_id, attempts, error=None):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                if error is None:
+                    conn.execute(
+                        "UPDATE file_sauvegarde SET status = ?, attempts = ?, last_error = NULL, updated = ? WHERE submission_id = ?",
+                        (DONE, attempts, now, submission_id),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE file_sauvegarde SET attempts = ?, next_attempt = ?, last_error = ?, updated = ? WHERE submission_id = ?",
+                        (attempts, now + retry_delay(attempts), error, now, submission_id),
+                    )
+        finally:
+            conn.close()
+
+    def drain_once(self):
+        """Traite les entrées échues ; retourne le nombre de sauvegardes réussies."""
+        saved = 0
+        for submission_id, record, attempts in self._claim_due(time.time()):
+            try:
+                # Après un échec (ex. délai dépassé), l'écriture a pu aboutir : le store vérifie l'existence
+                self.store.append(record, check_existing=attempts > 0)
+                for mirror in self.mirrors: mirror.append(record, check_existing=attempts > 0)
+                self._finish(submission_id, attempts + 1)
+                saved += 1
+            except Exception as e:
+                logger.warning("Sauvegarde %s en échec (tentative %d) : %s", submission_id, attempts + 1, e)
+                self._finish(submission_id, attempts + 1, f"{type(e).__name__}: {e}")
+        return saved
+
+    def _next_wait(self):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT MIN(next_attempt) FROM file_sauvegarde WHERE status = ?", (PENDING,)).fetchone()
+        finally:
+            conn.close()
+        if row[0] is None: return self.poll_interval * 12
+        return min(max(0.0, row[0] - time.time()), self.poll_interval * 12)
+
+    def _run(self):
+        while True:
+            try:
+                self.drain_once()
+                wait = self._next_wait()
+            except Exception as e:
+                logger.warning("File de sauvegarde indisponible : %s", e)
+                wait = self.poll_interval
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def start(self):
+        """Démarre le worker (une fois) ; les entrées laissées par un arrêt précédent sont reprises."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="save-queue", daemon=True)
+                self._thread.start()
+        return self
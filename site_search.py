@@ -0,0 +1,190 @@
+# site_search.py
+# Index trigrammes (normalisé, sans accents) pour la recherche de chantiers.
+import bisect
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+_SPACES = re.compile(r"\s+")
+RESULT_CACHE_SIZE = 256
+_SEPARATOR_CHARS = r"\s\-'’()/,."
+# Début de mot : début du texte ou caractère suivant un séparateur
+_WORD_STARTS = re.compile(rf"(?:^|(?<=[{_SEPARATOR_CHARS}]))[^{_SEPARATOR_CHARS}]")
+
+
+def fold_text(text):
+    """Minuscules, sans accents ni espaces multiples : 'Orléans  Centre' -> 'orleans centre'."""
+    text = str(text).casefold()
+    if not text.isascii():
+        decomposed = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _SPACES.sub(' ', text).strip()
+
+
+def trigrams(folded):
+    return {folded[i:i + 3] for i in range(len(folded) - 2)}
+
+
+class SiteSearchIndex:
+    """
+    Index inversé trigramme -> positions de lignes (tableaux numpy triés).
+    Une recherche intersecte les listes des trigrammes de la requête puis
+    vérifie la sous-chaîne sur les seuls candidats. Les débuts de mot de la
+    première colonne sont aussi triés par suffixe : les requêtes qui y trouvent
+    assez de résultats sont servies par dichotomie, sans parcourir les candidats.
+    """
+
+    def __init__(self, df, columns=('Intitulé',)):
+        self.columns = [col for col in columns if col in df.columns]
+        self.size = len(df)
+        # documents[c][i] : texte normalisé de la colonne c pour la ligne i
+        self.documents, self.lengths = [], []
+        postings = {}
+        for col in self.columns:
+            docs = [fold_text(v) if not pd.isna(v) else '' for v in df[col].tolist()]
+            self.documents.append(docs)
+            self.lengths.append(np.fromiter(map(len, docs), dtype=np.int64, count=len(docs)))
+            for row_pos, doc in enumerate(docs):
+                for gram in trigrams(doc):
+                    postings.setdefault(gram, []).append(row_pos)
+        # Une ligne peut apparaître plusieurs fois (plusieurs colonnes) : dédoublonnage
+        self.postings = {gram: np.unique(np.asarray(rows, dtype=np.int32)) for gram, rows in postings.items()}
+        self._build_word_index()
+        # Chaque rerun Streamlit relance la même recherche : on garde les derniers résultats
+        self._results = OrderedDict()
+        self._results_lock = threading.Lock()
+
+    def _build_word_index(self):
+        # Débuts de mot de la première colonne triés par suffixe (ligne, position), avec leur clé de tri.
+        # Un seul parcours sur le texte concaténé (le saut de ligne sert de séparateur entre lignes)
+        docs = self.documents[0] if self.documents else []
+        starts = np.fromiter((m.start() for m in _WORD_STARTS.finditer('\n'.join(docs))), dtype=np.int64)
+        doc_starts = np.cumsum([0] + [len(doc) + 1 for doc in docs[:-1]], dtype=np.int64)
+        rows = np.searchsorted(doc_starts, starts, side='right') - 1 if len(starts) else starts
+        offsets = starts - doc_starts[rows] if len(starts) else starts
+        suffixes = [docs[row][offset:] for row, offset in zip(rows.tolist(), offsets.tolist())]
+        order = np.asarray(sorted(range(len(suffixes)), key=suffixes.__getitem__), dtype=np.int64)
+        self.word_rows = rows[order].astype(np.int32)
+        self.word_offsets = offsets[order]
+        lengths = self.lengths[0][self.word_rows] if docs else np.empty(0, dtype=np.int64)
+        self.word_keys = _rank_key(0, np.where(self.word_offsets == 0, 0, 1), self.word_offsets, lengths)
+
+    def _candidates(self, grams):
+        lists = []
+        for gram in grams:
+            rows = self.postings.get(gram)
+            if rows is None: return np.empty(0, dtype=np.int32)
+            lists.append(rows)
+        lists.sort(key=len)
+        result = lists[0]
+        for rows in lists[1:]:
+            if not len(result): break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def _rank(self, query, candidates):
+        # Clé de tri par ligne : (colonne, début de texte / de mot / ailleurs, position, longueur)
+        rows = candidates.tolist()
+        best = np.full(len(rows), np.iinfo(np.int64).max, dtype=np.int64)
+        at_word_start = re.compile(rf"(?<=[{_SEPARATOR_CHARS}]){re.escape(query)}")
+        for col_rank, docs in enumerate(self.documents):
+            pos = np.array([docs[i].find(query) for i in rows], dtype=np.int64)
+            found = pos >= 0
+            if not found.any(): continue
+            # Occurrence en début de mot, même si une occurrence en milieu de mot la précède
+            word_pos = np.array([
+                -1 if p <= 0 else (m.start() if (m := at_word_start.search(docs[i], p)) else -1)
+                for i, p in zip(rows, pos.tolist())
+            ], dtype=np.int64)
+            boundary = np.where(pos == 0, 0, np.where(word_pos > 0, 1, 2))
+            pos = np.where(word_pos > 0, word_pos, pos)
+            key = _rank_key(col_rank, boundary, pos, self.lengths[col_rank][candidates])
+            best = np.where(found, np.minimum(best, key), best)
+        matched = best < np.iinfo(np.int64).max
+        return candidates[matched], best[matched]
+
+    def _word_hits(self, query, limit):
+        """
+        Les limit meilleures lignes dont un mot de la première colonne commence par la requête,
+        ou None s'il y en a moins (le classement complet est alors nécessaire).
+        """
+        docs, rows, offsets = self.documents[0], self.word_rows, self.word_offsets
+        prefix = lambda k: docs[rows[k]][offsets[k]:offsets[k] + len(query)]
+        lo = bisect.bisect_left(range(len(rows)), query, key=prefix)
+        hi = bisect.bisect_right(range(len(rows)), query, key=prefix, lo=lo)
+        if hi - lo < limit: return None
+        hit_rows, hit_keys = rows[lo:hi], self.word_keys[lo:hi]
+        # Une ligne peut avoir plusieurs mots correspondants : on élargit la sélection jusqu'à limit lignes distinctes
+        size = limit
+        while True:
+            top_rows = _top(hit_rows, hit_keys, size)
+            _, first = np.unique(top_rows, return_index=True)
+            if len(first) >= limit: return top_rows[np.sort(first)[:limit]].tolist()
+            if size >= len(hit_keys): return None
+            size *= 2
+
+    def search(self, query, limit=None, min_similarity=0.6):
+        """
+        Positions des lignes correspondant à la requête, les plus pertinentes d'abord
+        (colonne, début de mot, position, longueur). Sans correspondance exacte, retourne
+        les lignes partageant au moins min_similarity des trigrammes (fautes de frappe).
+        """
+        folded = fold_text(query)
+        if not folded: return []
+        cache_key = (folded, limit, min_similarity)
+        with self._results_lock:
+            if cache_key in self._results:
+                self._results.move_to_end(cache_key)
+                return list(self._results[cache_key])
+        rows = self._search(folded, limit, min_similarity)
+        with self._results_lock:
+            self._results[cache_key] = tuple(rows)
+            if len(self._results) > RESULT_CACHE_SIZE: self._results.popitem(last=False)
+        return rows
+
+    def _search(self, folded, limit, min_similarity):
+        # Assez de débuts de mot dans la première colonne : ils précèdent tout autre résultat
+        if limit and self.documents:
+            rows = self._word_hits(folded, limit)
+            if rows is not None: return rows
+        grams = trigrams(folded)
+        if grams:
+            candidates = self._candidates(grams)
+        else:
+            candidates = np.arange(self.size, dtype=np.int32)
+        rows, keys = self._rank(folded, candidates)
+        if not len(rows):
+            if grams and min_similarity: return self._similar(grams, limit, min_similarity)
+            return []
+        return _top(rows, keys, limit).tolist()
+
+    def _similar(self, grams, limit, min_similarity):
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists: return []
+        counts = np.bincount(np.concatenate(lists), minlength=self.size)
+        threshold = max(1, int(np.ceil(len(grams) * min_similarity)))
+        rows = np.flatnonzero(counts >= threshold)
+        order = np.argsort(-counts[rows], kind='stable')
+        rows = rows[order].tolist()
+        return rows[:limit] if limit else rows
+
+
+def _rank_key(col_rank, boundary, pos, lengths):
+    return ((col_rank * 4 + boundary) << 40) | (np.minimum(pos, 0xFFFFF) << 20) | np.minimum(lengths, 0xFFFFF)
+
+
+def _top(rows, keys, limit=None):
+    """Les limit premières lignes selon (clé, position), triées ; égalités départagées par la position."""
+    if limit and len(keys) > limit:
+        kth = np.partition(keys, limit - 1)[limit - 1]
+        better = keys < kth
+        ties = rows[keys == kth]
+        missing = limit - int(better.sum())
+        if len(ties) > missing: ties = np.partition(ties, missing - 1)[:missing]
+        rows = np.concatenate([rows[better], ties])
+        keys = np.concatenate([keys[better], np.full(len(ties), kth, dtype=keys.dtype)])
+    return rows[np.lexsort((rows, keys))]
@@ -0,0 +1,80 @@
+# sites.py
+# Onglet 'Sites' chargé une fois et partagé entre sessions (lecture seule).
+from site_search import SiteSearchIndex
+
+TITLE_COLUMN = 'Intitulé'
+
+
+def parse_counts(values):
+    """
+    Colonne de comptage (texte de la feuille) -> entiers, comme int(float(val.replace(',', '.'))) ;
+    0 si vide ou illisible. Vectorisé (pandas).
+    """
+    import numpy as np
+    import pandas as pd
+    numbers = pd.to_numeric(pd.Series(values).astype(str).str.replace(',', '.', regex=False).str.strip(), errors='coerce')
+    return np.trunc(numbers.replace([np.inf, -np.inf], np.nan).fillna(0)).astype('int64')
+
+
+class SiteRecord(dict):
+    """Ligne 'Sites' (valeurs brutes, comme row.to_dict()) + photos attendues par section (total, détail)."""
+    __slots__ = ('expected_photos',)
+
+    def __init__(self, values, expected_photos=None):
+        super().__init__(values)
+        self.expected_photos = expected_photos or {}
+
+
+class SiteCatalog:
+    def __init__(self, df, search_columns=(TITLE_COLUMN,), photo_rules=None, rename_map=None):
+        import numpy as np
+        import pandas as pd
+        self.df = df
+        self.search_index = SiteSearchIndex(df, columns=search_columns)
+        self._titles = df[TITLE_COLUMN].tolist() if TITLE_COLUMN in df.columns else []
+        # Intitulé -> première ligne portant cet intitulé (comme df[df['Intitulé'] == x].iloc[0])
+        self._positions = {}
+        for position, title in enumerate(self._titles): self._positions.setdefault(title, position)
+        # Comptages typés et photos attendues par section, calculés une fois pour toutes les lignes
+        photo_rules = photo_rules or {}
+        rename_map = rename_map or {}
+        columns = list(dict.fromkeys(col for cols in photo_rules.values() for col in cols))
+        counts = {col: parse_counts(df[col]).to_numpy() if col in df.columns else np.zeros(len(df), dtype='int64') for col in columns}
+        self.counts = pd.DataFrame(counts, index=range(len(df)))
+        self.expected = {}
+        for section, cols in photo_rules.items():
+            # Détail au format de get_expected_photo_count : "2 PDC Rapide + 1 PDC Ultra-rapide"
+            template = " + ".join("{} " + rename_map.get(col, col).replace('{', '{{').replace('}', '}}') for col in cols)
+            totals = sum((counts[col] for col in cols), np.zeros(len(df), dtype='int64'))
+            details = [template.format(*values) for values in zip(*(counts[col].tolist() for col in cols))] if cols else [""] * len(df)
+            self.expected[section] = (totals, details)
+
+    @property
+    def has_titles(self):
+        return TITLE_COLUMN in self.df.columns
+
+    def record(self, title):
+        """Ligne du projet (SiteRecord) ou None si l'intitulé est inconnu."""
+        position = self._positions.get(title)
+        if position is None: return None
+        expected = {
+            section: (int(totals[position]), details[position])
+            for section, (totals, details) in self.expected.items()
+        }
+        return SiteRecord(self.df.iloc[position].to_dict(), expected)
+
+    def search(self, term, limit=None):
+        """Intitulés (uniques, non vides) correspondant à la recherche, classés par pertinence."""
+        # La limite est passée à l'index ; élargie seulement si des doublons d'intitulé la consomment
+        row_limit = limit
+        while True:
+            row_positions = self.search_index.search(term, limit=row_limit)
+            results, seen = [], set()
+            for row_pos in row_positions:
+                title = self._titles[row_pos]
+                if not isinstance(title, str) or not title or title in seen: continue
+                seen.add(title)
+                results.append(title)
+                if limit and len(results) >= limit: return results
+            if not limit or len(row_positions) < row_limit: return results
+            row_limit *= 2
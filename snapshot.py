@@ -0,0 +1,154 @@
+# snapshot.py
+# Copie locale versionnée (Parquet) d'un onglet Google Sheets, servie immédiatement
+# et revalidée en arrière-plan (stale-while-revalidate).
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+DEFAULT_SNAPSHOT_DIR = os.path.join("data", "snapshots")
+_METADATA_KEY = b'visite_snapshot'
+
+logger = logging.getLogger(__name__)
+
+
+def content_version(df):
+    """Empreinte du contenu (colonnes + valeurs) : identique si la feuille n'a pas changé."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([str(c) for c in df.columns], ensure_ascii=False).encode())
+    h.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def read_snapshot(name, directory=DEFAULT_SNAPSHOT_DIR):
+    """Lit une copie locale sans Google Sheets (scripts batch) : (DataFrame, version), ou (None, None) si absente."""
+    path = os.path.join(directory, f"{name}.parquet")
+    if not os.path.exists(path): return None, None
+    import pyarrow.parquet as pq
+    table = pq.read_table(path)
+    meta = json.loads((table.schema.metadata or {}).get(_METADATA_KEY, b'{}'))
+    df = table.to_pandas()
+    return df, meta.get('version') or content_version(df)
+
+
+def _to_arrow_safe(df):
+    # Les colonnes objet aux types mélangés (nombres et textes d'une feuille) sont passées en texte
+    import pyarrow as pa
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object: continue
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _to_arrow_table(df):
+    import pyarrow as pa
+    return pa.Table.from_pandas(_to_arrow_safe(df), preserve_index=False)
+
+
+class SheetSnapshot:
+    def __init__(self, name, fetch, directory=DEFAULT_SNAPSHOT_DIR, max_age=600):
+        self.name = name
+        self.fetch = fetch
+        self.path = os.path.join(directory, f"{name}.parquet")
+        self.max_age = max_age
+        self.df = None
+        self.version = None
+        self.checked_at = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+        # Première lecture (disque ou feuille) faite par une seule session, les autres l'attendent
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+
+    # --- Lecture / écriture disque ---
+    def _load_from_disk(self):
+        self.df, self.version = read_snapshot(self.name, os.path.dirname(self.path))
+        self.checked_at = os.path.getmtime(self.path)
+
+    def _write_to_disk(self, table, version):
+        import pyarrow.parquet as pq
+        meta = dict(table.schema.metadata or {})
+        meta[_METADATA_KEY] = json.dumps({'version': version, 'name': self.name, 'fetched_at': time.time()}).encode()
+        table = table.replace_schema_metadata(meta)
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{self.name}-", suffix='.parquet')
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.unlink(tmp_path)
+            raise
+
+    # --- Rafraîchissement ---
+    def refresh(self):
+        """Relit la feuille ; remplace la copie (disque puis mémoire) seulement si le contenu a changé."""
+        df = self.fetch()
+        version = content_version(df)
+        with self._lock:
+            changed = version != self.version
+        if changed:
+            # Le DataFrame servi est celui de la table écrite : mêmes types qu'après relecture du disque
+            table = _to_arrow_table(df)
+            self._write_to_disk(table, version)
+            df = table.to_pandas()
+        elif os.path.exists(self.path):
+            os.utime(self.path)
+        with self._lock:
+            if changed:
+                self.df, self.version = df, version
+            self.checked_at = time.time()
+            self.last_error = None
+        return changed
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning("Rafraîchissement de la copie '%s' impossible : %s", self.name, e)
+            with self._lock:
+                self.last_error = str(e)
+                self.checked_at = time.time()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def revalidate(self):
+        """Lance un rafraîchissement en arrière-plan (un seul à la fois)."""
+        with self._lock:
+            if self._refreshing: return False
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name=f"snapshot-{self.name}", daemon=True).start()
+        return True
+
+    def get(self, revalidate=False):
+        """
+        Retourne (DataFrame, version) immédiatement depuis la mémoire ou le disque.
+        Sans copie locale, la première lecture est synchrone. Si la copie est plus
+        vieille que max_age (ou si revalidate=True), une relecture part en arrière-plan.
+        """
+        with self._lock:
+            loaded = self.df is not None
+        if not loaded:
+            with self._load_lock:
+                try:
+                    with self._lock:
+                        if self.df is None and os.path.exists(self.path): self._load_from_disk()
+                except Exception as e:
+                    logger.warning("Copie locale '%s' illisible : %s", self.path, e)
+                if self.df is None: self.refresh()
+        if revalidate or time.time() - self.checked_at > self.max_age:
+            self.revalidate()
+        # Lecture conjointe : un refresh concurrent ne peut pas apparier un DataFrame et une autre version
+        with self._lock:
+            return self.df, self.version
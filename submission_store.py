@@ -0,0 +1,220 @@
+# submission_store.py
+import json
+import os
+import sqlite3
+import threading
+
+SUBMISSION_COLUMNS = ["ID", "Date", "Projet", "Donnees_JSON"]
+RESPONSES_WORKSHEET = "Reponses"
+
+DEFAULT_DB_PATH = os.path.join("data", "submissions.db")
+# Secrets Streamlit relus par les scripts en ligne de commande (mêmes emplacements que Streamlit)
+SECRETS_PATHS = (os.path.join(".streamlit", "secrets.toml"), os.path.join("~", ".streamlit", "secrets.toml"))
+
+
+def record_matches(record, ids=None, project=None, date_from=None, date_to=None):
+    if ids and str(record.get("ID")) not in ids: return False
+    if project and project.casefold() not in str(record.get("Projet") or "").casefold(): return False
+    day = str(record.get("Date") or "")[:10]
+    if date_from and day < date_from: return False
+    if date_to and day > date_to: return False
+    return True
+
+
+class SubmissionStore:
+    """
+    Interface commune des backends de stockage des soumissions.
+    Un enregistrement est un dict dont les clés sont SUBMISSION_COLUMNS.
+    append() ne doit jamais relire les soumissions existantes : son coût est
+    indépendant du nombre de lignes déjà stockées. Avec check_existing=True
+    (nouvelle tentative après un échec), une soumission déjà présente (même ID)
+    n'est pas réécrite.
+    """
+    name = "abstract"
+
+    def append(self, record, check_existing=False):
+        raise NotImplementedError
+
+    def iter_records(self, ids=None, project=None, date_from=None, date_to=None):
+        """
+        Parcourt les soumissions stockées (dans l'ordre d'ajout), filtrées par ID,
+        projet (contient, sans casse) et/ou date 'AAAA-MM-JJ' (bornes incluses).
+        """
+        raise NotImplementedError
+
+    def describe(self):
+        return self.name
+
+
+# --- BACKEND LOCAL (SQLite) ---
+class SQLiteSubmissionStore(SubmissionStore):
+    name = "sqlite"
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        # WAL : les écritures concurrentes de plusieurs auditeurs ne bloquent pas les lectures
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _ensure_schema(self):
+        if self._initialized: return
+        with self._init_lock:
+            if self._initialized: return
+            folder = os.path.dirname(self.path)
+            if folder: os.makedirs(folder, exist_ok=True)
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS reponses ("
+                        " rowid INTEGER PRIMARY KEY AUTOINCREMENT,"
+                        " id TEXT NOT NULL, date TEXT, projet TEXT, donnees_json TEXT)"
+                    )
+                try:
+                    with conn:
+                        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_reponses_id ON reponses (id)")
+                except sqlite3.IntegrityError:
+                    # Base antérieure contenant déjà des doublons : index simple, l'insertion reste dédupliquée
+                    with conn:
+                        conn.execute("CREATE INDEX IF NOT EXISTS idx_reponses_id_dup ON reponses (id)")
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def append(self, record, check_existing=False):
+        # Insertion atomique et idempotente sur l'ID (recherche indexée), que ce soit une première tentative ou non
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO reponses (id, date, projet, donnees_json) SELECT ?, ?, ?, ?"
+                    " WHERE NOT EXISTS (SELECT 1 FROM reponses WHERE id = ?)",
+                    tuple(record.get(col) for col in SUBMISSION_COLUMNS) + (record.get("ID"),),
+                )
+        finally:
+            conn.close()
+
+    def iter_records(self, ids=None, project=None, date_from=None, date_to=None):
+        if not os.path.exists(self.path): return
+        self._ensure_schema()
+        # ID et dates filtrés par SQLite ; le projet (sans casse, accents compris) en Python
+        clauses, params = [], []
+        if ids:
+            ids = [str(i) for i in ids]
+            clauses.append(f"id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        if date_from:
+            clauses.append("substr(date, 1, 10) >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("substr(date, 1, 10) <= ?")
+            params.append(date_to)
+        query = "SELECT id, date, projet, donnees_json FROM reponses"
+        if clauses: query += " WHERE " + " AND ".join(clauses)
+        conn = self._connect()
+        try:
+            for row in conn.execute(query + " ORDER BY rowid", params):
+                record = dict(zip(SUBMISSION_COLUMNS, row))
+                if record_matches(record, project=project): yield record
+        finally:
+            conn.close()
+
+    def describe(self):
+        return f"SQLite ({self.path})"
+
+
+# --- BACKEND GOOGLE SHEETS ---
+class SheetsSubmissionStore(SubmissionStore):
+    """
+    Ajoute une ligne à l'onglet 'Reponses' via l'API append de Google Sheets
+    (values.append) au lieu de relire puis réécrire toute la feuille.
+    st-gsheets-connection n'expose que read/update (réécriture complète de l'onglet) :
+    l'onglet est donc ouvert avec l'API publique de gspread, à partir des secrets de la
+    connexion 'gsheets' (compte de service obligatoire, le mode URL publique est en lecture seule).
+    """
+    name = "sheets"
+
+    def __init__(self, config_factory, worksheet=RESPONSES_WORKSHEET):
+        self._config_factory = config_factory
+        self.worksheet = worksheet
+        self._spreadsheet = None
+
+    def _worksheet(self):
+        if self._spreadsheet is None:
+            import gspread
+            config = dict(self._config_factory())
+            if config.get("type") != "service_account":
+                raise ValueError("Le backend 'sheets' nécessite une connexion 'service_account' (secrets [connections.gsheets]).")
+            spreadsheet = config.get("spreadsheet")
+            if not spreadsheet: raise ValueError("Secret 'spreadsheet' manquant dans [connections.gsheets].")
+            client = gspread.service_account_from_dict(config)
+            self._spreadsheet = client.open_by_url(spreadsheet) if spreadsheet.startswith("http") else client.open(spreadsheet)
+        return self._spreadsheet.worksheet(self.worksheet)
+
+    def append(self, record, check_existing=False):
+        ws = self._worksheet()
+        # Nouvelle tentative : seule la colonne ID est relue pour ne pas écrire la soumission deux fois
+        if check_existing and str(record.get("ID")) in ws.col_values(1): return
+        row = ["" if record.get(col) is None else record.get(col) for col in SUBMISSION_COLUMNS]
+        ws.append_row(row, value_input_option="RAW", insert_data_option="INSERT_ROWS")
+
+    def iter_records(self, ids=None, project=None, date_from=None, date_to=None):
+        ids = {str(i) for i in ids} if ids else None
+        for record in self._worksheet().get_all_records(expected_headers=SUBMISSION_COLUMNS, numericise_ignore=['all']):
+            if record_matches(record, ids, project, date_from, date_to): yield record
+
+    def describe(self):
+        return f"Google Sheets (onglet '{self.worksheet}')"
+
+
+def _read_toml(path):
+    try:
+        import tomllib
+    except ImportError:
+        # Python < 3.11 : paquet toml (installé avec Streamlit)
+        import toml
+        with open(path, encoding="utf-8") as fh: return toml.load(fh)
+    with open(path, "rb") as fh: return tomllib.load(fh)
+
+
+def load_sheets_config():
+    """
+    Secrets de la connexion Google Sheets sans Streamlit (scripts en ligne de commande).
+    Compte de service JSON désigné par VISITE_SHEETS_CREDENTIALS (classeur : VISITE_SHEETS_SPREADSHEET),
+    sinon section [connections.gsheets] du fichier VISITE_SECRETS_FILE ou de .streamlit/secrets.toml.
+    """
+    credentials = os.environ.get("VISITE_SHEETS_CREDENTIALS")
+    if credentials:
+        with open(os.path.expanduser(credentials), encoding="utf-8") as fh: config = json.load(fh)
+        if os.environ.get("VISITE_SHEETS_SPREADSHEET"): config["spreadsheet"] = os.environ["VISITE_SHEETS_SPREADSHEET"]
+        return config
+    paths = [os.environ["VISITE_SECRETS_FILE"]] if os.environ.get("VISITE_SECRETS_FILE") else SECRETS_PATHS
+    for path in map(os.path.expanduser, paths):
+        if not os.path.exists(path): continue
+        config = _read_toml(path).get("connections", {}).get("gsheets")
+        if config: return dict(config)
+    raise ValueError(
+        "Connexion Google Sheets introuvable : section [connections.gsheets] de .streamlit/secrets.toml "
+        "ou variable VISITE_SHEETS_CREDENTIALS."
+    )
+
+
+def build_submission_store(backend=None, config_factory=None, db_path=None):
+    """
+    Construit le backend demandé ('sqlite' par défaut, 'sheets' sinon).
+    Le choix peut être fait par la variable d'environnement VISITE_SUBMISSION_STORE.
+    config_factory() retourne les secrets de la connexion Google Sheets (backend 'sheets') ;
+    par défaut load_sheets_config, qui les lit sans importer Streamlit.
+    """
+    backend = (backend or os.environ.get("VISITE_SUBMISSION_STORE", "sqlite")).strip().lower()
+    if backend == "sheets":
+        return SheetsSubmissionStore(config_factory or load_sheets_config)
+    if backend == "sqlite":
+        return SQLiteSubmissionStore(db_path or os.environ.get("VISITE_SUBMISSION_DB", DEFAULT_DB_PATH))
+    raise ValueError(f"Backend de sauvegarde inconnu : {backend}")
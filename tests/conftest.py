@@ -0,0 +1,8 @@
+# tests/conftest.py
+# Modules à plat à la racine du dépôt ; générateurs synthétiques partagés avec les benchmarks.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
@@ -0,0 +1,69 @@
+# tests/test_analytics.py
+import json
+
+import pandas as pd
+import pytest
+
+import analytics
+import core
+from answer_store import AnswerStore
+
+
+@pytest.fixture
+def report(tmp_path):
+    questions = pd.DataFrame([
+        {'id': 1, 'section': 'Identification', 'question': 'Nom', 'type': 'text', 'obligatoire': 'oui'},
+        {'id': 10, 'section': 'Bornes DC', 'question': 'Photo borne', 'type': 'photo', 'obligatoire': 'oui'},
+        {'id': 11, 'section': 'Bornes DC', 'question': 'Photo plaque', 'type': 'photo', 'obligatoire': 'non'},
+        {'id': 12, 'section': 'Bornes DC', 'question': 'État', 'type': 'text', 'obligatoire': 'oui'},
+    ])
+    sites = pd.DataFrame({
+        'Intitulé': ['Site A', 'Site B'],
+        'Fournisseur Bornes DC [Bornes]': ['Alpha', None],
+        'R [Plan de Déploiement]': ['2', '1'],
+        'UR [Plan de Déploiement]': ['1,0', ''],
+    })
+    store = AnswerStore(str(tmp_path / "reponses.db"))
+
+    def record(submission_id, project, ident, dc):
+        phases = [{"phase_name": "Identification", "answers": ident}, {"phase_name": "Bornes DC", "answers": dc}]
+        return {"ID": submission_id, "Date": "2026-09-01 10:00:00", "Projet": project, "Donnees_JSON": json.dumps(phases)}
+
+    store.append_many([
+        # Site A : 3 photos attendues par question photo -> 6 attendues, 6 reçues
+        record("s1", "Site A", {"1": "Bob"}, {"10": "Fichiers: a.jpg, b.jpg, c.jpg", "11": "Fichiers: d.jpg, e.jpg, f.jpg", "12": "ok"}),
+        # Site B : 1 par question -> 2 attendues, 1 reçue, écart justifié par le commentaire
+        record("s2", "Site B", {"1": ""}, {"10": "Fichiers: a.jpg", "11": "Fichiers: ", "12": "", str(core.COMMENT_ID): "plaque illisible"}),
+    ])
+    structure = core.build_form_structure(questions)
+    return analytics.compute(analytics.load_answers(store, structure), structure, sites)
+
+
+def test_summary(report):
+    summary = report['resume'].iloc[0]
+    assert summary['soumissions'] == 2 and summary['projets'] == 2
+    assert summary['phases_controlees'] == 2
+    assert summary['taux_ecart'] == 0.5
+    assert summary['taux_completude'] == round(4 / 6, 4)
+
+
+def test_photo_gaps_by_section_and_supplier(report):
+    section = report['ecarts_section'].set_index('section').loc['Bornes DC']
+    assert (section['phases'], section['ecarts'], section['justifies']) == (2, 1, 1)
+    assert (section['photos_attendues'], section['photos_recues'], section['photos_manquantes']) == (8, 7, 1)
+    by_supplier = report['ecarts_fournisseur'].set_index('fournisseur')
+    assert by_supplier.loc['Alpha', 'ecarts'] == 0
+    assert by_supplier.loc[analytics.UNKNOWN_SUPPLIER, 'ecarts'] == 1
+    assert by_supplier.loc[analytics.UNKNOWN_SUPPLIER, 'taux_photos'] == 0.5
+
+
+def test_mandatory_completion(report):
+    by_section = report['obligatoires_section'].set_index('section')
+    assert by_section.loc['Identification', 'reponses'] == 2 and by_section.loc['Identification', 'completees'] == 1
+    assert by_section.loc['Bornes DC', 'reponses'] == 4 and by_section.loc['Bornes DC', 'completees'] == 3
+    by_question = report['obligatoires_question'].set_index('question_id')
+    assert by_question.loc[10, 'taux_completude'] == 1.0
+    assert by_question.loc[12, 'taux_completude'] == 0.5
+    assert by_question.loc[12, 'question'] == 'État'
+    # Triées de la moins complétée à la plus complétée
+    assert list(report['obligatoires_question']['taux_completude']) == sorted(report['obligatoires_question']['taux_completude'])
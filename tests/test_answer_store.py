@@ -0,0 +1,76 @@
+# tests/test_answer_store.py
+import json
+
+import pytest
+
+from answer_store import ANSWER_COLUMNS, AnswerStore, explode_record
+
+
+def _record(submission_id, phases, project="Site A", date="2026-09-01 10:00:00"):
+    return {"ID": submission_id, "Date": date, "Projet": project, "Donnees_JSON": json.dumps(phases)}
+
+
+def test_explode_record():
+    rows = explode_record(_record("s1", [
+        {"phase_name": "Identification", "answers": {"1": "Bob", "2": 3, "x": "ignorée"}},
+        {"phase_name": "Bornes DC", "answers": {"10": "Fichiers: a.jpg, b.jpg", "11": "Fichiers: ", "12": None, "13": ["Oui"]}},
+    ]))
+    by_question = {row[ANSWER_COLUMNS.index("question_id")]: dict(zip(ANSWER_COLUMNS, row)) for row in rows}
+    assert sorted(by_question) == [1, 2, 10, 11, 12, 13]
+    assert by_question[1]["value"] == "Bob" and by_question[1]["value_num"] is None
+    assert by_question[2]["value"] == "3" and by_question[2]["value_num"] == 3.0
+    assert by_question[10]["value"] is None and json.loads(by_question[10]["file_refs"]) == ["a.jpg", "b.jpg"]
+    assert json.loads(by_question[11]["file_refs"]) == []
+    assert by_question[12]["value"] is None and by_question[12]["file_refs"] is None
+    assert json.loads(by_question[13]["value"]) == ["Oui"]
+    assert by_question[10]["phase_index"] == 1 and by_question[10]["phase_name"] == "Bornes DC"
+    assert {row[0] for row in rows} == {"s1"}
+
+
+def test_explode_record_rejects_unreadable_json():
+    with pytest.raises(ValueError):
+        explode_record({"ID": "s", "Donnees_JSON": "{pas du json"})
+    assert explode_record({"ID": "s", "Donnees_JSON": None}) == []
+
+
+def test_append_many_rerun_replaces_rows(tmp_path):
+    store = AnswerStore(str(tmp_path / "reponses.db"))
+    first = _record("s1", [{"phase_name": "P", "answers": {"1": "Oui", "2": "Non"}}])
+    second = _record("s2", [{"phase_name": "P", "answers": {"1": "Non"}}], project="Site B")
+    assert store.append_many([first, second]) == 3
+    assert store.append_many([first, second]) == 3
+    assert len(store.query()) == 3
+    # Soumission corrigée : ses lignes sont remplacées, pas ajoutées
+    store.append(_record("s1", [{"phase_name": "P", "answers": {"1": "Non"}}]))
+    df = store.query()
+    assert len(df) == 2 and store.existing_ids() == {"s1", "s2"}
+    assert list(store.query(question_id=1, project="Site A")["value"]) == ["Non"]
+    assert len(store.query(question_ids=[2])) == 0
+    assert len(store.query(date_from="2026-09-02")) == 0
+
+
+def test_backfill_explodes_each_record_once(tmp_path, monkeypatch):
+    import answer_store
+    import migrate_answers
+
+    class Source:
+        def iter_records(self):
+            yield _record("s1", [{"phase_name": "P", "answers": {"1": "Oui"}}])
+            yield {"ID": "bad", "Donnees_JSON": "{"}
+            yield _record("s2", [{"phase_name": "P", "answers": {"1": "Non", "2": 4}}])
+            yield _record("s1", [{"phase_name": "P", "answers": {"1": "Oui"}}])
+
+    calls = []
+    def counting_explode(record):
+        calls.append(record["ID"])
+        return explode_record(record)
+    monkeypatch.setattr(migrate_answers, "explode_record", counting_explode)
+    monkeypatch.setattr(answer_store, "explode_record", counting_explode)
+
+    store = AnswerStore(str(tmp_path / "reponses.db"))
+    submissions, rows, skipped, errors = migrate_answers.backfill(Source(), store, batch_size=1)
+    assert (submissions, rows, skipped) == (2, 3, 1)
+    assert errors[0][0] == "bad"
+    assert calls == ["s1", "bad", "s2"]
+    # Deuxième passage : tout est déjà migré
+    assert migrate_answers.backfill(Source(), store)[:3] == (0, 0, 3)
@@ -0,0 +1,41 @@
+# tests/test_column_projection.py
+import pandas as pd
+
+import core
+import synthetic
+
+
+def test_question_columns_are_projected_and_renamed():
+    raw = synthetic.make_questions_df(questions_per_section=5, n_extra_columns=3)
+    raw = raw.rename(columns={'Condition value': 'Conditon value', 'question': ' question '})
+    projected = core.select_question_columns(raw)
+    assert list(projected.columns) == [col for col in core.QUESTION_COLUMNS if col in projected.columns]
+    assert 'Condition value' in projected.columns and 'question' in projected.columns
+    assert not any(col.startswith("Colonne libre") for col in projected.columns)
+
+
+def test_form_structure_keeps_compact_stripped_columns():
+    raw = synthetic.make_questions_df(questions_per_section=5, n_extra_columns=3)
+    raw.loc[0, 'question'] = "  Question espacée  "
+    df = core.build_form_structure(raw).df
+    assert set(core.QUESTION_COLUMNS) <= set(df.columns)
+    assert not any(col.startswith("Colonne libre") for col in df.columns)
+    assert df.loc[0, 'question'] == "Question espacée"
+    for col in core.QUESTION_CATEGORY_COLUMNS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+
+
+def test_site_catalog_counts_are_small_integers():
+    raw = synthetic.make_sites_df(50, n_extra_columns=2)
+    raw.loc[0, 'R [Plan de Déploiement]'] = '4,0'
+    raw.loc[1, 'R [Plan de Déploiement]'] = ''
+    catalog = core.build_site_catalog(raw)
+    df = catalog.df
+    assert list(df.columns) == [col for col in core.SITE_COLUMNS if col in raw.columns]
+    assert df['R [Plan de Déploiement]'].dtype.itemsize == 1
+    assert df['R [Plan de Déploiement]'].tolist()[:2] == [4, 0]
+    for col in core.SITE_CATEGORY_COLUMNS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+    record = catalog.record(raw.loc[0, 'Intitulé'])
+    assert record['R [Plan de Déploiement]'] == 4
+    assert "Colonne libre 0" not in record
@@ -0,0 +1,66 @@
+# tests/test_conditions.py
+import random
+
+import pytest
+
+import legacy_validation
+from conditions import ALWAYS, AllOf, AnyOf, Equals, compile_condition, compile_row_condition
+
+
+@pytest.mark.parametrize("condition_on", [0, "0", "", None, "abc", float("nan")])
+def test_inactive_condition_is_always(condition_on):
+    assert compile_row_condition(condition_on, "1=Oui") == (ALWAYS, ())
+
+
+def test_equals_normalises_case_spaces_and_quotes():
+    condition, errors = compile_row_condition(1, "\"2 = 'Oui' \"")
+    assert errors == ()
+    assert isinstance(condition, Equals) and condition.refs == {2}
+    assert condition.evaluate({2: "  oUI "})
+    assert not condition.evaluate({2: "Non"})
+    assert not condition.evaluate({})
+
+
+def test_et_binds_tighter_than_ou():
+    condition, _ = compile_condition("1=Oui ET 2=Non OU 3=X")
+    assert isinstance(condition, AnyOf) and isinstance(condition.parts[0], AllOf)
+    assert condition.refs == {1, 2, 3}
+    assert condition.evaluate({1: "Oui", 2: "Non"})
+    assert not condition.evaluate({1: "Oui", 2: "Oui"})
+    assert condition.evaluate({3: "x"})
+
+
+@pytest.mark.parametrize("raw, message", [
+    ("1Oui", "signe '=' manquant"),
+    ("abc=Oui", "identifiant de question invalide"),
+])
+def test_malformed_atom_alone_is_always_true(raw, message):
+    condition, errors = compile_condition(raw)
+    assert condition is ALWAYS
+    assert len(errors) == 1 and message in errors[0]
+
+
+def test_malformed_atom_is_ignored_inside_a_block():
+    # Comportement historique : l'atome illisible vaut vrai, le reste du bloc s'applique
+    condition, errors = compile_condition("1=Oui ET cassé")
+    assert len(errors) == 1
+    assert condition.evaluate({1: "Oui"})
+    assert not condition.evaluate({1: "Non"})
+
+
+def test_block_of_malformed_atoms_makes_whole_condition_true():
+    condition, errors = compile_condition("cassé OU 2=Non")
+    assert condition is ALWAYS and len(errors) == 1
+
+
+def test_matches_baseline_check_condition():
+    # Même résultat que la vérification d'origine (copiée dans benchmarks/legacy_validation.py)
+    rnd = random.Random(0)
+    atoms = ["1=Oui", "2=Non", "3='A'", '4="b"', "cassé", "x=1", "5 = Oui ", "1=oui"]
+    for _ in range(500):
+        raw = " OU ".join(" ET ".join(rnd.sample(atoms, rnd.randint(1, 3))) for _ in range(rnd.randint(1, 3)))
+        answers = {k: rnd.choice(["Oui", "non", "a", "B", None]) for k in range(1, 6)}
+        answers = {k: v for k, v in answers.items() if v is not None}
+        row = {"Condition on": 1, "Condition value": raw}
+        condition, _ = compile_row_condition(1, raw)
+        assert condition.evaluate(answers) == legacy_validation.check_condition(row, answers, []), raw
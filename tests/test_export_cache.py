@@ -0,0 +1,57 @@
+# tests/test_export_cache.py
+import tempfile
+import time
+from io import BytesIO
+
+from export_cache import ExportCache, answers_fingerprint
+
+
+def _memory_spool(size):
+    return BytesIO(b"x" * size)
+
+
+def _disk_spool(size):
+    spool = tempfile.SpooledTemporaryFile(max_size=1, mode='w+b')
+    spool.write(b"y" * size)
+    return spool
+
+
+def test_get_or_build_reuses_entry():
+    cache, builds = ExportCache(), []
+    build = lambda: builds.append(1) or _memory_spool(10)
+    first = cache.get_or_build("k", build)
+    assert cache.get_or_build("k", build) is first
+    assert len(builds) == 1 and first.read() == b"x" * 10
+
+
+def test_memory_and_disk_exports_have_separate_budgets():
+    cache = ExportCache(max_bytes=100, max_memory_bytes=25)
+    disk = cache.get_or_build("disk", lambda: _disk_spool(90))
+    assert not disk.in_memory
+    cache.get_or_build("m1", lambda: _memory_spool(10))
+    cache.get_or_build("m2", lambda: _memory_spool(10))
+    cache.get_or_build("m3", lambda: _memory_spool(10))
+    # Budget mémoire dépassé : seule la plus ancienne entrée en mémoire est évincée
+    assert cache.get("m1") is None
+    assert cache.get("disk") is disk and cache.get("m3") is not None
+    stats = cache.stats()
+    assert stats["memory_bytes"] == 20 and stats["bytes"] == 90
+
+
+def test_oversized_and_expired_exports_are_not_kept():
+    cache = ExportCache(max_bytes=100, max_memory_bytes=5, ttl=60)
+    big = cache.get_or_build("big", lambda: _memory_spool(6))
+    assert big.read() == b"x" * 6 and cache.get("big") is None
+    entry = cache.get_or_build("k", lambda: _memory_spool(1))
+    entry.created = time.monotonic() - 61
+    assert cache.get("k") is None and cache.stats()["memory_bytes"] == 0
+
+
+def test_answers_fingerprint_tracks_values_and_files():
+    photo = BytesIO(b"photo")
+    photo.name = "a.jpg"
+    data = [{"phase_name": "P", "answers": {1: "Oui", 2: [photo]}}]
+    same = [{"phase_name": "P", "answers": {1: "Oui", 2: [BytesIO(b"photo")]}}]
+    same[0]["answers"][2][0].name = "a.jpg"
+    assert answers_fingerprint(data) == answers_fingerprint(same)
+    assert answers_fingerprint(data) != answers_fingerprint([{"phase_name": "P", "answers": {1: "Non", 2: [photo]}}])
@@ -0,0 +1,46 @@
+# tests/test_form_structure.py
+import pandas as pd
+
+import core
+from form_structure import find_cycles
+
+
+def _questions(rows):
+    return pd.DataFrame([
+        {'id': q_id, 'section': section, 'question': f"Q{q_id}", 'type': 'text', 'obligatoire': 'non',
+         'options': '', 'Description': '', 'Condition on': 1 if cond else 0, 'Condition value': cond}
+        for q_id, section, cond in rows
+    ])
+
+
+def test_find_cycles():
+    assert find_cycles({1: {2}, 2: {3}, 3: {1}, 4: {4}, 5: {1}}) == [[1, 2, 3, 1], [4, 4]]
+    assert find_cycles({1: {2}, 2: set(), 3: {1, 2}}) == []
+    assert find_cycles({}) == []
+
+
+def test_find_cycles_deep_chain_does_not_recurse():
+    graph = {i: {i + 1} for i in range(5000)}
+    graph[5000] = {0}
+    cycles = find_cycles(graph)
+    assert len(cycles) == 1 and len(cycles[0]) == 5002
+
+
+def test_cycles_are_reported_as_condition_errors():
+    structure = core.build_form_structure(_questions([
+        (1, 'Identification', ''), (2, 'Bornes DC', '3=Oui'), (3, 'Bornes DC', '2=Oui'), (4, 'Bornes DC', '1=Oui'),
+    ]))
+    assert structure.condition_errors == ["Dépendance circulaire : 2 → 3 → 2"]
+
+
+def test_dependents_and_transitive_closure():
+    structure = core.build_form_structure(_questions([
+        (1, 'Identification', ''), (2, 'Bornes DC', '1=Oui'), (3, 'Bornes DC', '2=Oui ET 1=Non'),
+        (4, 'Bornes DC', '3=Oui'), (5, 'Bornes DC', ''),
+    ]))
+    assert structure.dependents == {1: {2, 3}, 2: {3}, 3: {4}}
+    assert structure.condition_refs == {1, 2, 3}
+    assert structure.section_refs('Bornes DC') == {1, 2, 3}
+    assert structure.transitive_dependents([1]) == {2, 3, 4}
+    assert structure.transitive_dependents([3, 5]) == {4}
+    assert structure.transitive_dependents([]) == set()
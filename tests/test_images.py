@@ -0,0 +1,60 @@
+# tests/test_images.py
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+import synthetic
+from images import IMAGE_PROFILES, REPORT_IMAGE_WIDTH_INCHES, prepare_image, prepare_images
+
+
+class TrackedFile(BytesIO):
+    """Fichier de réponse qui compte les lectures en cours (fenêtre de préparation)."""
+    lock = threading.Lock()
+    reads = 0
+
+    def read(self, *args):
+        with TrackedFile.lock: TrackedFile.reads += 1
+        return super().read(*args)
+
+
+def test_email_profile_downsizes_to_report_width():
+    data = synthetic.make_jpeg(1600, 1200).getvalue()
+    prepared = prepare_image(data, 'email')
+    with Image.open(BytesIO(prepared)) as img:
+        assert img.format == 'JPEG'
+        assert img.width == REPORT_IMAGE_WIDTH_INCHES * IMAGE_PROFILES['email'].dpi
+    assert len(prepared) < len(data)
+
+
+def test_original_bytes_kept_for_archive_small_or_broken_images():
+    data = synthetic.make_jpeg(1600, 1200).getvalue()
+    assert prepare_image(data, 'archive') is data
+    small = synthetic.make_jpeg(200, 100).getvalue()
+    assert prepare_image(small, 'email') is small
+    assert prepare_image(b"pas une image", 'email') == b"pas une image"
+
+
+def test_prepare_images_keeps_order_and_reports_errors():
+    photo = synthetic.photo_factory(400, 300)
+
+    class Broken:
+        def seek(self, pos): raise IOError("fichier perdu")
+
+    files = [photo(), Broken(), photo()]
+    results = list(prepare_images(files, 'archive', max_workers=2))
+    assert results[0] == results[2] == files[0].getvalue()
+    assert isinstance(results[1], IOError)
+
+
+def test_prepare_images_reads_ahead_within_window():
+    data = synthetic.make_jpeg(400, 300).getvalue()
+    files = [TrackedFile(data) for _ in range(20)]
+    TrackedFile.reads = 0
+    results = prepare_images(files, 'archive', max_workers=2, window=3)
+    first = next(results)
+    assert first == data
+    # Première image consommée : au plus la fenêtre (3) + la relance qui suit sont lues
+    assert TrackedFile.reads <= 4
+    results.close()
+    assert TrackedFile.reads < len(files)
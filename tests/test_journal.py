@@ -0,0 +1,68 @@
+# tests/test_journal.py
+import io
+from datetime import datetime
+
+import pytest
+
+from journal import AuditJournal
+from photo_store import PhotoHandle, PhotoStore
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return AuditJournal(PhotoStore(str(tmp_path / "photos")), str(tmp_path / "journal.db"))
+
+
+def _photo(journal, data=b"jpeg"):
+    f = io.BytesIO(data)
+    f.name = "borne.jpg"
+    return journal.photo_store.put(f)
+
+
+def test_resume_restores_phases_photos_and_draft(journal):
+    start = datetime(2026, 9, 1, 8, 30)
+    journal.start("a1", {"Intitulé": "Orléans Centre"}, start, form_version="v1")
+    photo = _photo(journal)
+    journal.append_phase("a1", {"phase_name": "Identification", "answers": {1: "Bob", 2: 3}})
+    journal.append_phase("a1", {"phase_name": "Bornes DC", "answers": {10: [photo], 11: "Oui"}})
+    journal.save_draft("a1", "Bornes AC", {20: "Non", 21: [io.BytesIO(b"en cours d envoi")]})
+
+    # Nouveau processus (redémarrage) : même fichier
+    state = AuditJournal(journal.photo_store, journal.path).load("a1")
+    assert state["project_data"] == {"Intitulé": "Orléans Centre"}
+    assert state["form_start"] == start and state["form_version"] == "v1" and not state["finished"]
+    assert [p["phase_name"] for p in state["phases"]] == ["Identification", "Bornes DC"]
+    assert state["phases"][0]["answers"] == {1: "Bob", 2: 3}
+    restored = state["phases"][1]["answers"][10][0]
+    assert isinstance(restored, PhotoHandle) and restored.read() == b"jpeg" and restored.name == "borne.jpg"
+    # Brouillon : réponses saisies, sans les fichiers en cours d'envoi
+    assert state["draft"] == {"phase_name": "Bornes AC", "answers": {20: "Non"}}
+    assert journal.photo_digests() == {photo.digest}
+
+
+def test_load_after_seq_returns_only_new_phases(journal):
+    journal.start("a1", {}, None)
+    journal.append_phase("a1", {"phase_name": "P1", "answers": {1: "Oui"}})
+    last = journal.load("a1")["last_seq"]
+    journal.append_phase("a1", {"phase_name": "P2", "answers": {2: "Non"}})
+    delta = journal.load("a1", after_seq=last)
+    assert [p["phase_name"] for p in delta["phases"]] == ["P2"] and delta["last_seq"] > last
+    assert journal.load("inconnu") is None
+
+
+def test_unchanged_draft_is_not_rewritten(journal):
+    journal.start("a1", {}, None)
+    key = journal.save_draft("a1", "P1", {1: "Oui"})
+    assert journal.save_draft("a1", "P1", {1: "Oui"}, previous=key) is key
+    assert journal.save_draft("a1", "P1", {1: "Non"}, previous=key) != key
+
+
+def test_finish_and_prune(journal):
+    journal.start("a1", {}, None)
+    journal.save_draft("a1", "P1", {1: "Oui"})
+    journal.finish("a1")
+    state = journal.load("a1")
+    assert state["finished"] and state["draft"] is None
+    assert journal.prune(max_age_days=1) == 0
+    assert journal.prune(max_age_days=-1) == 1
+    assert journal.load("a1") is None
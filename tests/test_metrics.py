@@ -0,0 +1,59 @@
+# tests/test_metrics.py
+import io
+import json
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "REGISTRY", metrics.MetricsRegistry())
+    return metrics.REGISTRY
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = metrics.Histogram()
+    for value in (0.0005, 0.002, 0.002, 0.2):
+        histogram.observe(value)
+    assert histogram.count == 4 and histogram.max == 0.2
+    assert histogram.counts[0] == 1 and histogram.counts[1] == 2
+    assert 0.001 <= histogram.quantile(0.5) <= 0.0025
+    assert histogram.quantile(1.0) == pytest.approx(0.2)
+    assert metrics.Histogram().quantile(0.5) is None
+
+
+def test_disabled_metrics_cost_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    fn = lambda: 1
+    assert metrics.timed("op")(fn) is fn
+    assert metrics.timer("op") is metrics.timer("autre")
+
+
+def test_timed_records_duration_and_payload(enabled):
+    @metrics.timed("export_csv", payload=metrics.spool_size)
+    def export():
+        return io.BytesIO(b"x" * 42)
+
+    assert export().tell() == 0
+    with metrics.timer("validate_section", section="Bornes DC") as watch:
+        pass
+    watch.stop()
+    snap = enabled.snapshot()
+    assert [(h["operation"], h["count"]) for h in snap["histograms"]] == [("export_csv", 1), ("validate_section", 1)]
+    counters = {c["name"]: c["value"] for c in snap["counters"]}
+    assert counters == {"payload_bytes": 42, "payloads": 1}
+
+
+def test_prometheus_and_json_exports(enabled, tmp_path):
+    enabled.observe("render", 0.003, step='FILL"PHASE')
+    enabled.inc("saves", 2)
+    text = enabled.to_prometheus()
+    assert 'visite_operation_seconds_bucket{operation="render",step="FILL\\"PHASE",le="0.005"} 1' in text
+    assert 'visite_operation_seconds_count{operation="render",step="FILL\\"PHASE"} 1' in text
+    assert "visite_saves_total 2" in text
+    path = tmp_path / "metrics" / "visite.json"
+    metrics.write_file(str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["counters"][0]["value"] == 2
@@ -0,0 +1,56 @@
+# tests/test_photo_store.py
+import hashlib
+import io
+import os
+import time
+
+from photo_store import PhotoHandle, PhotoStore, read_answer_file
+
+
+class Upload(io.BytesIO):
+    """UploadedFile minimal : contenu, nom et file_id Streamlit."""
+    def __init__(self, data, name, file_id=None):
+        super().__init__(data)
+        self.name = name
+        self.file_id = file_id
+
+
+def _age(handle, days):
+    old = time.time() - days * 86400
+    os.utime(handle.path, (old, old))
+
+
+def test_put_is_content_addressed(tmp_path):
+    store = PhotoStore(str(tmp_path))
+    first = store.put(Upload(b"photo", "a.jpg"))
+    second = store.put(Upload(b"photo", "b.jpg"))
+    assert first.digest == second.digest == hashlib.sha256(b"photo").hexdigest()
+    assert (first.name, second.name, first.size) == ("a.jpg", "b.jpg", 5)
+    assert first.read() == b"photo" and read_answer_file(first) == b"photo"
+    assert [name for _, _, files in os.walk(tmp_path) for name in files] == [first.digest]
+
+
+def test_put_reuses_handle_for_same_upload(tmp_path):
+    store = PhotoStore(str(tmp_path))
+    upload = Upload(b"photo", "a.jpg", file_id="f1")
+    handle = store.put(upload)
+    assert store.put(upload) is handle
+    assert upload.tell() == 0
+    assert store.put_many([handle, Upload(b"autre", "c.jpg")])[0] is handle
+
+
+def test_handle_rebuilt_from_digest(tmp_path):
+    store = PhotoStore(str(tmp_path))
+    handle = store.put(Upload(b"photo", "a.jpg"))
+    rebuilt = store.handle(handle.digest, "a.jpg")
+    assert isinstance(rebuilt, PhotoHandle) and rebuilt.size == 5 and rebuilt.to_dict() == handle.to_dict()
+
+
+def test_prune_keeps_recent_touched_and_referenced_photos(tmp_path):
+    store = PhotoStore(str(tmp_path))
+    old, kept, touched, recent = (store.put(Upload(data, "p.jpg")) for data in (b"1", b"2", b"3", b"4"))
+    for handle in (old, kept, touched): _age(handle, 90)
+    store.touch([touched])
+    assert store.prune(60, keep={kept.digest}) == 1
+    assert not os.path.exists(old.path)
+    assert all(os.path.exists(h.path) for h in (kept, touched, recent))
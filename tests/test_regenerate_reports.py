@@ -0,0 +1,65 @@
+# tests/test_regenerate_reports.py
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import regenerate_reports
+import synthetic
+from conftest import ROOT
+from submission_store import SQLiteSubmissionStore, load_sheets_config
+
+
+@pytest.fixture
+def tables(tmp_path):
+    questions, sites = tmp_path / "questions.csv", tmp_path / "sites.csv"
+    synthetic.make_questions_df(questions_per_section=5).to_csv(questions, index=False)
+    synthetic.make_sites_df(20).to_csv(sites, index=False)
+    return str(questions), str(sites)
+
+
+def test_regenerates_csv_reports_from_sqlite(tmp_path, tables):
+    db = str(tmp_path / "submissions.db")
+    store = SQLiteSubmissionStore(db)
+    answers = [{"phase_name": synthetic.SECTION, "answers": {"1": "Oui", "2": "Fichiers: a.jpg"}}]
+    store.append({"ID": "abc12345xyz", "Date": "2026-09-03 08:30:00", "Projet": "Orléans - Site 1", "Donnees_JSON": json.dumps(answers)})
+    store.append({"ID": "cassé", "Date": "2026-09-04 08:30:00", "Projet": "Lyon", "Donnees_JSON": "{"})
+    output = tmp_path / "rapports"
+    code = regenerate_reports.main([
+        "--db", db, "--questions", tables[0], "--sites", tables[1],
+        "--format", "csv", "--workers", "1", "--output", str(output),
+    ])
+    # Soumission illisible signalée, les autres régénérées
+    assert code == 1
+    assert os.listdir(output) == ["Export_Orléans_-_Site_1_20260903_0830_abc12345.csv"]
+    code = regenerate_reports.main([
+        "--db", db, "--questions", tables[0], "--sites", tables[1], "--since", "2026-09-01", "--until", "2026-09-03",
+        "--format", "csv", "--workers", "1", "--output", str(output),
+    ])
+    assert code == 0
+
+
+def test_command_line_tools_do_not_import_streamlit():
+    code = "import sys, regenerate_reports, migrate_answers; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=ROOT).returncode == 0
+
+
+def test_sheets_config_from_secrets_file_or_environment(tmp_path, monkeypatch):
+    secrets = tmp_path / "secrets.toml"
+    secrets.write_text('[connections.gsheets]\ntype = "service_account"\nspreadsheet = "https://exemple"\n', encoding="utf-8")
+    monkeypatch.delenv("VISITE_SHEETS_CREDENTIALS", raising=False)
+    monkeypatch.setenv("VISITE_SECRETS_FILE", str(secrets))
+    assert load_sheets_config() == {"type": "service_account", "spreadsheet": "https://exemple"}
+
+    credentials = tmp_path / "compte.json"
+    credentials.write_text(json.dumps({"type": "service_account", "client_email": "a@b"}), encoding="utf-8")
+    monkeypatch.setenv("VISITE_SHEETS_CREDENTIALS", str(credentials))
+    monkeypatch.setenv("VISITE_SHEETS_SPREADSHEET", "Visites")
+    assert load_sheets_config()["spreadsheet"] == "Visites"
+
+    monkeypatch.delenv("VISITE_SHEETS_CREDENTIALS")
+    monkeypatch.setenv("VISITE_SECRETS_FILE", str(tmp_path / "absent.toml"))
+    with pytest.raises(ValueError):
+        load_sheets_config()
@@ -0,0 +1,67 @@
+# tests/test_registry.py
+import time
+
+from registry import StructureRegistry
+
+
+class FakeSnapshot:
+    def __init__(self, version="v1"):
+        self.version = version
+        self.refreshes = 0
+
+    def get(self):
+        return {"version": self.version}, self.version
+
+    def refresh(self):
+        self.refreshes += 1
+        return False
+
+
+def _registry(snapshot, builds, **kwargs):
+    def build(df):
+        builds.append(df["version"])
+        return f"structure {df['version']}"
+    return StructureRegistry({"questions": (snapshot, build)}, **kwargs)
+
+
+def test_pin_builds_each_version_once_and_shares_it():
+    snapshot, builds = FakeSnapshot(), []
+    registry = _registry(snapshot, builds)
+    assert registry.pin("questions") == registry.pin("questions") == "v1"
+    assert registry.get("questions", "v1") == "structure v1"
+    assert builds == ["v1"]
+    assert registry.get("questions", "inconnue") is None
+
+
+def test_old_version_is_evicted_then_repinned():
+    snapshot, builds = FakeSnapshot(), []
+    registry = _registry(snapshot, builds, retention=60)
+    old = registry.pin("questions")
+    snapshot.version = "v2"
+    assert registry.pin("questions") == "v2"
+    # Ancienne version encore utilisée récemment : conservée pour les sessions en cours
+    assert registry.get("questions", old) == "structure v1"
+    registry._entries["questions"][old].last_used = time.time() - 61
+    registry.pin("questions")
+    assert registry.get("questions", old) is None
+    # La session qui la tenait repasse sur la version courante, sans reconstruction
+    assert registry.get("questions", registry.pin("questions")) == "structure v2"
+    assert builds == ["v1", "v2"]
+
+
+def test_current_version_is_never_evicted():
+    snapshot, builds = FakeSnapshot(), []
+    registry = _registry(snapshot, builds, retention=0)
+    version = registry.pin("questions")
+    registry._entries["questions"][version].last_used = 0
+    assert registry.pin("questions") == version and registry.get("questions", version) is not None
+    assert builds == ["v1"]
+
+
+def test_refresh_is_rate_limited_across_sessions():
+    snapshot = FakeSnapshot()
+    registry = _registry(snapshot, [], min_refresh_interval=60)
+    assert registry.refresh() == (True, "Aucune modification dans les onglets.")
+    ok, message = registry.refresh()
+    assert not ok and "Réessayez" in message
+    assert snapshot.refreshes == 1
@@ -0,0 +1,80 @@
+# tests/test_save_queue.py
+import time
+
+import pytest
+
+from save_queue import CLAIM_LEASE, DONE, PENDING, SaveQueue
+
+
+class RecordingStore:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def append(self, record, check_existing=False):
+        self.calls.append((record["ID"], check_existing))
+        if self.failures:
+            self.failures -= 1
+            raise IOError("quota dépassé")
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "file.db")
+
+
+def test_enqueue_is_idempotent(queue_path):
+    store, mirror = RecordingStore(), RecordingStore()
+    queue = SaveQueue(store, queue_path, mirrors=(mirror,))
+    assert queue.enqueue({"ID": "a", "Donnees_JSON": "[]"})
+    assert not queue.enqueue({"ID": "a", "Donnees_JSON": "[]"})
+    assert queue.drain_once() == 1
+    assert queue.drain_once() == 0
+    assert store.calls == [("a", False)] and mirror.calls == [("a", False)]
+    assert queue.status("a")["status"] == DONE
+    # Déjà sauvegardée : une nouvelle mise en file ne la réécrit pas
+    assert not queue.enqueue({"ID": "a", "Donnees_JSON": "[]"})
+    assert queue.drain_once() == 0
+
+
+def test_failed_save_is_retried_later_with_existence_check(queue_path):
+    store = RecordingStore(failures=1)
+    queue = SaveQueue(store, queue_path)
+    queue.enqueue({"ID": "b"})
+    before = time.time()
+    assert queue.drain_once() == 0
+    status = queue.status("b")
+    assert status["status"] == PENDING and status["attempts"] == 1
+    assert "quota dépassé" in status["last_error"]
+    assert status["next_attempt"] > before
+    # Pas encore échue : rien n'est retenté
+    assert queue.drain_once() == 0
+    queue.retry_now("b")
+    assert queue.drain_once() == 1
+    assert store.calls == [("b", False), ("b", True)]
+    status = queue.status("b")
+    assert (status["status"], status["attempts"], status["last_error"]) == (DONE, 2, None)
+
+
+def test_claimed_entry_is_leased_then_reclaimed(queue_path):
+    queue = SaveQueue(RecordingStore(), queue_path)
+    queue.enqueue({"ID": "c"})
+    now = time.time()
+    claimed = queue._claim_due(now)
+    assert [c[0] for c in claimed] == ["c"]
+    # Réservée : un autre worker ne la reprend pas pendant le bail
+    assert queue._claim_due(now) == []
+    assert queue._claim_due(now + CLAIM_LEASE / 2) == []
+    # Bail expiré (processus arrêté pendant l'écriture) : reprise
+    assert [c[0] for c in queue._claim_due(now + CLAIM_LEASE + 1)] == ["c"]
+
+
+def test_prune_removes_only_old_done_entries(queue_path):
+    queue = SaveQueue(RecordingStore(), queue_path)
+    queue.enqueue({"ID": "d"})
+    queue.drain_once()
+    queue.enqueue({"ID": "e"})
+    assert queue.prune(max_age_days=1) == 0
+    assert queue.prune(max_age_days=-1) == 1
+    assert queue.status("d") is None
+    assert queue.status("e")["status"] == PENDING
@@ -0,0 +1,56 @@
+# tests/test_site_search.py
+import pandas as pd
+import pytest
+
+import synthetic
+from site_search import SiteSearchIndex, fold_text
+from sites import SiteCatalog
+
+
+def make_index(titles):
+    return SiteSearchIndex(pd.DataFrame({'Intitulé': titles}))
+
+
+def test_fold_text_removes_accents_case_and_spaces():
+    assert fold_text("  Orléans   CENTRE ") == "orleans centre"
+
+
+def test_ranking_prefers_text_start_then_word_start_then_inside():
+    index = make_index(["Aéroport Gare", "Gare Sud", "Ma Gare", "Garenne", "Bagarre"])
+    # 'gare' en début de texte (le plus court d'abord), puis en début de mot, puis ailleurs
+    assert index.search("gare") == [3, 1, 2, 0]
+    assert index.search("GARE", limit=2) == [3, 1]
+
+
+def test_word_start_wins_over_earlier_match_inside_a_word():
+    index = make_index(["Sparking Parking", "Zone Parking Nord"])
+    # Ligne 0 : 'parking' en milieu de mot en 1, en début de mot en 9 ; ligne 1 : début de mot en 5
+    assert index.search("parking") == [1, 0]
+
+
+def test_typo_falls_back_to_similar_titles():
+    index = make_index(["Orléans Centre", "Paris Nord"])
+    assert index.search("orleens centre") == [0]
+    assert index.search("zzzz") == []
+
+
+@pytest.fixture(scope="module")
+def synthetic_index():
+    return SiteSearchIndex(synthetic.make_sites_df(3000))
+
+
+@pytest.mark.parametrize("query", ["parking", "site 42", "site 1", "ville1", "p", "nord", "e 1", "ille4", "gare"])
+@pytest.mark.parametrize("limit", [1, 5, 200])
+def test_limited_search_matches_full_ranking(synthetic_index, query, limit):
+    # Les requêtes limitées passent par l'index des débuts de mot ; sans limite, par le classement complet
+    index = synthetic_index
+    full = index.search(query)
+    index._results.clear()
+    assert index.search(query, limit=limit) == full[:limit]
+
+
+def test_catalog_search_dedupes_titles_up_to_limit():
+    titles = ["Site A", "Site A", "Site A", "Site B", "Site C"]
+    catalog = SiteCatalog(pd.DataFrame({'Intitulé': titles}))
+    assert catalog.search("site", limit=2) == ["Site A", "Site B"]
+    assert catalog.search("site") == ["Site A", "Site B", "Site C"]
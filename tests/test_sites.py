@@ -0,0 +1,36 @@
+# tests/test_sites.py
+import pandas as pd
+
+import core
+import synthetic
+from sites import SiteCatalog, SiteRecord, parse_counts
+
+
+def test_parse_counts_matches_sheet_conversion():
+    values = ['2', '4,0', '1.9', '', None, 'n/a', 'inf', ' 3 ']
+    assert parse_counts(values).tolist() == [2, 4, 1, 0, 0, 0, 0, 3]
+
+
+def test_catalog_precomputes_expected_photos_like_the_row_by_row_rule():
+    raw = synthetic.make_sites_df(200)
+    catalog = core.build_site_catalog(raw)
+    for row in raw.sample(20, random_state=0).to_dict('records'):
+        record = catalog.record(row['Intitulé'])
+        for section in core.SECTION_PHOTO_RULES:
+            assert core.get_expected_photo_count(section, record) == core.get_expected_photo_count(section, row)
+    assert catalog.record("Projet inconnu") is None
+
+
+def test_record_is_first_row_with_that_title():
+    df = pd.DataFrame({'Intitulé': ["A", "B", "A"], 'L [Plan de Déploiement]': ['1', '2', '3']})
+    catalog = SiteCatalog(df, photo_rules={"Bornes AC": ['L [Plan de Déploiement]']}, rename_map=core.PROJECT_RENAME_MAP)
+    record = catalog.record("A")
+    assert isinstance(record, SiteRecord) and record['L [Plan de Déploiement]'] == '1'
+    assert record.expected_photos == {"Bornes AC": (1, "1 PDC Lent")}
+    assert catalog.has_titles and not SiteCatalog(pd.DataFrame({'x': [1]})).has_titles
+
+
+def test_make_site_record_for_rows_outside_the_catalog():
+    record = core.make_site_record({'Intitulé': "Repris", 'R [Plan de Déploiement]': '2', 'UR [Plan de Déploiement]': ''})
+    assert record.expected_photos["Bornes DC"] == (2, "2 PDC Rapide + 0 PDC Ultra-rapide")
+    assert core.make_site_record(record) is record
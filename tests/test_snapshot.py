@@ -0,0 +1,79 @@
+# tests/test_snapshot.py
+import os
+import threading
+import time
+
+import pandas as pd
+
+from snapshot import SheetSnapshot, content_version, read_snapshot
+
+
+class Sheet:
+    """Feuille simulée : compte les lectures, peut échouer ou attendre."""
+    def __init__(self, df):
+        self.df = df
+        self.reads = 0
+        self.error = None
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.reads += 1
+        self.release.wait(5)
+        if self.error: raise self.error
+        return self.df.copy()
+
+
+def _wait_refreshed(snapshot):
+    deadline = time.time() + 5
+    while snapshot._refreshing and time.time() < deadline: time.sleep(0.01)
+
+
+def test_content_version_changes_with_content():
+    df = pd.DataFrame({'id': [1, 2], 'question': ["A", "B"]})
+    assert content_version(df) == content_version(df.copy())
+    assert content_version(df) != content_version(df.assign(question=["A", "C"]))
+
+
+def test_first_read_writes_snapshot_then_reloads_from_disk(tmp_path):
+    sheet = Sheet(pd.DataFrame({'id': [1, 2], 'mixte': [1, "deux"]}))
+    snapshot = SheetSnapshot("questions", sheet, str(tmp_path))
+    df, version = snapshot.get()
+    assert sheet.reads == 1 and version == content_version(sheet.df)
+    assert df['mixte'].tolist() == ["1", "deux"]
+    disk_df, disk_version = read_snapshot("questions", str(tmp_path))
+    assert disk_version == version and disk_df.equals(df)
+
+    # Nouveau processus : la copie locale est servie sans relire la feuille
+    restarted = SheetSnapshot("questions", sheet, str(tmp_path))
+    assert restarted.get()[1] == version and sheet.reads == 1
+
+
+def test_stale_copy_is_served_while_revalidating(tmp_path):
+    sheet = Sheet(pd.DataFrame({'id': [1]}))
+    snapshot = SheetSnapshot("sites", sheet, str(tmp_path), max_age=0)
+    _, first_version = snapshot.get()
+    _wait_refreshed(snapshot)
+    sheet.df = pd.DataFrame({'id': [1, 2]})
+    sheet.release.clear()
+    df, version = snapshot.get()
+    # Relecture en cours : l'ancienne copie est servie immédiatement
+    assert version == first_version and len(df) == 1
+    sheet.release.set()
+    _wait_refreshed(snapshot)
+    df, version = snapshot.get(revalidate=False)
+    assert len(df) == 2 and version == content_version(sheet.df)
+    _wait_refreshed(snapshot)
+
+
+def test_refresh_keeps_version_when_unchanged_and_records_errors(tmp_path):
+    sheet = Sheet(pd.DataFrame({'id': [1]}))
+    snapshot = SheetSnapshot("sites", sheet, str(tmp_path), max_age=3600)
+    _, version = snapshot.get()
+    mtime = os.path.getmtime(snapshot.path)
+    assert snapshot.refresh() is False and snapshot.version == version
+    sheet.error = IOError("quota")
+    assert snapshot.revalidate()
+    _wait_refreshed(snapshot)
+    assert "quota" in snapshot.last_error
+    assert snapshot.get()[1] == version and os.path.getmtime(snapshot.path) >= mtime
@@ -0,0 +1,70 @@
+# tests/test_submission_store.py
+import pytest
+
+from submission_store import SheetsSubmissionStore, SQLiteSubmissionStore, build_submission_store
+
+
+def _record(submission_id, project="Site A", date="2026-09-01 10:00:00"):
+    return {"ID": submission_id, "Date": date, "Projet": project, "Donnees_JSON": "[]"}
+
+
+class FakeWorksheet:
+    def __init__(self):
+        self.rows = [["ID", "Date", "Projet", "Donnees_JSON"]]
+        self.reads = 0
+
+    def col_values(self, col):
+        self.reads += 1
+        return [row[col - 1] for row in self.rows]
+
+    def append_row(self, row, value_input_option=None, insert_data_option=None):
+        self.rows.append(row)
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.ws = FakeWorksheet()
+
+    def worksheet(self, name):
+        return self.ws
+
+
+def test_sqlite_append_is_idempotent_and_filters(tmp_path):
+    store = SQLiteSubmissionStore(str(tmp_path / "soumissions.db"))
+    store.append(_record("a"))
+    store.append(_record("a"))
+    store.append(_record("b", project="Orléans Centre", date="2026-09-05 08:00:00"), check_existing=True)
+    store.append(_record("b"), check_existing=True)
+    assert [r["ID"] for r in store.iter_records()] == ["a", "b"]
+    assert [r["ID"] for r in store.iter_records(project="orléans")] == ["b"]
+    assert [r["ID"] for r in store.iter_records(ids=["a"], date_to="2026-09-01")] == ["a"]
+    assert list(store.iter_records(date_from="2026-09-06")) == []
+
+
+def test_sqlite_store_without_database_yields_nothing(tmp_path):
+    assert list(SQLiteSubmissionStore(str(tmp_path / "absente.db")).iter_records()) == []
+
+
+def test_sheets_append_reads_ids_only_on_retry():
+    store = SheetsSubmissionStore(lambda: {})
+    store._spreadsheet = spreadsheet = FakeSpreadsheet()
+    store.append({**_record("a"), "Donnees_JSON": None})
+    assert spreadsheet.ws.reads == 0
+    assert spreadsheet.ws.rows[-1] == ["a", "2026-09-01 10:00:00", "Site A", ""]
+    # Nouvelle tentative après un échec : la ligne déjà écrite n'est pas dupliquée
+    store.append(_record("a"), check_existing=True)
+    assert spreadsheet.ws.reads == 1 and len(spreadsheet.ws.rows) == 2
+
+
+def test_sheets_store_requires_a_service_account():
+    store = SheetsSubmissionStore(lambda: {"type": "public", "spreadsheet": "https://exemple"})
+    with pytest.raises(ValueError):
+        store.append(_record("a"))
+
+
+def test_build_submission_store(tmp_path, monkeypatch):
+    monkeypatch.delenv("VISITE_SUBMISSION_STORE", raising=False)
+    assert isinstance(build_submission_store(db_path=str(tmp_path / "s.db")), SQLiteSubmissionStore)
+    assert isinstance(build_submission_store("sheets", config_factory=dict), SheetsSubmissionStore)
+    with pytest.raises(ValueError):
+        build_submission_store("csv")
@@ -0,0 +1,43 @@
+# tests/test_visibility.py
+import random
+
+import synthetic
+
+import core
+from answers import AnswerIndex, VisibilityCache
+
+
+def test_incremental_visibility_matches_full_evaluation():
+    df = synthetic.make_questions_df(3, 150, condition_density=0.5)
+    # Condition sur elle-même (cycle) : doit rester cohérente
+    df.loc[5, 'Condition on'], df.loc[5, 'Condition value'] = 1, f"{df.loc[5, 'id']}=Oui"
+    structure = core.build_form_structure(df)
+    section = synthetic.SECTION
+    questions = structure.section_questions(section)
+    refs = [q for q in questions if q.id in structure.condition_refs]
+    index = AnswerIndex(synthetic.make_collected_data(structure, n_phases=2))
+    rnd = random.Random(1)
+    answers, cache = {}, VisibilityCache('k')
+    for _ in range(2000):
+        answers[rnd.choice(refs).id] = rnd.choice(['Oui', 'Non', ''])
+        # Phase validée ailleurs (autre onglet) : réponses passées modifiées entre deux passages
+        if rnd.random() < 0.05: index.add_phase({'answers': {rnd.randint(1, 450): rnd.choice(['Oui', 'Non'])}})
+        view = index.view(answers)
+        cache.refresh(structure, section, view)
+        full = [q.id for q in questions if q.condition.evaluate(view)]
+        assert [q.id for q in questions if cache.is_visible(q, view)] == full
+
+
+def test_note_answer_invalidates_later_dependents_in_same_pass():
+    df = synthetic.make_questions_df(1, 3, condition_density=0)
+    df.loc[1, 'Condition on'], df.loc[1, 'Condition value'] = 1, "1=Oui"
+    structure = core.build_form_structure(df)
+    q1, q2, _ = structure.section_questions(synthetic.SECTION)
+    answers, cache = {}, VisibilityCache('k')
+    view = AnswerIndex().view(answers)
+    cache.refresh(structure, synthetic.SECTION, view)
+    assert not cache.is_visible(q2, view)
+    # Réponse saisie pendant le rendu de la question 1 : la question 2 est réévaluée
+    answers[q1.id] = 'Oui'
+    cache.note_answer(structure, q1.id, view)
+    assert cache.is_visible(q2, view)